@@ -9,6 +9,8 @@ from app.workflows.dsl.activities import (
     VectorStoreActivity,
     StoreDocumentsActivity,
     RetrieveActivity,
+    DiffChunksActivity,
+    CommitChunksActivity,
 )
 from app.workflows.transfer.activities import AccountActivities
 from app.workflows.translate.activities import TranslateActivities
@@ -45,6 +47,7 @@ class ActivitiesContainer(containers.DeclarativeContainer):
 
     split_documents_activity = providers.Singleton(
         SplitDocumentsActivity,
+        max_workers=settings.provided.TEMPORAL.DSL_PARSE_PROCESSES,
     )
 
     store_documents_activity = providers.Singleton(
@@ -61,6 +64,7 @@ class ActivitiesContainer(containers.DeclarativeContainer):
         VectorStoreActivity,
         embedding_service=ai.embedding_service,
         vector_store_settings=settings.provided.VECTOR_STORE,
+        chunk_manifest_service=services.chunk_manifest_service,
     )
 
     retrieve_activity = providers.Singleton(
@@ -69,3 +73,16 @@ class ActivitiesContainer(containers.DeclarativeContainer):
         embedding_service=ai.embedding_service,
         vector_store_settings=settings.provided.VECTOR_STORE,
     )
+
+    diff_chunks_activity = providers.Singleton(
+        DiffChunksActivity,
+        chunk_manifest_service=services.chunk_manifest_service,
+    )
+
+    commit_chunks_activity = providers.Singleton(
+        CommitChunksActivity,
+        chunk_manifest_service=services.chunk_manifest_service,
+        doc_store=services.document_store,
+        embedding_service=ai.embedding_service,
+        vector_store_settings=settings.provided.VECTOR_STORE,
+    )
@@ -1,4 +1,5 @@
 from dependency_injector import containers, providers
+import redis
 from redis.asyncio import Redis
 
 from app.core.clients import TemporalClientFactory
@@ -21,3 +22,9 @@ class ClientsContainer(containers.DeclarativeContainer):
         Redis.from_url,
         url=settings.provided.REDIS_URL,
     )
+
+    # 同步接口(如 CachedDocumentStore 的同步读写)使用的客户端
+    sync_redis_client = providers.Singleton(
+        redis.Redis.from_url,
+        url=settings.provided.REDIS_URL,
+    )
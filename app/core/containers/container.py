@@ -30,6 +30,7 @@ class Container(containers.DeclarativeContainer):
             "app.workflows.translate.worker",
             "app.workflows.dsl.worker",
             "app.routers.chat",
+            "app.routers.monitoring",
         ]
     )
 
@@ -62,6 +63,7 @@ class Container(containers.DeclarativeContainer):
         settings=settings,
         db=database.db,
         repositories=repositories,
+        clients=clients,
     )
 
     activities = providers.Container(
@@ -1,6 +1,7 @@
 from dependency_injector import containers, providers
 
 from app.core.database import Database
+from app.core.session_tracker import SessionTracker
 from app.settings import DatabaseSettings
 
 
@@ -9,7 +10,26 @@ class DatabaseContainer(containers.DeclarativeContainer):
 
     settings = providers.Dependency(instance_of=DatabaseSettings)
 
+    session_tracker = providers.Singleton(
+        SessionTracker,
+        leak_threshold=settings.provided.SESSION_LEAK_THRESHOLD,
+        capture_stack=settings.provided.SESSION_TRACK_STACK,
+    )
+
     db = providers.Singleton(
         Database,
         db_url=settings.provided.URL,
+        replica_urls=settings.provided.REPLICA_URLS,
+        replica_strategy=settings.provided.REPLICA_STRATEGY,
+        replica_max_lag=settings.provided.REPLICA_MAX_LAG,
+        replica_check_interval=settings.provided.REPLICA_CHECK_INTERVAL,
+        pool_size=settings.provided.POOL_SIZE,
+        max_overflow=settings.provided.MAX_OVERFLOW,
+        pool_timeout=settings.provided.POOL_TIMEOUT,
+        pool_recycle=settings.provided.POOL_RECYCLE,
+        pool_pre_ping=settings.provided.POOL_PRE_PING,
+        session_tracker=session_tracker,
+        retry_max_attempts=settings.provided.TRANSACTION_RETRY_ATTEMPTS,
+        retry_base_delay=settings.provided.TRANSACTION_RETRY_BASE_DELAY,
+        retry_max_delay=settings.provided.TRANSACTION_RETRY_MAX_DELAY,
     )
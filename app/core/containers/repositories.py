@@ -3,7 +3,9 @@ from dependency_injector import containers, providers
 from app.core.database import Database
 from app.repositories import (
     AccountRepository,
+    ChunkManifestRepository,
     DatasetRepository,
+    LedgerRepository,
     OrderRepository,
     ResourceRepository,
     UserRepository,
@@ -20,10 +22,18 @@ class RepositoriesContainer(containers.DeclarativeContainer):
         AccountRepository,
         session_or_factory=db.provided.get_session,
     )
+    chunk_manifest_repository = providers.Factory(
+        ChunkManifestRepository,
+        session_or_factory=db.provided.get_session,
+    )
     dataset_repository = providers.Factory(
         DatasetRepository,
         session_or_factory=db.provided.get_session,
     )
+    ledger_repository = providers.Factory(
+        LedgerRepository,
+        session_or_factory=db.provided.get_session,
+    )
 
     order_repository = providers.Factory(
         OrderRepository,
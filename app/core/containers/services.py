@@ -6,12 +6,17 @@ from app.services import (
     OrderService,
     UserService,
     TransactionService,
+    LedgerService,
+    IdempotencyService,
     WorkspaceService,
     DatasetService,
     ChatService,
+    ChunkManifestService,
     MinioStorageService,
     ResourceService,
-    MySQLDocumentStore
+    MySQLDocumentStore,
+    AsyncSQLDocumentStore,
+    CachedDocumentStore,
 )
 from app.settings import Settings
 
@@ -20,6 +25,7 @@ class ServicesContainer(containers.DeclarativeContainer):
     """Services related dependencies container."""
 
     repositories = providers.DependenciesContainer()
+    clients = providers.DependenciesContainer()
     db = providers.Dependency(instance_of=Database)
     settings = providers.Dependency(instance_of=Settings)
 
@@ -31,12 +37,40 @@ class ServicesContainer(containers.DeclarativeContainer):
         ),
     )
 
-    document_store = providers.Selector(
+    base_document_store = providers.Selector(
         settings.provided.DOCUMENT_STORE.PROVIDER,
         mysql=providers.Singleton(
             MySQLDocumentStore,
             settings=settings.provided.DOCUMENT_STORE
-        )
+        ),
+        database=providers.Singleton(
+            AsyncSQLDocumentStore,
+            db=db.provided,
+            settings=settings.provided.DOCUMENT_STORE
+        ),
+    )
+
+    document_store = providers.Selector(
+        settings.provided.DOCUMENT_STORE.CACHE,
+        none=base_document_store,
+        redis=providers.Singleton(
+            CachedDocumentStore,
+            store=base_document_store,
+            redis_client=clients.redis_client,
+            sync_redis_client=clients.sync_redis_client,
+            namespace=settings.provided.DOCUMENT_STORE.NAMESPACE,
+            lru_size=settings.provided.DOCUMENT_STORE.CACHE_LRU_SIZE,
+            ttl=settings.provided.DOCUMENT_STORE.CACHE_TTL,
+            negative_ttl=settings.provided.DOCUMENT_STORE.CACHE_NEGATIVE_TTL,
+        ),
+    )
+
+    idempotency_service = providers.Singleton(
+        IdempotencyService,
+        redis_client=clients.redis_client,
+        db=db.provided,
+        ttl=settings.provided.API.IDEMPOTENCY_TTL,
+        lock_ttl=settings.provided.API.IDEMPOTENCY_LOCK_TTL,
     )
 
     order_service = providers.Factory(
@@ -56,9 +90,16 @@ class ServicesContainer(containers.DeclarativeContainer):
         settings=settings,
         user_service=user_service,
     )
+    ledger_service = providers.Factory(
+        LedgerService,
+        db=db.provided,
+        ledger_repository=repositories.ledger_repository,
+    )
     transaction_service = providers.Factory(
         TransactionService,
         db=db.provided,
+        ledger_service=ledger_service,
+        use_ledger=settings.provided.DATABASE.LEDGER_BALANCES,
     )
     workspace_service = providers.Factory(
         WorkspaceService,
@@ -83,3 +124,9 @@ class ServicesContainer(containers.DeclarativeContainer):
     chat_service = providers.Factory(
         ChatService,
     )
+
+    chunk_manifest_service = providers.Factory(
+        ChunkManifestService,
+        db=db.provided,
+        chunk_manifest_repository=repositories.chunk_manifest_repository,
+    )
@@ -1,24 +1,37 @@
 import asyncio
 import functools
+import itertools
+import random
+import time
 from contextlib import asynccontextmanager
 from contextvars import ContextVar, Token
-from typing import AsyncGenerator
+from dataclasses import dataclass
+from typing import AsyncGenerator, List, Optional, Set
 from typing import Callable, Awaitable, Any
 
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
+    AsyncEngine,
     AsyncSession,
     async_scoped_session,
     create_async_engine,
     async_sessionmaker,
 )
-from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
 
 from app.core.metrics import (
-    DB_SESSIONS,
     DB_SESSION_DURATION,
-    DB_ACTIVE_SESSIONS,
-    DB_ERRORS
+    DB_ERRORS,
+    DB_READ_ROUTING,
+    DB_REPLICA_LAG,
+    DB_TRANSACTION_RETRIES,
+    DB_TRANSACTION_RETRIES_EXHAUSTED,
 )
+from app.core.pool import InstrumentedQueuePool, instrument_pool
+from app.core.session_tracker import SessionTracker, TrackedAsyncSession
 from app.logger.logger import get_logger
 from app.models import BaseModel
 
@@ -42,45 +55,282 @@ def reset_session_context(context: Token) -> None:
 
 AsyncCallable = Callable[..., Awaitable]
 
+# 当前只读会话选定的副本，None 表示使用主库
+_read_engine: ContextVar[Optional[AsyncEngine]] = ContextVar("read_engine", default=None)
+# 当前是否在 transaction() 中，事务内的读取始终使用主库以读到本事务的写入
+_in_transaction: ContextVar[bool] = ContextVar("in_transaction", default=False)
+# 新建 session 的类型，由 session()、transaction() 设置，仓储直接通过 get_session 创建的为 direct
+_session_type: ContextVar[str] = ContextVar("session_type", default="direct")
+
+# MySQL 死锁(1213)、锁等待超时(1205)
+_MYSQL_RETRYABLE_ERRORS = {1213, 1205}
+# PostgreSQL 序列化失败(40001)、死锁(40P01)
+_POSTGRES_RETRYABLE_STATES = {"40001", "40P01"}
+
+
+def is_retryable_error(error: Optional[BaseException]) -> bool:
+    """
+    判断异常是否为重新执行整个事务即可能成功的数据库错误：死锁、锁等待超时、序列化失败，
+    以及 sqlite 的 database is locked。业务代码将数据库异常转换为其他异常时沿异常链查找
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, DBAPIError) and error.orig is not None:
+            orig = error.orig
+            if orig.args and orig.args[0] in _MYSQL_RETRYABLE_ERRORS:
+                return True
+            if getattr(orig, "sqlstate", None) in _POSTGRES_RETRYABLE_STATES:
+                return True
+            if "database is locked" in str(orig):
+                return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class RoutingSession(Session):
+    """读写分离 Session：Database.session() 中的查询路由到选定的副本，写入与其他查询使用主库"""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        engine = _read_engine.get()
+        if engine is not None and not self._flushing and not isinstance(clause, UpdateBase):
+            return engine.sync_engine
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+@dataclass
+class Replica:
+    name: str
+    engine: AsyncEngine
+    # 最近一次检测到的复制延迟(秒)，无法检测时为 None
+    lag: Optional[float] = 0.0
+    healthy: bool = True
+
+    def available(self, max_lag: float) -> bool:
+        return self.healthy and (self.lag is None or self.lag <= max_lag)
+
+
+async def measure_replica_lag(conn: AsyncConnection) -> Optional[float]:
+    """查询副本的复制延迟(秒)，不支持的数据库返回 0"""
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        result = await conn.execute(text(
+            "SELECT CASE WHEN pg_is_in_recovery() "
+            "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) ELSE 0 END"
+        ))
+        return float(result.scalar())
+    if dialect == "mysql":
+        row = (await conn.execute(text("SHOW REPLICA STATUS"))).mappings().first()
+        if row is None:
+            return 0.0
+        lag = row.get("Seconds_Behind_Source")
+        # 复制线程停止时延迟为 NULL，视为不可用
+        return float(lag) if lag is not None else None
+    return 0.0
+
 
 class Database:
-    def __init__(self, db_url: str) -> None:
-        self._engine = create_async_engine(
-            db_url,
-            echo=False,
-            poolclass=AsyncAdaptedQueuePool,
-            pool_pre_ping=True,
-            pool_size=20,
-            max_overflow=10,
-            pool_timeout=30,
+    def __init__(
+            self,
+            db_url: str,
+            replica_urls: Optional[List[str]] = None,
+            replica_strategy: str = "round_robin",
+            replica_max_lag: float = 5.0,
+            replica_check_interval: float = 10.0,
+            pool_size: int = 20,
+            max_overflow: int = 10,
+            pool_timeout: float = 30,
+            pool_recycle: int = -1,
+            pool_pre_ping: bool = True,
+            session_tracker: Optional[SessionTracker] = None,
+            retry_max_attempts: int = 3,
+            retry_base_delay: float = 0.05,
+            retry_max_delay: float = 1.0,
+    ) -> None:
+        """
+        Args:
+            db_url: 主库连接地址
+            replica_urls: 只读副本连接地址，session() 中的查询路由到副本
+            replica_strategy: 副本选择策略，round_robin 轮询或 least_loaded 选择连接占用最少的副本
+            replica_max_lag: 复制延迟超过该值(秒)的副本不参与路由
+            replica_check_interval: 检测副本延迟的间隔(秒)
+            pool_size: 每个引擎连接池保持的连接数
+            max_overflow: 连接池满时最多额外创建的连接数
+            pool_timeout: 等待空闲连接的超时时间(秒)
+            pool_recycle: 连接创建超过该时间(秒)后在下次取出时重建，-1 表示不重建
+            pool_pre_ping: 取出连接时是否先检测连接可用
+            session_tracker: 记录未关闭 session 的跟踪器，用于发现泄漏
+            retry_max_attempts: run_in_transaction 遇到可重试错误时最多执行的次数
+            retry_base_delay: 第一次重试前的最大等待时间(秒)，之后每次翻倍
+            retry_max_delay: 重试前的最大等待时间(秒)
+        """
+        if replica_strategy not in ("round_robin", "least_loaded"):
+            raise ValueError(f"Unsupported replica strategy: {replica_strategy}")
+        self._pool_options = dict(
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+            pool_pre_ping=pool_pre_ping,
         )
-        async_session_factory = async_sessionmaker(
+        self._engine = self._create_engine(db_url, "primary")
+        self._replicas = [
+            Replica(name=f"replica-{i}", engine=self._create_engine(url, f"replica-{i}"))
+            for i, url in enumerate(replica_urls or [])
+        ]
+        self._replica_strategy = replica_strategy
+        self._replica_max_lag = replica_max_lag
+        self._replica_check_interval = replica_check_interval
+        self._replica_counter = itertools.count()
+        self._replicas_checked_at = float("-inf")
+        self._replica_check: Optional[asyncio.Task] = None
+        # 正在关闭的 direct session，保留引用直到关闭完成
+        self._closing: Set[asyncio.Task] = set()
+        self.session_tracker = session_tracker or SessionTracker()
+        self._retry_max_attempts = max(1, retry_max_attempts)
+        self._retry_base_delay = retry_base_delay
+        self._retry_max_delay = retry_max_delay
+        self._session_maker = async_sessionmaker(
             bind=self._engine,
-            class_=AsyncSession,
+            class_=TrackedAsyncSession,
+            sync_session_class=RoutingSession,
             expire_on_commit=False,
             autoflush=False,
         )
         self._session_factory = async_scoped_session(
-            async_session_factory, scopefunc=asyncio.current_task,
+            self._create_session, scopefunc=asyncio.current_task,
+        )
+
+    def _create_session(self, **kwargs: Any) -> AsyncSession:
+        session = self._session_maker(**kwargs)
+        session.tracker = self.session_tracker
+        session_type = _session_type.get()
+        self.session_tracker.register(session, session_type)
+        if session_type == "direct":
+            self._close_with_task(session)
+        return session
+
+    def _close_with_task(self, session: AsyncSession) -> None:
+        """direct session 没有上下文负责关闭，在创建它的任务结束时关闭并从注册表中移除"""
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            return
+        if task is None:
+            return
+
+        def close(_: asyncio.Task) -> None:
+            # 任务结束后不会再通过注册表取得该 session
+            self._session_factory.registry.registry.pop(task, None)
+            try:
+                closing = asyncio.get_running_loop().create_task(session.close())
+            except RuntimeError:
+                return
+            self._closing.add(closing)
+            closing.add_done_callback(self._closing.discard)
+
+        task.add_done_callback(close)
+
+    async def _release_session(self, session: AsyncSession) -> None:
+        """关闭 session 并从当前任务的注册表中移除，避免已结束任务的 session 一直被引用"""
+        await session.close()
+        await self._session_factory.remove()
+
+    def _create_engine(self, db_url: str, name: str) -> AsyncEngine:
+        engine = create_async_engine(
+            db_url,
+            echo=False,
+            poolclass=InstrumentedQueuePool,
+            pool_logging_name=name,
+            **self._pool_options,
         )
+        instrument_pool(engine, name)
+        return engine
+
+    @property
+    def engine(self) -> AsyncEngine:
+        """The shared async engine, for components that work on connections directly."""
+        return self._engine
+
+    @property
+    def replicas(self) -> List[Replica]:
+        return self._replicas
+
+    async def check_replicas(self) -> None:
+        """检测各副本的可用性与复制延迟"""
+        self._replicas_checked_at = time.monotonic()
+
+        async def check(replica: Replica) -> None:
+            try:
+                async with replica.engine.connect() as conn:
+                    replica.lag = await measure_replica_lag(conn)
+                replica.healthy = True
+            except Exception as e:
+                replica.healthy = False
+                logger.warning(f"Replica {replica.name} unavailable: {str(e)}")
+            if replica.lag is not None:
+                DB_REPLICA_LAG.labels(replica=replica.name).set(replica.lag)
+
+        await asyncio.gather(*[check(replica) for replica in self._replicas])
+
+    def _schedule_replica_check(self) -> None:
+        """检测结果过期时在后台检测副本，查询不等待检测，先按上一次的结果路由"""
+        if self._replica_check is not None and not self._replica_check.done():
+            return
+        if time.monotonic() - self._replicas_checked_at < self._replica_check_interval:
+            return
+        self._replicas_checked_at = time.monotonic()
+        self._replica_check = asyncio.create_task(self.check_replicas())
+
+    async def _choose_replica(self) -> Optional[Replica]:
+        """选择处理只读查询的副本，没有可用副本时返回 None，由主库处理"""
+        if not self._replicas:
+            return None
+        self._schedule_replica_check()
+
+        candidates = [replica for replica in self._replicas if replica.available(self._replica_max_lag)]
+        if not candidates:
+            DB_READ_ROUTING.labels(target='primary_fallback').inc()
+            return None
+        if self._replica_strategy == "least_loaded":
+            replica = min(candidates, key=lambda item: item.engine.pool.checkedout())
+        else:
+            replica = candidates[next(self._replica_counter) % len(candidates)]
+        DB_READ_ROUTING.labels(target=replica.name).inc()
+        return replica
 
     def get_session(self) -> AsyncSession:
-        """Get a new session."""
-        DB_SESSIONS.labels(session_type='direct').inc()
-        DB_ACTIVE_SESSIONS.labels(session_type='direct').inc()
+        """
+        Get the current task's session.
+        Inside session()/transaction() this is the context's session; otherwise a
+        'direct' session is created that stays open until a later session() or
+        transaction() in the same task releases it.
+        """
         session = self._session_factory()
-        logger.debug(f"Created new session: {id(session)}")
+        logger.debug(f"Got session: {id(session)}")
         return session
 
     @asynccontextmanager
-    async def session(self) -> AsyncGenerator[AsyncSession, None]:
+    async def session(self, primary: bool = False) -> AsyncGenerator[AsyncSession, None]:
         """
         Context manager for read-only operations.
         Does not start a transaction, suitable for queries.
+        Queries are routed to a replica when replicas are configured;
+        inside transaction() the transaction's session on the primary is reused.
+
+        Args:
+            primary: 查询主库，用于需要读到刚提交的写入的场景
         """
+        if _in_transaction.get():
+            yield self._session_factory()
+            return
 
+        replica = None if primary else await self._choose_replica()
+        routing = _read_engine.set(replica.engine if replica else None)
+        session_type = _session_type.set('read')
         session: AsyncSession = self._session_factory()
-        logger.debug(f"Created read session: {id(session)}")
+        _session_type.reset(session_type)
+        logger.debug(f"Created read session: {id(session)} on {replica.name if replica else 'primary'}")
 
         try:
             with DB_SESSION_DURATION.labels(session_type='read', operation='query').time():
@@ -89,8 +339,8 @@ class Database:
             DB_ERRORS.labels(operation='read', error_type=type(e).__name__).inc()
             raise
         finally:
-            await session.close()
-            DB_ACTIVE_SESSIONS.labels(session_type='read').dec()
+            await self._release_session(session)
+            _read_engine.reset(routing)
             logger.debug(f"Closed read session: {id(session)}")
 
     @asynccontextmanager
@@ -98,11 +348,18 @@ class Database:
         """
         Context manager for transactional operations.
         Automatically handles commit/rollback.
+        Nested calls join the outer transaction, which commits or rolls back.
         """
-        DB_SESSIONS.labels(session_type='transaction').inc()
-        DB_ACTIVE_SESSIONS.labels(session_type='transaction').inc()
+        if _in_transaction.get():
+            yield self._session_factory()
+            return
 
+        # 事务中的读写都使用主库
+        routing = _read_engine.set(None)
+        in_transaction = _in_transaction.set(True)
+        session_type = _session_type.set('transaction')
         session: AsyncSession = self._session_factory()
+        _session_type.reset(session_type)
         logger.debug(f"Created transaction session: {id(session)}")
 
         try:
@@ -128,8 +385,9 @@ class Database:
                 raise
         finally:
             # 确保session总是被关闭
-            await session.close()
-            DB_ACTIVE_SESSIONS.labels(session_type='transaction').dec()
+            await self._release_session(session)
+            _in_transaction.reset(in_transaction)
+            _read_engine.reset(routing)
             logger.debug(f"Closed transaction session: {id(session)}")
 
     async def init_db(self) -> None:
@@ -138,17 +396,54 @@ class Database:
             await conn.run_sync(BaseModel.metadata.create_all)
             logger.info("Database tables created")
 
+    def _retry_delay(self, attempt: int) -> float:
+        """带完全抖动的指数退避，避免冲突的事务同时重试再次冲突"""
+        return random.uniform(0, min(self._retry_max_delay, self._retry_base_delay * 2 ** (attempt - 1)))
+
+    async def run_in_transaction(self, func: AsyncCallable, *args: Any, **kwargs: Any) -> Any:
+        """
+        在事务中执行 func，遇到死锁、锁等待超时、序列化失败时回滚，
+        等待一段时间后重新执行整个事务，最多执行 retry_max_attempts 次
+
+        已在事务中调用时直接在当前事务中执行，由最外层的事务负责重试。
+        func 可能被执行多次，除数据库写入外不应有其他副作用。
+        """
+        if _in_transaction.get():
+            return await func(*args, **kwargs)
+
+        attempt = 1
+        while True:
+            try:
+                async with self.transaction():
+                    return await func(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable_error(e):
+                    raise
+                error_type = type(e).__name__
+                if attempt >= self._retry_max_attempts:
+                    DB_TRANSACTION_RETRIES_EXHAUSTED.labels(error_type=error_type).inc()
+                    raise
+                delay = self._retry_delay(attempt)
+                DB_TRANSACTION_RETRIES.labels(error_type=error_type).inc()
+                logger.warning(
+                    f"Retrying transaction in {delay:.3f}s (attempt {attempt}/{self._retry_max_attempts}): {str(e)}"
+                )
+                await asyncio.sleep(delay)
+                attempt += 1
+
     def transactional(self, func: AsyncCallable) -> AsyncCallable:
         """
         装饰器：为函数提供事务上下文
-        自动处理事务的开始、提交和回滚
+        自动处理事务的开始、提交和回滚，遇到死锁等可重试错误时重新执行
         """
 
         @functools.wraps(func)
         async def wrapper(*args: Any, **kwargs: Any) -> Any:
-            async with self.transaction() as session:
+            async def run() -> Any:
                 # 将 session 注入到 kwargs 中
-                kwargs['session'] = session
+                kwargs['session'] = self.get_session()
                 return await func(*args, **kwargs)
 
+            return await self.run_in_transaction(run)
+
         return wrapper
@@ -41,9 +41,82 @@ DB_ACTIVE_SESSIONS = Gauge(
     registry=REGISTRY
 )
 
+DB_SESSION_LEAKS = Counter(
+    'db_session_leaks_total',
+    'Database sessions held open longer than the leak threshold',
+    ['session_type'],
+    registry=REGISTRY
+)
+
 DB_ERRORS = Counter(
     'db_errors_total',
     'Total number of database errors',
     ['operation', 'error_type'],
     registry=REGISTRY
 )
+
+DB_TRANSACTION_RETRIES = Counter(
+    'db_transaction_retries_total',
+    'Transactions retried after a deadlock, lock wait timeout or serialization failure',
+    ['error_type'],
+    registry=REGISTRY
+)
+
+DB_TRANSACTION_RETRIES_EXHAUSTED = Counter(
+    'db_transaction_retries_exhausted_total',
+    'Transactions that still failed with a retryable error after the last attempt',
+    ['error_type'],
+    registry=REGISTRY
+)
+
+DB_READ_ROUTING = Counter(
+    'db_read_routing_total',
+    'Read-only sessions routed to each replica or falling back to the primary',
+    ['target'],
+    registry=REGISTRY
+)
+
+DB_REPLICA_LAG = Gauge(
+    'db_replica_lag_seconds',
+    'Last measured replication lag of each read replica',
+    ['replica'],
+    registry=REGISTRY
+)
+
+# Connection pool metrics
+DB_POOL_CHECKED_OUT = Gauge(
+    'db_pool_checked_out_connections',
+    'Connections currently checked out of the pool',
+    ['pool'],
+    registry=REGISTRY
+)
+
+DB_POOL_OVERFLOW = Gauge(
+    'db_pool_overflow_connections',
+    'Overflow connections in use beyond pool_size',
+    ['pool'],
+    registry=REGISTRY
+)
+
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    'db_pool_checkout_wait_seconds',
+    'Time spent acquiring a connection from the pool',
+    ['pool'],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30),
+    registry=REGISTRY
+)
+
+DB_POOL_CONNECTION_AGE = Histogram(
+    'db_pool_connection_age_seconds',
+    'Age of pooled connections when they are closed',
+    ['pool'],
+    buckets=(60, 300, 900, 1800, 3600, 7200, 21600, 86400),
+    registry=REGISTRY
+)
+
+DB_POOL_INVALIDATIONS = Counter(
+    'db_pool_invalidations_total',
+    'Pooled connections invalidated after errors or explicit invalidation',
+    ['pool', 'soft'],
+    registry=REGISTRY
+)
@@ -0,0 +1,71 @@
+import time
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry, PoolProxiedConnection
+
+from app.core.metrics import (
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_OVERFLOW,
+    DB_POOL_CHECKOUT_WAIT,
+    DB_POOL_CONNECTION_AGE,
+    DB_POOL_INVALIDATIONS,
+)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """记录连接获取耗时的连接池，耗时包括等待空闲连接与新建连接"""
+
+    def connect(self) -> PoolProxiedConnection:
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            # 连接池以 pool_logging_name 区分主库与各副本，dispose 重建连接池时保持不变
+            DB_POOL_CHECKOUT_WAIT.labels(pool=self._orig_logging_name or "primary").observe(
+                time.perf_counter() - start
+            )
+
+
+def instrument_pool(engine: AsyncEngine, name: str) -> None:
+    """
+    通过连接池事件导出连接池指标
+
+    Args:
+        engine: 数据库引擎
+        name: 指标中的连接池名称
+    """
+    sync_engine = engine.sync_engine
+
+    def update_usage(returning: int = 0) -> None:
+        pool = sync_engine.pool
+        DB_POOL_CHECKED_OUT.labels(pool=name).set(max(pool.checkedout() - returning, 0))
+        DB_POOL_OVERFLOW.labels(pool=name).set(max(pool.overflow(), 0))
+
+    @event.listens_for(sync_engine, "connect")
+    def on_connect(dbapi_connection: Any, record: ConnectionPoolEntry) -> None:
+        record.info["connected_at"] = time.monotonic()
+
+    @event.listens_for(sync_engine, "checkout")
+    def on_checkout(dbapi_connection: Any, record: ConnectionPoolEntry, proxy: PoolProxiedConnection) -> None:
+        update_usage()
+
+    @event.listens_for(sync_engine, "checkin")
+    def on_checkin(dbapi_connection: Any, record: ConnectionPoolEntry) -> None:
+        # checkin 事件在连接放回连接池之前触发
+        update_usage(returning=1)
+
+    @event.listens_for(sync_engine, "close")
+    def on_close(dbapi_connection: Any, record: ConnectionPoolEntry) -> None:
+        connected_at = record.info.pop("connected_at", None)
+        if connected_at is not None:
+            DB_POOL_CONNECTION_AGE.labels(pool=name).observe(time.monotonic() - connected_at)
+
+    @event.listens_for(sync_engine, "invalidate")
+    def on_invalidate(dbapi_connection: Any, record: ConnectionPoolEntry, exception: Any) -> None:
+        DB_POOL_INVALIDATIONS.labels(pool=name, soft="false").inc()
+
+    @event.listens_for(sync_engine, "soft_invalidate")
+    def on_soft_invalidate(dbapi_connection: Any, record: ConnectionPoolEntry, exception: Any) -> None:
+        DB_POOL_INVALIDATIONS.labels(pool=name, soft="true").inc()
@@ -0,0 +1,158 @@
+import asyncio
+import time
+import traceback
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.metrics import DB_SESSIONS, DB_ACTIVE_SESSIONS, DB_SESSION_LEAKS
+from app.logger.logger import get_logger
+
+logger = get_logger(__name__)
+
+_INTERNAL_FRAMES = ("sqlalchemy", "contextlib.py", "session_tracker.py", "core/database.py")
+
+
+@dataclass
+class TrackedSession:
+    session_id: int
+    session_type: str
+    opened_at: datetime
+    started: float
+    task: Optional[str] = None
+    stack: List[str] = field(default_factory=list)
+    reported: bool = False
+
+    def age(self, now: Optional[float] = None) -> float:
+        return (now if now is not None else time.monotonic()) - self.started
+
+    def to_dict(self, leak_threshold: float) -> Dict:
+        age = self.age()
+        return {
+            "session_id": self.session_id,
+            "session_type": self.session_type,
+            "opened_at": self.opened_at.isoformat(),
+            "age_seconds": round(age, 3),
+            "leaked": age >= leak_threshold,
+            "task": self.task,
+            "stack": self.stack,
+        }
+
+
+class SessionTracker:
+    """
+    记录每个未关闭 session 的类型、创建时间与创建位置
+
+    持有时间超过 leak_threshold 的 session 视为泄漏，由后台任务定期检查(有未关闭的 session 时运行)，
+    记录日志(包含创建位置的调用栈)并计入 db_session_leaks_total。活跃 session 数按类型导出到 db_active_sessions。
+    """
+
+    def __init__(
+            self,
+            leak_threshold: float = 30.0,
+            capture_stack: bool = False,
+            stack_depth: int = 12,
+            check_interval: Optional[float] = None,
+    ):
+        """
+        Args:
+            leak_threshold: session 持有超过该时间(秒)视为泄漏
+            capture_stack: 是否记录创建 session 的调用栈
+            stack_depth: 记录的调用栈深度
+            check_interval: 后台检查泄漏的间隔(秒)，默认为 leak_threshold 的一半
+        """
+        self.leak_threshold = leak_threshold
+        self.capture_stack = capture_stack
+        self.stack_depth = stack_depth
+        self.check_interval = check_interval or leak_threshold / 2
+        self._sessions: Dict[int, TrackedSession] = {}
+        self._watchdog: Optional[asyncio.Task] = None
+
+    def _ensure_watchdog(self) -> None:
+        """在当前事件循环中启动后台检查，进程空闲时泄漏的 session 也会被及时记录"""
+        if not _has_running_loop():
+            return
+        loop = asyncio.get_running_loop()
+        if self._watchdog is not None and not self._watchdog.done() and self._watchdog.get_loop() is loop:
+            return
+        self._watchdog = loop.create_task(self._watch())
+
+    async def _watch(self) -> None:
+        # 所有 session 关闭后退出，下一次创建 session 时重新启动
+        while self._sessions:
+            await asyncio.sleep(self.check_interval)
+            self.check_leaks()
+
+    def register(self, session: AsyncSession, session_type: str) -> None:
+        self.check_leaks()
+        self._ensure_watchdog()
+        stack = []
+        if self.capture_stack:
+            # 去掉 SQLAlchemy、contextlib 与 Database 内部的调用帧，只保留业务代码
+            frames = [
+                frame for frame in traceback.extract_stack(limit=self.stack_depth + 16)
+                if not any(part in frame.filename for part in _INTERNAL_FRAMES)
+            ][-self.stack_depth:]
+            stack = [line.rstrip() for line in traceback.format_list(frames)]
+        task = asyncio.current_task() if _has_running_loop() else None
+        self._sessions[id(session)] = TrackedSession(
+            session_id=id(session),
+            session_type=session_type,
+            opened_at=datetime.now(timezone.utc),
+            started=time.monotonic(),
+            task=task.get_name() if task else None,
+            stack=stack,
+        )
+        DB_SESSIONS.labels(session_type=session_type).inc()
+        DB_ACTIVE_SESSIONS.labels(session_type=session_type).inc()
+
+    def release(self, session: AsyncSession) -> None:
+        tracked = self._sessions.pop(id(session), None)
+        if tracked is not None:
+            DB_ACTIVE_SESSIONS.labels(session_type=tracked.session_type).dec()
+
+    def live(self) -> List[TrackedSession]:
+        """按持有时间从长到短返回未关闭的 session"""
+        return sorted(self._sessions.values(), key=lambda item: item.started)
+
+    def leaked(self) -> List[TrackedSession]:
+        now = time.monotonic()
+        return [item for item in self.live() if item.age(now) >= self.leak_threshold]
+
+    def check_leaks(self) -> List[TrackedSession]:
+        """记录新发现的泄漏 session，每个 session 只记录一次"""
+        leaked = [item for item in self.leaked() if not item.reported]
+        for item in leaked:
+            item.reported = True
+            DB_SESSION_LEAKS.labels(session_type=item.session_type).inc()
+            logger.warning(
+                f"Database session {item.session_id} ({item.session_type}) held for {item.age():.1f}s "
+                f"by task {item.task}, opened at:\n" + "\n".join(item.stack)
+            )
+        return leaked
+
+    def snapshot(self) -> List[Dict]:
+        return [item.to_dict(self.leak_threshold) for item in self.live()]
+
+
+def _has_running_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+class TrackedAsyncSession(AsyncSession):
+    """关闭时通知 SessionTracker 的 AsyncSession"""
+
+    tracker: Optional[SessionTracker] = None
+
+    async def close(self) -> None:
+        try:
+            await super().close()
+        finally:
+            if self.tracker is not None:
+                self.tracker.release(self)
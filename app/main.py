@@ -130,7 +130,7 @@ def create_app() -> FastAPI:
     app.add_middleware(MetricsMiddleware)
 
     # 注册路由
-    _register_routers(app)
+    _register_routers(app, debug=container.settings().API.DEBUG)
 
     # 注册异常处理器
     register_exception_handlers(app)
@@ -142,9 +142,9 @@ def create_app() -> FastAPI:
     return app
 
 
-def _register_routers(app: FastAPI) -> None:
+def _register_routers(app: FastAPI, debug: bool = False) -> None:
     """
-    注册所有路由模块
+    注册所有路由模块，debug 为 True 时同时注册调试接口
     """
     app.include_router(users.router)
     app.include_router(transactions.router)
@@ -156,6 +156,8 @@ def _register_routers(app: FastAPI) -> None:
     app.include_router(dataset.router)
     app.include_router(chat.router)
     app.include_router(monitoring.router)
+    if debug:
+        app.include_router(monitoring.debug_router)
     app.include_router(auth.router)
 
 
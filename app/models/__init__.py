@@ -5,5 +5,11 @@ from .user import User
 from .workspace import Workspace
 from .resource import Resource
 from .dataset import Dataset
+from .chunk import ResourceChunk, ResourceChunkVector
+from .ledger import LedgerEntry, BalanceSnapshot
+from .transfer_batch import TransferBatch
+from .idempotency_key import IdempotencyKey
 
-__all__ = ["User", "Account", "Order", "BaseModel", "Workspace", "Resource", "Dataset"]
+__all__ = ["User", "Account", "Order", "BaseModel", "Workspace", "Resource", "Dataset", "ResourceChunk",
+           "ResourceChunkVector", "LedgerEntry", "BalanceSnapshot",
+           "TransferBatch", "IdempotencyKey"]
@@ -0,0 +1,53 @@
+import uuid
+
+from sqlmodel import Field, Column, String, CHAR, UniqueConstraint
+
+from .base import BaseModel
+
+
+class ResourceChunk(BaseModel, table=True):
+    """资源分块清单，记录每个资源已入库的分块"""
+    __tablename__ = "resource_chunks"
+
+    __table_args__ = (UniqueConstraint("resource_id", "chunk_id"),)
+
+    resource_id: uuid.UUID = Field(
+        nullable=False,
+        sa_type=CHAR(36),
+        index=True,
+        description="资源ID"
+    )
+    chunk_id: str = Field(
+        sa_column=Column(String(64), nullable=False, comment="分块ID"),
+        description="分块ID"
+    )
+    content_hash: str = Field(
+        sa_column=Column(CHAR(64), nullable=False, comment="分块内容哈希(sha256)"),
+        description="分块内容哈希"
+    )
+
+
+class ResourceChunkVector(BaseModel, table=True):
+    """分块及其派生文档(问题、摘要)在向量库中的向量记录"""
+    __tablename__ = "resource_chunk_vectors"
+
+    __table_args__ = (UniqueConstraint("resource_id", "collection_name", "vector_id"),)
+
+    resource_id: uuid.UUID = Field(
+        nullable=False,
+        sa_type=CHAR(36),
+        index=True,
+        description="资源ID"
+    )
+    chunk_id: str = Field(
+        sa_column=Column(String(64), nullable=False, index=True, comment="分块ID"),
+        description="分块ID"
+    )
+    collection_name: str = Field(
+        sa_column=Column(String(128), nullable=False, comment="向量集合名称"),
+        description="向量集合名称"
+    )
+    vector_id: str = Field(
+        sa_column=Column(String(128), nullable=False, comment="向量ID"),
+        description="向量ID"
+    )
@@ -0,0 +1,30 @@
+from typing import Any
+
+from sqlmodel import Field, Column, String, JSON, UniqueConstraint
+
+from .base import BaseModel
+
+
+class IdempotencyKey(BaseModel, table=True):
+    """已完成的幂等请求，与请求的写操作在同一事务中写入，重复的请求返回记录的响应"""
+    __tablename__ = "idempotency_keys"
+
+    __table_args__ = (UniqueConstraint("scope", "key", name="uq_idempotency_keys_scope_key"),)
+
+    scope: str = Field(
+        sa_column=Column(String(64), nullable=False, comment="接口名称"),
+        description="接口名称"
+    )
+    key: str = Field(
+        sa_column=Column(String(255), nullable=False, comment="客户端提供的幂等键"),
+        description="幂等键"
+    )
+    fingerprint: str = Field(
+        sa_column=Column(String(64), nullable=False, comment="请求内容的指纹"),
+        description="请求内容的指纹"
+    )
+    response: Any = Field(
+        default=None,
+        sa_column=Column(JSON, nullable=True, comment="请求的响应"),
+        description="请求的响应"
+    )
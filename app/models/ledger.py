@@ -0,0 +1,56 @@
+import uuid
+
+from sqlmodel import Field, Column, String, CHAR, Float, Index, UniqueConstraint
+
+from .base import BaseModel
+
+
+class LedgerEntry(BaseModel, table=True):
+    """账户流水，只追加不修改，金额入账为正、出账为负"""
+    __tablename__ = "ledger_entries"
+
+    # uuid7 的 id 按时间递增，按 (account_id, id) 可以直接找到快照之后的流水
+    __table_args__ = (Index("ix_ledger_entries_account_id_id", "account_id", "id"),)
+
+    account_id: uuid.UUID = Field(
+        nullable=False,
+        sa_type=CHAR(36),
+        foreign_key="accounts.id",
+        description="账户ID"
+    )
+    amount: float = Field(
+        sa_column=Column(Float, nullable=False, comment="变动金额"),
+        description="变动金额"
+    )
+    entry_type: str = Field(
+        sa_column=Column(String(32), nullable=False, comment="流水类型"),
+        description="流水类型"
+    )
+    reference: str | None = Field(
+        default=None,
+        sa_column=Column(String(64), nullable=True, index=True, comment="关联业务ID，如转账ID"),
+        description="关联业务ID"
+    )
+
+
+class BalanceSnapshot(BaseModel, table=True):
+    """账户余额快照，余额为截至 last_entry_id(含)的全部流水之和"""
+    __tablename__ = "balance_snapshots"
+
+    __table_args__ = (UniqueConstraint("account_id", "last_entry_id"),)
+
+    account_id: uuid.UUID = Field(
+        nullable=False,
+        sa_type=CHAR(36),
+        foreign_key="accounts.id",
+        index=True,
+        description="账户ID"
+    )
+    balance: float = Field(
+        sa_column=Column(Float, nullable=False, comment="快照余额"),
+        description="快照余额"
+    )
+    last_entry_id: str = Field(
+        sa_column=Column(CHAR(36), nullable=False, comment="快照包含的最后一条流水ID"),
+        description="快照包含的最后一条流水ID"
+    )
@@ -0,0 +1,20 @@
+from typing import List
+
+from sqlmodel import Field, Column, String, JSON
+
+from .base import BaseModel
+
+
+class TransferBatch(BaseModel, table=True):
+    """已执行的批量转账批次，与转账在同一事务中写入，重复执行同一批次时返回记录的结果"""
+    __tablename__ = "transfer_batches"
+
+    batch_key: str = Field(
+        sa_column=Column(String(255), nullable=False, unique=True, comment="批次键，工作流ID与批次序号"),
+        description="批次键"
+    )
+    results: List[dict] = Field(
+        default_factory=list,
+        sa_column=Column(JSON, nullable=False, comment="各笔转账的结果"),
+        description="各笔转账的结果"
+    )
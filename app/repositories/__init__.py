@@ -1,6 +1,8 @@
 from .account import AccountRepository
 from .base import BaseRepository
+from .chunk_manifest import ChunkManifestRepository
 from .dataset import DatasetRepository
+from .ledger import LedgerRepository
 from .order import OrderRepository
 from .resource import ResourceRepository
 from .user import UserRepository
@@ -9,7 +11,9 @@ from .workspace import WorkspaceRepository
 __all__ = [
     "AccountRepository",
     "BaseRepository",
+    "ChunkManifestRepository",
     "DatasetRepository",
+    "LedgerRepository",
     "OrderRepository",
     "ResourceRepository",
     "UserRepository",
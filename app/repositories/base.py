@@ -1,7 +1,8 @@
 import uuid
-from typing import TypeVar, Type, Any, Callable
+from typing import TypeVar, Type, Any, Callable, Dict, Iterator, List, Optional, Sequence
 
-from sqlalchemy import select, func, update as sqlalchemy_update
+from sqlalchemy import select, func, update as sqlalchemy_update, delete as sqlalchemy_delete, inspect, insert, and_, or_
+from sqlalchemy.dialects import mysql, postgresql, sqlite
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
@@ -15,6 +16,12 @@ logger = get_logger(__name__)
 
 T = TypeVar("T", bound=BaseModel)
 
+# 单条 INSERT 语句的绑定参数上限，低于 sqlite(32766) 与 MySQL(65535) 的限制
+MAX_BIND_PARAMS = 30000
+
+# 支持单条语句 upsert 的数据库，其他数据库由 bulk_upsert 先查询再分别插入、更新
+UPSERT_DIALECTS = ("mysql", "postgresql", "sqlite")
+
 
 class BaseRepository:
     def __init__(self, session_or_factory: AsyncSession | Callable[[], AsyncSession], model: Type[T]) -> None:
@@ -101,61 +108,247 @@ class BaseRepository:
             raise DuplicatedError(detail=str(e.orig))
         return instance
 
-    async def update(self, id: uuid.UUID, schema: T):
-        stmt = select(self.model).filter(self.model.id == str(id))
-        result = await self.session.execute(stmt)
-        instance = result.scalars().first()
-        if not instance:
-            raise NotFoundError(detail=f"not found id : {id}")
+    async def _update_by_id(self, id: uuid.UUID, values: dict):
+        """
+        以一条 UPDATE 语句更新并返回更新后的对象，记录不存在时抛出 NotFoundError
 
-        update_stmt = (
+        数据库支持 UPDATE ... RETURNING 时一次往返完成；否则根据影响行数判断记录是否存在
+        (MySQL 方言默认启用 FOUND_ROWS，影响行数为匹配行数)，再查询一次读取更新后的对象。
+        """
+        stmt = (
             sqlalchemy_update(self.model)
-            .where(self.model.id == id)
-            .values(**schema.dict(exclude_none=True))
+            .where(self.model.id == str(id))
+            .values(**values)
         )
+        if self.session.get_bind().dialect.update_returning:
+            result = await self.session.execute(
+                stmt.returning(self.model).execution_options(populate_existing=True)
+            )
+            instance = result.scalars().first()
+            if instance is None:
+                raise NotFoundError(detail=f"not found id : {id}")
+            return instance
 
-        await self.session.execute(update_stmt)
-        await self.session.flush()
-        return await self.read_by_id(id)
-
-    async def update_attr(self, id: uuid.UUID, column: str, value: Any):
-        stmt = select(self.model).filter(self.model.id == str(id))
         result = await self.session.execute(stmt)
-        instance = result.scalars().first()
-        if not instance:
+        if result.rowcount == 0:
             raise NotFoundError(detail=f"not found id : {id}")
-        update_stmt = (
-            sqlalchemy_update(self.model)
-            .where(self.model.id == id)
-            .values({column: value})
+        # updated_at 由 onupdate 在数据库中生成，UPDATE 后 session 中对象的该列已过期，
+        # session.get 总会再查询一次：对象已加载时刷新过期的列，未加载时读取整行
+        return await self.session.get(self.model, str(id))
+
+    def _to_row(self, item: Any) -> Dict[str, Any]:
+        """将模型实例、schema 或字典转换为列值，id、创建时间等未指定的列使用模型默认值"""
+        if not isinstance(item, self.model):
+            values = item if isinstance(item, dict) else item.dict()
+            item = self.model(**values)
+        return {attr.columns[0].key: getattr(item, attr.key) for attr in inspect(self.model).column_attrs}
+
+    @staticmethod
+    def _chunks(rows: List[Dict[str, Any]], chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+        # 同时受绑定参数数量的限制
+        if rows:
+            chunk_size = max(1, min(chunk_size, MAX_BIND_PARAMS // len(rows[0])))
+        for i in range(0, len(rows), chunk_size):
+            yield rows[i:i + chunk_size]
+
+    async def bulk_create(
+            self,
+            items: Sequence[Any],
+            chunk_size: int = 1000,
+            returning: bool = False,
+    ) -> Optional[List[Any]]:
+        """
+        以多行 INSERT 批量创建记录，每批一次往返
+
+        与 create 不同，不会把对象加入 session，也不会刷新数据库生成的列。
+
+        Args:
+            items: 模型实例、schema 或字典
+            chunk_size: 每条 INSERT 语句最多包含的行数
+            returning: 是否返回创建记录的 id
+
+        Returns:
+            returning 为 True 时按输入顺序返回 id，否则返回 None
+        """
+        rows = [self._to_row(item) for item in items]
+        table = self.model.__table__
+        try:
+            for chunk in self._chunks(rows, chunk_size):
+                await self.session.execute(insert(table).values(chunk))
+        except IntegrityError as e:
+            raise DuplicatedError(detail=str(e.orig))
+        # id 由应用生成，无需 RETURNING
+        return [row["id"] for row in rows] if returning else None
+
+    def _upsert_statement(
+            self,
+            chunk: List[Dict[str, Any]],
+            conflict_columns: List[str],
+            update_columns: List[str],
+    ):
+        dialect = self.session.get_bind().dialect.name
+        table = self.model.__table__
+        if dialect == "mysql":
+            # MySQL 在主键或任一唯一键冲突时更新，无法指定冲突列
+            stmt = mysql.insert(table).values(chunk)
+            if not update_columns:
+                # 不更新任何列时将主键赋值为自身；INSERT IGNORE 会把其他错误也降级为警告
+                return stmt.on_duplicate_key_update({
+                    column.name: column for column in table.primary_key.columns
+                })
+            return stmt.on_duplicate_key_update({column: stmt.inserted[column] for column in update_columns})
+        module = postgresql if dialect == "postgresql" else sqlite
+        stmt = module.insert(table).values(chunk)
+        if not update_columns:
+            return stmt.on_conflict_do_nothing(index_elements=conflict_columns)
+        return stmt.on_conflict_do_update(
+            index_elements=conflict_columns,
+            set_={column: stmt.excluded[column] for column in update_columns},
         )
-        await self.session.execute(update_stmt)
-        await self.session.flush()
-        return await self.read_by_id(id)
 
-    async def whole_update(self, id: uuid.UUID, schema: T):
-        stmt = select(self.model).filter(self.model.id == str(id))
-        result = await self.session.execute(stmt)
-        instance = result.scalars().first()
-        if not instance:
-            raise NotFoundError(detail=f"not found id : {str(id)}")
-        update_stmt = (
-            sqlalchemy_update(self.model)
-            .where(self.model.id == id)
-            .values(**schema.dict())
+    async def _upsert_rows(
+            self,
+            chunk: List[Dict[str, Any]],
+            conflict_columns: List[str],
+            update_columns: List[str],
+    ) -> List[Any]:
+        """
+        不支持 upsert 语法的数据库：查询冲突列已存在的记录，逐行更新，其余记录一次插入
+
+        查询与插入之间其他事务插入的冲突记录会导致 IntegrityError
+
+        Returns:
+            按输入顺序返回记录的 id
+        """
+        table = self.model.__table__
+        columns = [table.c[column] for column in conflict_columns]
+        keys = [tuple(row[column] for column in conflict_columns) for row in chunk]
+        result = await self.session.execute(
+            select(table.c.id, *columns).where(or_(*(
+                and_(*(column == value for column, value in zip(columns, key))) for key in set(keys)
+            )))
         )
-        await self.session.execute(update_stmt)
-        await self.session.flush()
-        return await self.read_by_id(id)
+        existing = {tuple(str(value) for value in row[1:]): row[0] for row in result.all()}
+
+        ids: List[Any] = []
+        # 同一批中重复的冲突列只插入一行，以最后一行的值为准
+        inserts: Dict[tuple, Dict[str, Any]] = {}
+        for row, key in zip(chunk, keys):
+            key = tuple(str(value) for value in key)
+            if key in existing:
+                if update_columns:
+                    await self.session.execute(
+                        sqlalchemy_update(table)
+                        .where(table.c.id == existing[key])
+                        .values({column: row[column] for column in update_columns})
+                    )
+                ids.append(existing[key])
+            elif key in inserts:
+                inserts[key].update({column: row[column] for column in update_columns})
+                ids.append(inserts[key]["id"])
+            else:
+                inserts[key] = row
+                ids.append(row["id"])
+        if inserts:
+            await self.session.execute(insert(table).values(list(inserts.values())))
+        return ids
+
+    async def bulk_upsert(
+            self,
+            items: Sequence[Any],
+            conflict_columns: Optional[List[str]] = None,
+            update_columns: Optional[List[str]] = None,
+            chunk_size: int = 1000,
+            returning: bool = False,
+    ) -> Optional[List[Any]]:
+        """
+        批量插入记录，与已有记录冲突时更新
+
+        使用 INSERT ... ON DUPLICATE KEY UPDATE (MySQL) 或 INSERT ... ON CONFLICT DO UPDATE
+        (PostgreSQL、sqlite)，每批一次往返；其他数据库先查询已存在的记录，再分别更新与插入。
+
+        Args:
+            items: 模型实例、schema 或字典
+            conflict_columns: 判断冲突的唯一键列，默认为主键；MySQL 忽略该参数
+            update_columns: 冲突时更新的列，默认为除主键、冲突列与 created_at 外的所有列；
+                为空列表时保留已有记录
+            chunk_size: 每条语句最多包含的行数
+            returning: 是否返回记录的 id
+
+        Returns:
+            returning 为 True 时按输入顺序返回 id，否则返回 None。
+            支持 RETURNING 的数据库返回实际写入或更新的记录 id，其他数据库返回提交的 id
+        """
+        rows = [self._to_row(item) for item in items]
+        table = self.model.__table__
+        conflict_columns = conflict_columns or [column.name for column in table.primary_key.columns]
+        if update_columns is None:
+            excluded = {*conflict_columns, *(column.name for column in table.primary_key.columns), "created_at"}
+            update_columns = [column.name for column in table.columns if column.name not in excluded]
+
+        dialect = self.session.get_bind().dialect
+        use_returning = returning and dialect.insert_returning
+        ids: List[Any] = []
+        try:
+            for chunk in self._chunks(rows, chunk_size):
+                if dialect.name not in UPSERT_DIALECTS:
+                    ids.extend(await self._upsert_rows(chunk, conflict_columns, update_columns))
+                    continue
+                stmt = self._upsert_statement(chunk, conflict_columns, update_columns)
+                if not use_returning:
+                    await self.session.execute(stmt)
+                    ids.extend(row["id"] for row in chunk)
+                    continue
+                # RETURNING 的顺序不保证与 VALUES 一致，按冲突列对应回输入顺序
+                stmt = stmt.returning(table.c.id, *[table.c[column] for column in conflict_columns])
+                returned = {
+                    tuple(str(value) for value in row[1:]): row[0]
+                    for row in (await self.session.execute(stmt)).all()
+                }
+                ids.extend(
+                    returned.get(tuple(str(row[column]) for column in conflict_columns), row["id"])
+                    for row in chunk
+                )
+        except IntegrityError as e:
+            raise DuplicatedError(detail=str(e.orig))
+        return ids if returning else None
+
+    async def update(self, id: uuid.UUID, schema: T):
+        return await self._update_by_id(id, schema.dict(exclude_none=True))
+
+    async def update_attr(self, id: uuid.UUID, column: str, value: Any):
+        return await self._update_by_id(id, {column: value})
+
+    async def whole_update(self, id: uuid.UUID, schema: T):
+        return await self._update_by_id(id, schema.dict())
+
+    def _has_delete_cascade(self) -> bool:
+        return any(relationship.cascade.delete for relationship in inspect(self.model).relationships)
 
     async def delete_by_id(self, id: uuid.UUID):
-        stmt = select(self.model).filter(self.model.id == str(id))
-        result = await self.session.execute(stmt)
-        instance = result.scalars().first()
-        if not instance:
+        """
+        删除记录并返回被删除的对象，记录不存在时抛出 NotFoundError
+
+        数据库支持 DELETE ... RETURNING 时一次往返完成；模型存在级联删除的关系时
+        仍通过 session.delete 删除，以执行 ORM 级联。
+        """
+        if self._has_delete_cascade():
+            instance = await self.read_by_id(id)
+            await self.session.delete(instance)
+            await self.session.flush()
+            return instance
+
+        stmt = sqlalchemy_delete(self.model).where(self.model.id == str(id))
+        if self.session.get_bind().dialect.delete_returning:
+            result = await self.session.execute(stmt.returning(self.model))
+            instance = result.scalars().first()
+        else:
+            # 先从 identity map 或数据库取得对象以便返回
+            instance = await self.session.get(self.model, str(id))
+            if instance is not None:
+                await self.session.execute(stmt)
+        if instance is None:
             raise NotFoundError(detail=f"not found id : {str(id)}")
-        await self.session.delete(instance)
-        await self.session.flush()
         return instance
 
     async def get_multi(
@@ -0,0 +1,139 @@
+import uuid
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.logger import get_logger
+from app.models.chunk import ResourceChunk, ResourceChunkVector
+from app.repositories.base import BaseRepository
+
+logger = get_logger(__name__)
+
+
+class ChunkManifestRepository(BaseRepository):
+    """资源分块清单及分块向量记录"""
+
+    def __init__(self, session_or_factory: AsyncSession | Callable[[], AsyncSession]) -> None:
+        super().__init__(session_or_factory, ResourceChunk)
+        self._vectors = BaseRepository(session_or_factory, ResourceChunkVector)
+
+    async def get_resource_chunks(self, resource_id: uuid.UUID | str) -> Dict[str, str]:
+        """
+        获取资源当前已入库的分块
+
+        Args:
+            resource_id: 资源ID
+
+        Returns:
+            分块ID到内容哈希的映射
+        """
+        result = await self.session.execute(
+            select(ResourceChunk.chunk_id, ResourceChunk.content_hash)
+            .where(ResourceChunk.resource_id == str(resource_id))
+        )
+        return dict(result.all())
+
+    async def add_chunks(self, resource_id: uuid.UUID | str, chunks: Dict[str, str]) -> None:
+        """
+        批量写入分块清单
+
+        Args:
+            resource_id: 资源ID
+            chunks: 分块ID到内容哈希的映射
+        """
+        if not chunks:
+            return
+        await self.bulk_create([
+            ResourceChunk(resource_id=str(resource_id), chunk_id=chunk_id, content_hash=content_hash)
+            for chunk_id, content_hash in chunks.items()
+        ])
+
+    async def delete_chunks(self, resource_id: uuid.UUID | str, chunk_ids: Sequence[str]) -> None:
+        """
+        删除分块清单及其向量记录
+
+        Args:
+            resource_id: 资源ID
+            chunk_ids: 分块ID列表
+        """
+        if not chunk_ids:
+            return
+        for model in (ResourceChunkVector, ResourceChunk):
+            await self.session.execute(
+                delete(model).where(
+                    model.resource_id == str(resource_id),
+                    model.chunk_id.in_(chunk_ids),
+                )
+            )
+        await self.session.flush()
+
+    async def add_vectors(
+            self,
+            resource_id: uuid.UUID | str,
+            collection_name: str,
+            vectors: Sequence[Tuple[str, str]],
+    ) -> None:
+        """
+        记录分块写入向量库后得到的向量ID，已存在的记录会被跳过
+
+        Args:
+            resource_id: 资源ID
+            collection_name: 向量集合名称
+            vectors: (分块ID, 向量ID) 列表
+        """
+        if not vectors:
+            return
+        result = await self.session.execute(
+            select(ResourceChunkVector.vector_id).where(
+                ResourceChunkVector.resource_id == str(resource_id),
+                ResourceChunkVector.collection_name == collection_name,
+                ResourceChunkVector.vector_id.in_([vector_id for _, vector_id in vectors]),
+            )
+        )
+        existing = set(result.scalars().all())
+        # 以向量ID去重，避免同一批次中的重复记录违反唯一约束
+        new_vectors = {
+            vector_id: chunk_id
+            for chunk_id, vector_id in vectors
+            if vector_id not in existing
+        }
+        if not new_vectors:
+            return
+        await self._vectors.bulk_create([
+            ResourceChunkVector(
+                resource_id=str(resource_id),
+                chunk_id=chunk_id,
+                collection_name=collection_name,
+                vector_id=vector_id,
+            )
+            for vector_id, chunk_id in new_vectors.items()
+        ])
+
+    async def get_vectors(
+            self,
+            resource_id: uuid.UUID | str,
+            chunk_ids: Sequence[str],
+    ) -> Dict[str, List[str]]:
+        """
+        获取分块对应的向量ID
+
+        Args:
+            resource_id: 资源ID
+            chunk_ids: 分块ID列表
+
+        Returns:
+            向量集合名称到向量ID列表的映射
+        """
+        if not chunk_ids:
+            return {}
+        result = await self.session.execute(
+            select(ResourceChunkVector.collection_name, ResourceChunkVector.vector_id).where(
+                ResourceChunkVector.resource_id == str(resource_id),
+                ResourceChunkVector.chunk_id.in_(chunk_ids),
+            )
+        )
+        vectors: Dict[str, List[str]] = {}
+        for collection_name, vector_id in result.all():
+            vectors.setdefault(collection_name, []).append(vector_id)
+        return vectors
@@ -0,0 +1,111 @@
+import uuid
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import select, func, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Account
+from app.models.ledger import BalanceSnapshot, LedgerEntry
+from app.repositories.base import BaseRepository
+
+
+class LedgerRepository(BaseRepository):
+    """账户流水与余额快照"""
+
+    def __init__(self, session_or_factory: AsyncSession | Callable[[], AsyncSession]) -> None:
+        super().__init__(session_or_factory, LedgerEntry)
+        self._snapshots = BaseRepository(session_or_factory, BalanceSnapshot)
+
+    async def lock_account(self, account_id: uuid.UUID | str) -> bool:
+        """
+        锁定账户行，用于串行化同一账户的出账
+
+        Returns:
+            账户是否存在
+        """
+        result = await self.session.execute(
+            select(Account.id).where(Account.id == str(account_id)).with_for_update()
+        )
+        return result.scalar_one_or_none() is not None
+
+    async def lock_accounts(self, account_ids: Sequence[str]) -> Set[str]:
+        """
+        按ID顺序锁定多个账户行，避免批量转账之间互相等待对方持有的行锁导致死锁
+
+        Returns:
+            存在的账户ID
+        """
+        result = await self.session.execute(
+            select(Account.id).where(Account.id.in_(account_ids)).order_by(Account.id).with_for_update()
+        )
+        return {str(account_id) for account_id in result.scalars().all()}
+
+    async def existing_accounts(self, account_ids: Sequence[str]) -> Set[str]:
+        result = await self.session.execute(select(Account.id).where(Account.id.in_(account_ids)))
+        return {str(account_id) for account_id in result.scalars().all()}
+
+    def _latest_snapshots(self, account_ids: Sequence[str]):
+        """各账户最新快照的子查询，快照的 last_entry_id 单调递增"""
+        return (
+            select(
+                BalanceSnapshot.account_id,
+                func.max(BalanceSnapshot.last_entry_id).label("last_entry_id"),
+            )
+            .where(BalanceSnapshot.account_id.in_(account_ids))
+            .group_by(BalanceSnapshot.account_id)
+            .subquery()
+        )
+
+    async def get_snapshots(self, account_ids: Sequence[str]) -> Dict[str, Tuple[float, str]]:
+        """
+        获取各账户的最新快照
+
+        Returns:
+            账户ID到 (快照余额, 快照包含的最后一条流水ID) 的映射，没有快照的账户不包含在内
+        """
+        latest = self._latest_snapshots(account_ids)
+        result = await self.session.execute(
+            select(BalanceSnapshot.account_id, BalanceSnapshot.balance, BalanceSnapshot.last_entry_id)
+            .join(latest, and_(
+                BalanceSnapshot.account_id == latest.c.account_id,
+                BalanceSnapshot.last_entry_id == latest.c.last_entry_id,
+            ))
+        )
+        return {str(account_id): (balance, last_entry_id) for account_id, balance, last_entry_id in result.all()}
+
+    async def sum_entries_after_snapshot(
+            self,
+            account_ids: Sequence[str],
+            before: Optional[str] = None,
+    ) -> Dict[str, Tuple[float, str]]:
+        """
+        汇总各账户最新快照之后的流水
+
+        Args:
+            account_ids: 账户ID列表
+            before: 只汇总 id 小于该值的流水
+
+        Returns:
+            账户ID到 (流水金额之和, 最后一条流水ID) 的映射，没有新流水的账户不包含在内
+        """
+        latest = self._latest_snapshots(account_ids)
+        stmt = (
+            select(LedgerEntry.account_id, func.sum(LedgerEntry.amount), func.max(LedgerEntry.id))
+            .outerjoin(latest, LedgerEntry.account_id == latest.c.account_id)
+            .where(
+                LedgerEntry.account_id.in_(account_ids),
+                or_(latest.c.last_entry_id.is_(None), LedgerEntry.id > latest.c.last_entry_id),
+            )
+            .group_by(LedgerEntry.account_id)
+        )
+        if before is not None:
+            stmt = stmt.where(LedgerEntry.id < before)
+        result = await self.session.execute(stmt)
+        return {str(account_id): (total, str(last_id)) for account_id, total, last_id in result.all()}
+
+    async def accounts_with_entries(self) -> List[str]:
+        result = await self.session.execute(select(LedgerEntry.account_id).distinct())
+        return [str(account_id) for account_id in result.scalars().all()]
+
+    async def add_snapshots(self, snapshots: Sequence[BalanceSnapshot]) -> None:
+        await self._snapshots.bulk_create(snapshots)
@@ -1,12 +1,20 @@
+import asyncio
+import json
 import uuid
+from datetime import datetime, timezone
+from typing import Tuple
 
 from dependency_injector.wiring import inject, Provide
-from fastapi import APIRouter, Depends
-from temporalio.client import Client
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from temporalio.client import Client, WorkflowExecutionDescription, WorkflowExecutionStatus, WorkflowFailureError, \
+    WorkflowHandle, WorkflowQueryFailedError
+from temporalio.service import RPCError, RPCStatusCode
 
 from app.core.containers import Container
+from app.core.exceptions import NotFoundError
 from app.logger.logger import get_logger
-from app.schemas.dsl import DSLRequest
+from app.schemas.dsl import DSLRequest, DSLWorkflowProgress, DSLWorkflowStatus, DSLWorkflowSubmitted
 from app.settings import TemporalSettings
 from app.workflows.dsl.workflows import DSLWorkflow
 
@@ -18,18 +26,18 @@ router = APIRouter(
 logger = get_logger(__name__)
 
 
-@router.post("/workflows/dsl")
+@router.post("/workflows/dsl", deprecated=True)
 @inject
 async def create_dsl_workflow(
         dsl_request: DSLRequest,
         client: Client = Depends(Provide[Container.clients.temporal_client]),
         settings: TemporalSettings = Depends(Provide[Container.settings.provided.TEMPORAL]),
 ):
-    """创建并执行 DSL 工作流"""
+    """创建并执行 DSL 工作流，等待执行完成后返回，长时间运行的工作流请使用 POST /dsl/workflows"""
     workflow_id = str(uuid.uuid4())
 
     # 转换请求为工作流输入
-    dsl_input = dsl_request.to_dsl_input()
+    dsl_input = dsl_request.to_dsl_input(task_queues=settings.DSL_ACTIVITY_QUEUES)
 
     # 启动工作流
     result = await client.execute_workflow(
@@ -40,3 +48,125 @@ async def create_dsl_workflow(
     )
 
     return {"workflow_id": workflow_id, "result": result}
+
+
+@router.post("/workflows", response_model=DSLWorkflowSubmitted, status_code=202)
+@inject
+async def submit_dsl_workflow(
+        dsl_request: DSLRequest,
+        client: Client = Depends(Provide[Container.clients.temporal_client]),
+        settings: TemporalSettings = Depends(Provide[Container.settings.provided.TEMPORAL]),
+):
+    """提交 DSL 工作流后立即返回，通过状态、进度接口查询执行情况"""
+    handle = await client.start_workflow(
+        DSLWorkflow.run,
+        dsl_request.to_dsl_input(task_queues=settings.DSL_ACTIVITY_QUEUES),
+        id=str(uuid.uuid4()),
+        task_queue=settings.DSL_QUEUE,
+    )
+    logger.info(f"submitted dsl workflow {handle.id}")
+    return DSLWorkflowSubmitted(workflow_id=handle.id)
+
+
+async def _describe(client: Client, workflow_id: str) -> Tuple[WorkflowHandle, WorkflowExecutionDescription]:
+    handle = client.get_workflow_handle(workflow_id)
+    try:
+        return handle, await handle.describe()
+    except RPCError as e:
+        if e.status == RPCStatusCode.NOT_FOUND:
+            raise NotFoundError(detail=f"Workflow {workflow_id} not found")
+        raise
+
+
+def _status_name(description: WorkflowExecutionDescription) -> str:
+    return description.status.name if description.status else "UNKNOWN"
+
+
+async def _progress(
+        handle: WorkflowHandle,
+        description: WorkflowExecutionDescription,
+) -> DSLWorkflowProgress:
+    progress = await handle.query(DSLWorkflow.progress)
+    # 已结束的工作流按结束时间计算耗时
+    now = description.close_time or datetime.now(timezone.utc)
+    return DSLWorkflowProgress.from_progress(handle.id, _status_name(description), progress, now)
+
+
+@router.get("/workflows/{workflow_id}", response_model=DSLWorkflowStatus)
+@inject
+async def get_dsl_workflow_status(
+        workflow_id: str,
+        include_result: bool = Query(False, description="是否返回已完成工作流的全部变量"),
+        client: Client = Depends(Provide[Container.clients.temporal_client]),
+):
+    """查询 DSL 工作流状态"""
+    handle, description = await _describe(client, workflow_id)
+    status = DSLWorkflowStatus(
+        workflow_id=workflow_id,
+        status=_status_name(description),
+        start_time=description.start_time,
+        close_time=description.close_time,
+    )
+    if description.status == WorkflowExecutionStatus.COMPLETED and include_result:
+        status.result = await handle.result()
+    elif description.status == WorkflowExecutionStatus.FAILED:
+        try:
+            await handle.result()
+        except WorkflowFailureError as e:
+            status.error = str(e.cause)
+    return status
+
+
+@router.get("/workflows/{workflow_id}/progress", response_model=DSLWorkflowProgress)
+@inject
+async def get_dsl_workflow_progress(
+        workflow_id: str,
+        client: Client = Depends(Provide[Container.clients.temporal_client]),
+):
+    """查询 DSL 工作流进度：正在执行的阶段、已处理的分块数与预计剩余时间"""
+    handle, description = await _describe(client, workflow_id)
+    return await _progress(handle, description)
+
+
+def _error_event(error: Exception) -> str:
+    return f"event: error\ndata: {json.dumps({'detail': str(error)})}\n\n"
+
+
+@router.get("/workflows/{workflow_id}/events")
+@inject
+async def stream_dsl_workflow_progress(
+        workflow_id: str,
+        interval: float = Query(2.0, gt=0, le=60, description="推送间隔(秒)"),
+        client: Client = Depends(Provide[Container.clients.temporal_client]),
+):
+    """
+    以 SSE 推送 DSL 工作流进度，工作流结束后推送最后一次进度并关闭连接
+
+    查询进度失败时推送 error 事件并关闭连接
+    """
+    handle, description = await _describe(client, workflow_id)
+
+    async def event_generator():
+        nonlocal description
+        while True:
+            try:
+                progress = await _progress(handle, description)
+            except (WorkflowQueryFailedError, RPCError) as e:
+                logger.warning(f"failed to query progress of dsl workflow {workflow_id}: {str(e)}")
+                yield _error_event(e)
+                return
+            yield f"data: {progress.model_dump_json()}\n\n"
+            if description.status != WorkflowExecutionStatus.RUNNING:
+                return
+            await asyncio.sleep(interval)
+            try:
+                description = await handle.describe()
+            except RPCError as e:
+                logger.warning(f"failed to describe dsl workflow {workflow_id}: {str(e)}")
+                yield _error_event(e)
+                return
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream"
+    )
@@ -1,7 +1,11 @@
 import prometheus_client
-from fastapi import APIRouter
+from dependency_injector.wiring import inject, Provide
+from fastapi import APIRouter, Depends
 from starlette.responses import Response
 
+from app.core.auth import CurrentUser
+from app.core.containers import Container
+from app.core.database import Database
 from app.core.metrics import REGISTRY
 
 router = APIRouter(
@@ -10,6 +14,13 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+# 调试接口，只在 API__DEBUG 开启时注册，且需要登录
+debug_router = APIRouter(
+    prefix="/monitoring",
+    tags=["monitoring"],
+    responses={404: {"description": "Not found"}},
+)
+
 
 @router.get("/metrics")
 async def metrics():
@@ -28,3 +39,28 @@ async def health_check():
     Health check endpoint for kubernetes/service mesh
     """
     return {"status": "healthy"}
+
+
+@debug_router.get("/db/sessions")
+@inject
+async def database_sessions(
+        current_user: CurrentUser,
+        leaked_only: bool = False,
+        db: Database = Depends(Provide[Container.database.db]),
+):
+    """
+    Debug endpoint listing live database sessions with their age and where
+    they were opened, plus connection pool status
+    """
+    tracker = db.session_tracker
+    sessions = tracker.snapshot()
+    if leaked_only:
+        sessions = [item for item in sessions if item["leaked"]]
+    return {
+        "leak_threshold_seconds": tracker.leak_threshold,
+        "pools": {
+            "primary": db.engine.pool.status(),
+            **{replica.name: replica.engine.pool.status() for replica in db.replicas},
+        },
+        "sessions": sessions,
+    }
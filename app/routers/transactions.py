@@ -1,12 +1,14 @@
+from typing import Optional
+
 from dependency_injector.wiring import inject, Provide
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header
 from sqlalchemy import text
 
 from app.core.containers import Container
 from app.core.database import Database
 from app.logger import get_logger
 from app.schemas.transaction import TransactionRequest, TransactionResponse
-from app.services import OrderService
+from app.services import IdempotencyService, OrderService
 
 logger = get_logger(__name__)
 
@@ -21,8 +23,14 @@ router = APIRouter(
 @inject
 async def create_transaction(
         request: TransactionRequest,
+        idempotency_key: Optional[str] = Header(
+            None,
+            alias="Idempotency-Key",
+            description="幂等键，相同幂等键的重试返回第一次请求的响应，不会重复创建用户和订单",
+        ),
         db: Database = Depends(Provide[Container.database.db]),
         order_service: OrderService = Depends(Provide[Container.services.order_service]),
+        idempotency_service: IdempotencyService = Depends(Provide[Container.services.idempotency_service]),
 ):
     """Create a new transaction."""
     # 测试查询 - 使用普通 session
@@ -52,7 +60,10 @@ async def create_transaction(
 
     # 执行实际的业务事务
     logger.info(f"start real business\n\n\n\n")
-    result = await order_service.transaction(request.user_data, request.order_description, request.amount)
-    return TransactionResponse(
-        result=result,
-    )
+    async def create_order() -> TransactionResponse:
+        result = await order_service.transaction(request.user_data, request.order_description, request.amount)
+        return TransactionResponse(
+            result=result,
+        )
+
+    return await idempotency_service.run_in_transaction("order", idempotency_key, request, create_order)
@@ -1,15 +1,19 @@
 import uuid
+from typing import Any, Optional, Sequence
 
 from dependency_injector.wiring import inject, Provide
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header
 from temporalio.client import Client
-from temporalio.exceptions import TemporalError
+from temporalio.common import WorkflowIDReusePolicy
+from temporalio.exceptions import TemporalError, WorkflowAlreadyStartedError
 
 from app.core.containers import Container
 from app.logger import get_logger
-from app.schemas.transfer import TransferRequest, TransferResponse
+from app.schemas.transfer import BatchTransferRequest, TransferRequest, TransferResponse
 from app.settings import TemporalSettings
-from app.workflows.transfer.workflows import TransferWorkflow
+from app.services import IdempotencyService
+from app.services.transaction import TransferItem
+from app.workflows.transfer.workflows import BatchTransferInput, BatchTransferWorkflow, TransferWorkflow
 
 logger = get_logger(__name__)
 router = APIRouter(
@@ -18,41 +22,124 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+IDEMPOTENCY_KEY = Header(
+    None,
+    alias="Idempotency-Key",
+    description="幂等键，相同幂等键的重试返回第一次请求的响应，并作为工作流ID，不会重复转账",
+)
+
+
+async def _start_workflow(
+        client: Client,
+        workflow,
+        args: Sequence[Any],
+        workflow_id: str,
+        idempotent: bool,
+        task_queue: str,
+) -> None:
+    """启动工作流；带幂等键时工作流ID由幂等键确定，已启动过的工作流不再重复启动"""
+    try:
+        await client.start_workflow(
+            workflow,
+            args=args,
+            id=workflow_id,
+            task_queue=task_queue,
+            id_reuse_policy=(
+                WorkflowIDReusePolicy.REJECT_DUPLICATE if idempotent else WorkflowIDReusePolicy.ALLOW_DUPLICATE
+            ),
+        )
+    except WorkflowAlreadyStartedError:
+        if not idempotent:
+            raise
+        logger.info(f"Workflow {workflow_id} already started for this Idempotency-Key")
+
 
 @router.post("/", response_model=TransferResponse)
 @inject
 async def transfer(
         transfer_request: TransferRequest,
+        idempotency_key: Optional[str] = IDEMPOTENCY_KEY,
         client: Client = Depends(Provide[Container.clients.temporal_client]),
         settings: TemporalSettings = Depends(Provide[Container.settings.provided.TEMPORAL]),
+        idempotency_service: IdempotencyService = Depends(Provide[Container.services.idempotency_service]),
 ):
-    try:
-        # Start workflow with correct arguments
-        workflow_id = str(uuid.uuid4())
-        logger.info(f"Starting transfer workflow: {workflow_id}")
+    async def start() -> TransferResponse:
+        try:
+            # Start workflow with correct arguments
+            workflow_id = f"transfer-{idempotency_key}" if idempotency_key else str(uuid.uuid4())
+            logger.info(f"Starting transfer workflow: {workflow_id}")
 
-        handle = await client.start_workflow(
-            TransferWorkflow.run,
-            args=[transfer_request.from_account, transfer_request.to_account, transfer_request.amount],
-            id=workflow_id,
-            task_queue=settings.TRANSFER_QUEUE,
-        )
+            await _start_workflow(
+                client,
+                TransferWorkflow.run,
+                [transfer_request.from_account, transfer_request.to_account, transfer_request.amount],
+                workflow_id,
+                idempotency_key is not None,
+                settings.TRANSFER_QUEUE,
+            )
 
-        logger.info(f"Transfer initiated: {handle}")
-        return TransferResponse(
-            workflow_id=workflow_id,
-            result={"status": "initiated"},
-            status="pending"
-        )
-    except TemporalError as e:
-        logger.error(f"Temporal workflow error: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to start transfer workflow: {str(e)}"
-        )
-    except Exception as e:
-        logger.error(f"Unexpected error during transfer: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=500,
-            detail=f"Internal server error: {str(e)}"
-        )
+            logger.info(f"Transfer initiated: {workflow_id}")
+            return TransferResponse(
+                workflow_id=workflow_id,
+                result={"status": "initiated"},
+                status="pending"
+            )
+        except TemporalError as e:
+            logger.error(f"Temporal workflow error: {str(e)}", exc_info=True)
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to start transfer workflow: {str(e)}"
+            )
+        except Exception as e:
+            logger.error(f"Unexpected error during transfer: {str(e)}", exc_info=True)
+            raise HTTPException(
+                status_code=500,
+                detail=f"Internal server error: {str(e)}"
+            )
+
+    return await idempotency_service.run("transfer", idempotency_key, transfer_request, start)
+
+
+@router.post("/batch", response_model=TransferResponse)
+@inject
+async def batch_transfer(
+        batch_request: BatchTransferRequest,
+        idempotency_key: Optional[str] = IDEMPOTENCY_KEY,
+        client: Client = Depends(Provide[Container.clients.temporal_client]),
+        settings: TemporalSettings = Depends(Provide[Container.settings.provided.TEMPORAL]),
+        idempotency_service: IdempotencyService = Depends(Provide[Container.services.idempotency_service]),
+):
+    """提交一批转账，由一个工作流分批轧差执行，通过工作流结果查询每笔转账的结果"""
+    async def start() -> TransferResponse:
+        try:
+            workflow_id = f"batch-transfer-{idempotency_key}" if idempotency_key else str(uuid.uuid4())
+            logger.info(f"Starting batch transfer workflow: {workflow_id} ({len(batch_request.transfers)} transfers)")
+
+            await _start_workflow(
+                client,
+                BatchTransferWorkflow.run,
+                [BatchTransferInput(
+                    transfers=[
+                        TransferItem(str(item.from_account), str(item.to_account), item.amount)
+                        for item in batch_request.transfers
+                    ],
+                    batch_size=settings.TRANSFER_BATCH_SIZE,
+                )],
+                workflow_id,
+                idempotency_key is not None,
+                settings.TRANSFER_QUEUE,
+            )
+
+            return TransferResponse(
+                workflow_id=workflow_id,
+                result={"status": "initiated", "total": len(batch_request.transfers)},
+                status="pending"
+            )
+        except TemporalError as e:
+            logger.error(f"Temporal workflow error: {str(e)}", exc_info=True)
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to start batch transfer workflow: {str(e)}"
+            )
+
+    return await idempotency_service.run("batch_transfer", idempotency_key, batch_request, start)
@@ -1,12 +1,28 @@
-from typing import Dict, List, Any
+from datetime import datetime
+from typing import Dict, List, Any, Optional
 
 from pydantic import BaseModel, Field
 
 
+class RetryDefinition(BaseModel):
+    initial_interval: float = Field(1, gt=0, description="首次重试间隔(秒)")
+    backoff_coefficient: float = Field(2.0, ge=1, description="重试间隔增长系数")
+    maximum_interval: Optional[float] = Field(None, gt=0, description="最大重试间隔(秒)")
+    maximum_attempts: int = Field(0, ge=0, description="最大尝试次数，0 表示不限制")
+    non_retryable_error_types: Optional[List[str]] = Field(None, description="不重试的错误类型")
+
+
 class ActivityDefinition(BaseModel):
     name: str
     arguments: List[str]
     result: str
+    start_to_close_timeout: Optional[float] = Field(None, gt=0, description="单次执行超时(秒)")
+    schedule_to_close_timeout: Optional[float] = Field(None, gt=0, description="包括重试在内的总超时(秒)")
+    heartbeat_timeout: Optional[float] = Field(None, gt=0, description="心跳超时(秒)")
+    retry: Optional[RetryDefinition] = Field(None, description="重试策略")
+    task_queue: Optional[str] = Field(
+        None, description="activity 类型(parse、llm、embed、store)或任务队列名，默认按 activity 名称与转换器类型确定类型"
+    )
 
 
 class Activity(BaseModel):
@@ -29,6 +45,37 @@ class Parallel(BaseModel):
     parallel: ParallelBranches
 
 
+class ForeachDefinition(BaseModel):
+    items: str = Field(..., description="要遍历的列表变量名")
+    item: str = Field(..., description="每次迭代中当前项(或当前批)的变量名")
+    body: Dict[str, Any] = Field(..., description="每次迭代执行的语句")
+    max_concurrency: int = Field(0, ge=0, description="同时执行的迭代数，0 表示不限制")
+    batch_size: int = Field(1, ge=1, description="每次迭代处理的项数，大于 1 时 item 为列表")
+    collect: Optional[str] = Field(None, description="每次迭代结束后收集的变量名")
+    result: Optional[str] = Field(None, description="收集结果按输入顺序写入的变量名")
+    flatten: bool = Field(False, description="是否将收集到的列表展开合并")
+
+
+class Foreach(BaseModel):
+    foreach: ForeachDefinition
+
+
+class ShardDefinition(BaseModel):
+    total: str = Field(..., description="要分片的项数所在的变量名，如文档数")
+    item: str = Field(..., description="每个分片子工作流中当前分片范围的变量名，值为 {offset, limit}")
+    body: Dict[str, Any] = Field(..., description="每个分片子工作流执行的语句")
+    shard_size: int = Field(100, ge=1, description="每个分片包含的项数")
+    max_concurrency: int = Field(0, ge=0, description="同时执行的分片数，0 表示不限制")
+    max_shards_per_run: int = Field(100, ge=1, description="协调工作流 continue-as-new 前最多启动的分片数")
+    variables: Optional[List[str]] = Field(None, description="传递给分片的变量名，默认为全部变量")
+    collect: Optional[str] = Field(None, description="每个分片结束后统计数量的变量名，列表按长度计")
+    result: Optional[str] = Field(None, description="各分片数量之和写入的变量名")
+
+
+class Shard(BaseModel):
+    shard: ShardDefinition
+
+
 class RootDefinition(BaseModel):
     sequence: SequenceDefinition
 
@@ -177,47 +224,128 @@ class DSLRequest(BaseModel):
         }]
     )
 
-    def to_dsl_input(self) -> "DSLInput":
+    def to_dsl_input(self, task_queues: Optional[Dict[str, str]] = None) -> "DSLInput":
         """将 DSLRequest 转换为 DSLInput"""
         from app.workflows.dsl.workflows import DSLInput, ActivityStatement, ActivityInvocation, \
-            SequenceStatement, Sequence, ParallelStatement, Parallel
+            SequenceStatement, Sequence, ParallelStatement, Parallel, ForeachStatement, Foreach, ShardStatement, Shard, Statement, RetryOptions
 
         def convert_activity(act_def: Dict[str, Any]) -> ActivityStatement:
+            definition = ActivityDefinition(**{"result": "", **act_def})
             return ActivityStatement(
                 activity=ActivityInvocation(
-                    name=act_def["name"],
-                    arguments=act_def["arguments"],
-                    result=act_def.get("result", ""),
+                    **definition.model_dump(exclude={"retry"}),
+                    retry=RetryOptions(**definition.retry.model_dump()) if definition.retry else None,
                 )
             )
 
+        def convert_statement(stmt_def: Dict[str, Any]) -> Statement:
+            if "activity" in stmt_def:
+                return convert_activity(stmt_def["activity"])
+            if "parallel" in stmt_def:
+                return convert_parallel(stmt_def["parallel"])
+            if "sequence" in stmt_def:
+                return convert_sequence(stmt_def["sequence"])
+            if "foreach" in stmt_def:
+                return convert_foreach(stmt_def["foreach"])
+            if "shard" in stmt_def:
+                return convert_shard(stmt_def["shard"])
+            raise ValueError(f"不支持的语句: {list(stmt_def)}")
+
         def convert_sequence(seq_def: Dict[str, Any]) -> SequenceStatement:
-            elements = []
-            for elem in seq_def["elements"]:
-                if "activity" in elem:
-                    elements.append(convert_activity(elem["activity"]))
-                elif "parallel" in elem:
-                    elements.append(convert_parallel(elem["parallel"]))
-                elif "sequence" in elem:
-                    elements.append(convert_sequence(elem["sequence"]))
-            return SequenceStatement(sequence=Sequence(elements=elements))
+            return SequenceStatement(
+                sequence=Sequence(elements=[convert_statement(elem) for elem in seq_def["elements"]])
+            )
 
         def convert_parallel(par_def: Dict[str, Any]) -> ParallelStatement:
-            branches = []
-            for branch in par_def["branches"]:
-                if "sequence" in branch:
-                    branches.append(convert_sequence(branch["sequence"]))
-                elif "activity" in branch:
-                    branches.append(convert_activity(branch["activity"]))
-                elif "parallel" in branch:
-                    branches.append(convert_parallel(branch["parallel"]))
+            return ParallelStatement(
+                parallel=Parallel(branches=[convert_statement(branch) for branch in par_def["branches"]])
+            )
 
-            return ParallelStatement(parallel=Parallel(branches=branches))
+        def convert_foreach(foreach_def: Dict[str, Any]) -> ForeachStatement:
+            definition = ForeachDefinition(**foreach_def)
+            return ForeachStatement(
+                foreach=Foreach(
+                    items=definition.items,
+                    item=definition.item,
+                    body=convert_statement(definition.body),
+                    max_concurrency=definition.max_concurrency,
+                    batch_size=definition.batch_size,
+                    collect=definition.collect,
+                    result=definition.result,
+                    flatten=definition.flatten,
+                )
+            )
+
+        def convert_shard(shard_def: Dict[str, Any]) -> ShardStatement:
+            definition = ShardDefinition(**shard_def)
+            return ShardStatement(
+                shard=Shard(
+                    **definition.model_dump(exclude={"body"}),
+                    body=convert_statement(definition.body),
+                )
+            )
 
         # 转换根节点
-        root_statement = convert_sequence(self.root.sequence.dict())
+        root_statement = convert_sequence(self.root.sequence.model_dump())
 
         return DSLInput(
             root=root_statement,
-            variables=self.variables
+            variables=self.variables,
+            task_queues=dict(task_queues or {}),
+        )
+
+
+class DSLWorkflowSubmitted(BaseModel):
+    """DSL 工作流提交结果"""
+    workflow_id: str
+
+
+class DSLWorkflowStatus(BaseModel):
+    """DSL 工作流状态"""
+    workflow_id: str
+    status: str
+    start_time: Optional[datetime] = None
+    close_time: Optional[datetime] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+
+class DSLWorkflowProgress(BaseModel):
+    """DSL 工作流进度"""
+    workflow_id: str
+    status: str
+    stage: List[str] = Field(default_factory=list, description="正在执行的 activity")
+    completed_activities: int = 0
+    total_activities: int = 0
+    processed_items: int = Field(0, description="foreach、shard 已处理的项数，如分块数")
+    total_items: int = 0
+    elapsed_seconds: float = 0
+    eta_seconds: Optional[float] = Field(None, description="按已完成 activity 的比例估算的剩余时间")
+
+    @classmethod
+    def from_progress(
+            cls,
+            workflow_id: str,
+            status: str,
+            progress: "DSLProgress",
+            now: datetime,
+    ) -> "DSLWorkflowProgress":
+        elapsed = (now - progress.started_at).total_seconds() if progress.started_at else 0
+        eta = None
+        if progress.total_activities:
+            fraction = min(progress.completed_activities / progress.total_activities, 1)
+            if fraction >= 1:
+                eta = 0
+            elif fraction > 0:
+                eta = elapsed * (1 - fraction) / fraction
+        return cls(
+            workflow_id=workflow_id,
+            status=status,
+            stage=list(progress.running),
+            completed_activities=progress.completed_activities,
+            total_activities=progress.total_activities,
+            processed_items=progress.processed_items,
+            total_items=progress.total_items,
+            elapsed_seconds=elapsed,
+            eta_seconds=eta,
         )
@@ -1,5 +1,7 @@
 import uuid
 
+from typing import List
+
 from pydantic import BaseModel, Field
 
 
@@ -9,6 +11,10 @@ class TransferRequest(BaseModel):
     amount: float = Field(..., gt=0, description="Amount to transfer")
 
 
+class BatchTransferRequest(BaseModel):
+    transfers: List[TransferRequest] = Field(..., min_length=1, description="Transfers, applied in order")
+
+
 class TransferResponse(BaseModel):
     workflow_id: str
     result: dict | None = None
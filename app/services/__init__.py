@@ -1,7 +1,10 @@
 from .auth import AuthService
 from .chat import ChatService
+from .chunk_manifest import ChunkManifestService
 from .dataset import DatasetService
-from .doc_store import MySQLDocumentStore
+from .doc_store import MySQLDocumentStore, AsyncSQLDocumentStore, CachedDocumentStore
+from .idempotency import IdempotencyService
+from .ledger import LedgerService
 from .order import OrderService
 from .resource import ResourceService
 from .storage import MinioStorageService
@@ -14,10 +17,15 @@ __all__ = [
     "OrderService",
     "UserService",
     "TransactionService",
+    "LedgerService",
+    "IdempotencyService",
     "WorkspaceService",
     "ResourceService",
     "DatasetService",
     "ChatService",
+    "ChunkManifestService",
     "MinioStorageService",
     "MySQLDocumentStore",
+    "AsyncSQLDocumentStore",
+    "CachedDocumentStore",
 ]
@@ -0,0 +1,100 @@
+import uuid
+from typing import Dict, List, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from app.core.database import Database
+from app.logger import get_logger
+from app.repositories.chunk_manifest import ChunkManifestRepository
+
+logger = get_logger(__name__)
+
+
+class ChunkManifestService:
+    """
+    资源分块清单服务
+
+    分块ID由资源ID与内容哈希确定，重复处理同一资源时，
+    通过与清单比对即可得到新增的分块以及需要清理的过期分块。
+    """
+
+    def __init__(self, db: Database, chunk_manifest_repository: ChunkManifestRepository):
+        self.db = db
+        self.chunk_manifest_repository = chunk_manifest_repository
+
+    async def diff(
+            self,
+            resource_id: uuid.UUID | str,
+            documents: Sequence[Document],
+    ) -> Tuple[List[Document], List[str]]:
+        """
+        比对本次分块与清单
+
+        Args:
+            resource_id: 资源ID
+            documents: 本次分块结果，id 为确定性分块ID
+
+        Returns:
+            (清单中不存在的分块, 清单中已不再出现的分块ID)
+        """
+        # 清单刚由上一次处理提交，副本可能尚未同步，读主库
+        async with self.db.session(primary=True):
+            existing = await self.chunk_manifest_repository.get_resource_chunks(resource_id)
+
+        current_ids = {doc.id for doc in documents}
+        added = [doc for doc in documents if doc.id not in existing]
+        stale = [chunk_id for chunk_id in existing if chunk_id not in current_ids]
+        logger.info(
+            f"resource {resource_id}: {len(documents)} chunks, "
+            f"{len(added)} added, {len(stale)} stale, {len(documents) - len(added)} unchanged"
+        )
+        return added, stale
+
+    async def get_vectors(
+            self,
+            resource_id: uuid.UUID | str,
+            chunk_ids: Sequence[str],
+    ) -> Dict[str, List[str]]:
+        """获取分块在各向量集合中的向量ID"""
+        async with self.db.session(primary=True):
+            return await self.chunk_manifest_repository.get_vectors(resource_id, chunk_ids)
+
+    async def record_vectors(
+            self,
+            resource_id: uuid.UUID | str,
+            collection_name: str,
+            vectors: Sequence[Tuple[str, str]],
+    ) -> None:
+        """
+        记录分块写入向量库后得到的向量ID
+
+        Args:
+            resource_id: 资源ID
+            collection_name: 向量集合名称
+            vectors: (分块ID, 向量ID) 列表
+        """
+        async with self.db.transaction():
+            await self.chunk_manifest_repository.add_vectors(resource_id, collection_name, vectors)
+
+    async def commit(
+            self,
+            resource_id: uuid.UUID | str,
+            documents: Sequence[Document],
+            stale_chunk_ids: Sequence[str],
+    ) -> None:
+        """
+        更新清单：删除过期分块，写入新增分块
+
+        Args:
+            resource_id: 资源ID
+            documents: 本次完整的分块结果
+            stale_chunk_ids: 已从向量库与文档存储中清理的过期分块ID
+        """
+        async with self.db.transaction():
+            await self.chunk_manifest_repository.delete_chunks(resource_id, stale_chunk_ids)
+            existing = await self.chunk_manifest_repository.get_resource_chunks(resource_id)
+            await self.chunk_manifest_repository.add_chunks(resource_id, {
+                doc.id: doc.metadata["content_hash"]
+                for doc in documents
+                if doc.id not in existing
+            })
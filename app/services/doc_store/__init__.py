@@ -1,4 +1,6 @@
 from .base import DocumentStore
+from .cached import CachedDocumentStore
 from .mysql import MySQLDocumentStore
+from .sql import AsyncSQLDocumentStore
 
-__all__ = ['DocumentStore', 'MySQLDocumentStore']
+__all__ = ['DocumentStore', 'MySQLDocumentStore', 'AsyncSQLDocumentStore', 'CachedDocumentStore']
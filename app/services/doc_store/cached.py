@@ -0,0 +1,340 @@
+import asyncio
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional, Sequence
+
+import redis
+import redis.asyncio as aioredis
+from langchain_core.documents import Document
+
+from app.logger import get_logger
+from .base import DocumentStore
+from .codec import CompactDocumentCodec
+
+logger = get_logger(__name__)
+
+# 负缓存标记：进程内缓存中表示 "确认不存在"，Redis 中用空字节表示
+_MISSING = object()
+_REDIS_MISSING = b""
+
+
+class _LRUCache:
+    """带过期时间的线程安全 LRU 缓存"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[object]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    def get(self, key: str) -> Optional[object]:
+        with self._lock:
+            value = self._get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: object, ttl: float) -> None:
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def set(self, key: str, value: object, ttl: float) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._set(key, value, ttl)
+
+    def add(self, key: str, value: object, ttl: float) -> None:
+        """只在 key 不存在时写入，读穿透的回填不覆盖同时写入的新值"""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            if self._get(key) is None:
+                self._set(key, value, ttl)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class CachedDocumentStore(DocumentStore):
+    """
+    带读穿透缓存的文档存储
+
+    读取顺序为 进程内 LRU -> Redis -> 底层存储，写入时同步更新各级缓存，不存在的 key 会以较短的
+    过期时间做负缓存。删除时在 Redis 中写入负缓存而不是删除 key，读穿透回填 Redis 时使用 SET NX，
+    读到旧值的回填不会覆盖同时写入的新值或删除标记。
+
+    写入与删除通过 Redis 发布失效消息，各进程订阅后清除进程内缓存中对应的文档；订阅建立或
+    中断重连时清空进程内缓存，避免使用错过失效消息期间的旧值。配置 Redis 时同步接口使用
+    sync_redis_client 访问 Redis。
+    """
+
+    def __init__(
+            self,
+            store: DocumentStore,
+            redis_client: Optional[aioredis.Redis] = None,
+            sync_redis_client: Optional[redis.Redis] = None,
+            namespace: str = "doc_store",
+            lru_size: int = 10000,
+            ttl: int = 3600,
+            negative_ttl: int = 60,
+    ):
+        """
+        Args:
+            store: 被缓存的底层文档存储
+            redis_client: Redis 客户端，为 None 时只使用进程内缓存
+            sync_redis_client: 同步接口使用的 Redis 客户端，配置 redis_client 时必须提供
+            namespace: Redis key 前缀
+            lru_size: 进程内缓存的最大文档数
+            ttl: 文档缓存过期时间(秒)
+            negative_ttl: 负缓存过期时间(秒)
+        """
+        if redis_client is not None and sync_redis_client is None:
+            raise ValueError("sync_redis_client is required when redis_client is configured")
+        self.store = store
+        self.redis = redis_client
+        self.sync_redis = sync_redis_client
+        self.namespace = namespace
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._local = _LRUCache(lru_size)
+        self._codec = CompactDocumentCodec()
+        self._instance_id = uuid.uuid4().hex
+        # 每次清除进程内缓存时递增，读取期间发生过失效的结果不回填进程内缓存
+        self._generation = 0
+        self._listener: Optional[asyncio.Task] = None
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.namespace}:doc:{key}"
+
+    @property
+    def _channel(self) -> str:
+        return f"{self.namespace}:invalidate"
+
+    def _invalidate_local(self, keys: Sequence[str]) -> None:
+        self._generation += 1
+        for key in keys:
+            self._local.delete(key)
+
+    def _clear_local(self) -> None:
+        self._generation += 1
+        self._local.clear()
+
+    def _cache_local(self, key: str, doc: Optional[Document]) -> None:
+        if doc is None:
+            self._local.set(key, _MISSING, self.negative_ttl)
+        else:
+            self._local.set(key, doc, self.ttl)
+
+    def _fill_local(self, loaded: dict[str, Optional[Document]], generation: int) -> None:
+        """读穿透回填进程内缓存，读取期间收到过失效消息时放弃回填"""
+        if generation != self._generation:
+            return
+        for key, doc in loaded.items():
+            if doc is None:
+                self._local.add(key, _MISSING, self.negative_ttl)
+            else:
+                self._local.add(key, doc, self.ttl)
+
+    def _lookup_local(self, keys: Sequence[str]) -> tuple[dict[str, Optional[Document]], list[str]]:
+        found: dict[str, Optional[Document]] = {}
+        misses = []
+        for key in dict.fromkeys(keys):
+            value = self._local.get(key)
+            if value is None:
+                misses.append(key)
+            else:
+                found[key] = None if value is _MISSING else value
+        return found, misses
+
+    def _decode_redis(self, keys: list[str], values: list[Optional[bytes]]) -> dict[str, Optional[Document]]:
+        found = {}
+        for key, value in zip(keys, values):
+            if value is None:
+                continue
+            found[key] = None if value == _REDIS_MISSING else self._codec.decode(value)
+        return found
+
+    def _queue_redis_set(self, pipe, items: dict[str, Optional[Document]], fill: bool) -> None:
+        """
+        Args:
+            fill: 是否为读穿透回填，回填只在 key 不存在时写入
+        """
+        for key, doc in items.items():
+            if doc is None:
+                pipe.set(self._redis_key(key), _REDIS_MISSING, ex=self.negative_ttl, nx=fill)
+            else:
+                pipe.set(self._redis_key(key), self._codec.encode(doc), ex=self.ttl, nx=fill)
+
+    def _invalidation_message(self, keys: Sequence[str]) -> str:
+        return json.dumps({"sender": self._instance_id, "keys": list(keys)})
+
+    def _on_invalidation(self, data: bytes | str) -> None:
+        message = json.loads(data)
+        if message["sender"] != self._instance_id:
+            self._invalidate_local(message["keys"])
+
+    def _ensure_listener(self) -> None:
+        if self.redis is None or self._local.max_size <= 0:
+            return
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self) -> None:
+        """订阅其他进程的失效消息"""
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self._channel)
+                # 订阅建立前的失效消息已经错过
+                self._clear_local()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._on_invalidation(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Document cache invalidation subscription failed, retrying: {e}")
+                self._clear_local()
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    async def aclose(self) -> None:
+        """停止订阅失效消息"""
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+    async def _redis_mget(self, keys: list[str]) -> dict[str, Optional[Document]]:
+        if self.redis is None or not keys:
+            return {}
+        try:
+            values = await self.redis.mget([self._redis_key(key) for key in keys])
+        except aioredis.RedisError as e:
+            logger.warning(f"Redis mget failed, falling back to store: {e}")
+            return {}
+        return self._decode_redis(keys, values)
+
+    async def _redis_mset(self, items: dict[str, Optional[Document]], fill: bool = False) -> None:
+        if self.redis is None or not items:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                self._queue_redis_set(pipe, items, fill)
+                if not fill:
+                    pipe.publish(self._channel, self._invalidation_message(list(items)))
+                await pipe.execute()
+        except aioredis.RedisError as e:
+            logger.warning(f"Redis mset failed: {e}")
+
+    async def amget(self, keys: Sequence[str]) -> list[Optional[Document]]:
+        self._ensure_listener()
+        generation = self._generation
+        found, misses = self._lookup_local(keys)
+
+        from_redis = await self._redis_mget(misses)
+        self._fill_local(from_redis, generation)
+        found.update(from_redis)
+
+        misses = [key for key in misses if key not in from_redis]
+        if misses:
+            docs = await self.store.amget(misses)
+            loaded = dict(zip(misses, docs))
+            self._fill_local(loaded, generation)
+            await self._redis_mset(loaded, fill=True)
+            found.update(loaded)
+
+        return [found.get(key) for key in keys]
+
+    async def amset(self, key_value_pairs: Sequence[tuple[str, Document]]) -> None:
+        self._ensure_listener()
+        await self.store.amset(key_value_pairs)
+        items = dict(key_value_pairs)
+        self._invalidate_local(list(items))
+        for key, doc in items.items():
+            self._cache_local(key, doc)
+        await self._redis_mset(items)
+
+    async def amdelete(self, keys: Sequence[str]) -> None:
+        self._ensure_listener()
+        await self.store.amdelete(keys)
+        items = dict.fromkeys(keys)
+        self._invalidate_local(list(items))
+        for key in items:
+            self._cache_local(key, None)
+        await self._redis_mset(items)
+
+    def _sync_redis_mget(self, keys: list[str]) -> dict[str, Optional[Document]]:
+        if self.sync_redis is None or not keys:
+            return {}
+        try:
+            values = self.sync_redis.mget([self._redis_key(key) for key in keys])
+        except redis.RedisError as e:
+            logger.warning(f"Redis mget failed, falling back to store: {e}")
+            return {}
+        return self._decode_redis(keys, values)
+
+    def _sync_redis_mset(self, items: dict[str, Optional[Document]], fill: bool = False) -> None:
+        if self.sync_redis is None or not items:
+            return
+        try:
+            with self.sync_redis.pipeline(transaction=False) as pipe:
+                self._queue_redis_set(pipe, items, fill)
+                if not fill:
+                    pipe.publish(self._channel, self._invalidation_message(list(items)))
+                pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Redis mset failed: {e}")
+
+    def mget(self, keys: Sequence[str]) -> list[Optional[Document]]:
+        generation = self._generation
+        found, misses = self._lookup_local(keys)
+
+        from_redis = self._sync_redis_mget(misses)
+        self._fill_local(from_redis, generation)
+        found.update(from_redis)
+
+        misses = [key for key in misses if key not in from_redis]
+        if misses:
+            loaded = dict(zip(misses, self.store.mget(misses)))
+            self._fill_local(loaded, generation)
+            self._sync_redis_mset(loaded, fill=True)
+            found.update(loaded)
+        return [found.get(key) for key in keys]
+
+    def mset(self, key_value_pairs: Sequence[tuple[str, Document]]) -> None:
+        self.store.mset(key_value_pairs)
+        items = dict(key_value_pairs)
+        self._invalidate_local(list(items))
+        for key, doc in items.items():
+            self._cache_local(key, doc)
+        self._sync_redis_mset(items)
+
+    def mdelete(self, keys: Sequence[str]) -> None:
+        self.store.mdelete(keys)
+        items = dict.fromkeys(keys)
+        self._invalidate_local(list(items))
+        for key in items:
+            self._cache_local(key, None)
+        self._sync_redis_mset(items)
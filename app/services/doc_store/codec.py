@@ -0,0 +1,115 @@
+import struct
+from abc import ABC, abstractmethod
+from typing import Optional
+
+import orjson
+from langchain_core.documents import Document
+from langchain_core.load import dumps, loads
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstd 为可选依赖
+    zstandard = None
+
+# 格式版本字节。旧数据是 LangChain dumps 生成的 JSON，首字节恒为 "{"，与下列版本号不冲突
+VERSION_COMPACT = 0x01
+VERSION_COMPACT_ZSTD = 0x02
+_LEGACY_PREFIX = ord("{")
+
+# 头部: id 长度(uint16) + 正文长度(uint32)，其后依次为 id、正文、orjson 编码的 metadata
+_HEADER = struct.Struct("<HI")
+
+
+class DocumentCodec(ABC):
+    """文档存储的序列化编解码器，解码时按首字节识别格式，各编解码器可以读取彼此写入的数据"""
+
+    @abstractmethod
+    def encode(self, document: Document) -> bytes:
+        pass
+
+    def decode(self, serialized: bytes) -> Document:
+        if serialized and serialized[0] == _LEGACY_PREFIX:
+            return loads(serialized.decode("utf-8"))
+        return CompactDocumentCodec.decode_compact(serialized)
+
+
+class LangChainDocumentCodec(DocumentCodec):
+    """LangChain dumps/loads 格式，保留用于兼容旧数据"""
+
+    def encode(self, document: Document) -> bytes:
+        return dumps(document).encode("utf-8")
+
+
+class CompactDocumentCodec(DocumentCodec):
+    """
+    紧凑二进制格式
+
+    布局: 版本(1 字节) | 头部 | id | page_content | metadata(orjson)，
+    启用 zstd 且内容超过阈值时，版本字节之后的部分整体压缩。
+    metadata 中有 orjson 无法序列化的值时编码失败，而不是转为字符串后读回不同的值。
+    """
+
+    def __init__(self, zstd_level: Optional[int] = None, zstd_min_size: int = 512):
+        """
+        Args:
+            zstd_level: zstd 压缩级别，为 None 时不压缩
+            zstd_min_size: 触发压缩的最小字节数，过小的内容压缩收益不足
+
+        Raises:
+            ValueError: 指定了压缩级别但未安装 zstandard
+        """
+        self.zstd_min_size = zstd_min_size
+        self._compressor = None
+        if zstd_level is not None:
+            if zstandard is None:
+                raise ValueError("zstandard is required when zstd_level is set")
+            self._compressor = zstandard.ZstdCompressor(level=zstd_level)
+
+    def encode(self, document: Document) -> bytes:
+        doc_id = (document.id or "").encode("utf-8")
+        content = document.page_content.encode("utf-8")
+        metadata = orjson.dumps(document.metadata, option=orjson.OPT_NON_STR_KEYS)
+        body = b"".join((_HEADER.pack(len(doc_id), len(content)), doc_id, content, metadata))
+
+        if self._compressor is not None and len(body) >= self.zstd_min_size:
+            return bytes((VERSION_COMPACT_ZSTD,)) + self._compressor.compress(body)
+        return bytes((VERSION_COMPACT,)) + body
+
+    @staticmethod
+    def decode_compact(serialized: bytes) -> Document:
+        version = serialized[0]
+        body = memoryview(serialized)[1:]
+        if version == VERSION_COMPACT_ZSTD:
+            if zstandard is None:
+                raise ValueError("zstandard is required to decode compressed documents")
+            body = memoryview(zstandard.ZstdDecompressor().decompress(body))
+        elif version != VERSION_COMPACT:
+            raise ValueError(f"Unsupported document encoding version: {version}")
+
+        id_len, content_len = _HEADER.unpack_from(body)
+        offset = _HEADER.size
+        doc_id = str(body[offset:offset + id_len], "utf-8")
+        offset += id_len
+        content = str(body[offset:offset + content_len], "utf-8")
+        offset += content_len
+        metadata = orjson.loads(body[offset:])
+
+        return Document(id=doc_id or None, page_content=content, metadata=metadata)
+
+
+def create_codec(codec_type: str, zstd_level: Optional[int] = None) -> DocumentCodec:
+    """
+    工厂方法：根据配置创建编解码器
+
+    Args:
+        codec_type: "compact" 或 "langchain"
+        zstd_level: compact 格式的 zstd 压缩级别
+
+    Raises:
+        ValueError: 当编解码器类型不支持时
+    """
+    if codec_type == "compact":
+        return CompactDocumentCodec(zstd_level=zstd_level)
+    if codec_type == "langchain":
+        return LangChainDocumentCodec()
+    raise ValueError(f"Unsupported document codec: {codec_type}")
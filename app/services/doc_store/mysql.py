@@ -3,11 +3,11 @@ from typing import Sequence, Optional
 
 from langchain_community.storage import SQLStore
 from langchain_core.documents import Document
-from langchain_core.load import dumps, loads
 
 from app.logger import get_logger
 from app.settings import DocumentStoreSettings
 from .base import DocumentStore
+from .codec import create_codec
 
 logger = get_logger(__name__)
 
@@ -26,6 +26,7 @@ class MySQLDocumentStore(DocumentStore):
             logger.info(f"start to create mysql store schema")
             sql_store.create_schema()
         self.store = sql_store
+        self.codec = create_codec(settings.CODEC, zstd_level=settings.ZSTD_LEVEL)
 
     def mget(self, keys: Sequence[str]) -> list[Optional[Document]]:
 
@@ -35,11 +36,11 @@ class MySQLDocumentStore(DocumentStore):
             for value in values
         ]
 
-    def value_deserializer(self, serialized: bytes) -> bytes:
-        return loads(serialized.decode("utf-8"))
+    def value_deserializer(self, serialized: bytes) -> Document:
+        return self.codec.decode(serialized)
 
     def value_serializer(self, document: Document) -> bytes:
-        return dumps(document).encode("utf-8")
+        return self.codec.encode(document)
 
     def mset(self, key_value_pairs: Sequence[tuple[str, Document]]) -> None:
         if not key_value_pairs:
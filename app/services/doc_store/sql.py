@@ -0,0 +1,197 @@
+import asyncio
+import threading
+from typing import Optional, Sequence
+
+from langchain_core.documents import Document
+from sqlalchemy import Column, Engine, LargeBinary, MetaData, String, Table, URL, create_engine, delete, make_url, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.core.database import Database
+from app.logger import get_logger
+from app.settings import DocumentStoreSettings
+from .base import DocumentStore
+from .codec import create_codec
+
+logger = get_logger(__name__)
+
+# 与 LangChain SQLStore 使用同一张表，切换实现后已有数据仍然可读
+metadata = MetaData()
+key_value_table = Table(
+    "langchain_key_value_stores",
+    metadata,
+    Column("namespace", String(255), primary_key=True, index=True, nullable=False),
+    Column("key", String(255), primary_key=True, index=True, nullable=False),
+    Column("value", LargeBinary().with_variant(mysql.LONGBLOB(), "mysql"), nullable=False),
+)
+
+# 各数据库的异步与同步驱动，DOCUMENT_STORE__URL 使用其中任意一种均可
+_ASYNC_DRIVERS = {"mysql": "mysql+aiomysql", "postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+_SYNC_DRIVERS = {"mysql": "mysql+pymysql", "postgresql": "postgresql", "sqlite": "sqlite"}
+
+
+def _with_driver(url: URL, drivers: dict[str, str]) -> URL:
+    backend = url.get_backend_name()
+    if backend not in drivers:
+        raise ValueError(f"Unsupported dialect for document store: {backend}")
+    return url.set(drivername=drivers[backend])
+
+
+def _same_database(a: URL, b: URL) -> bool:
+    return _with_driver(a, _ASYNC_DRIVERS) == _with_driver(b, _ASYNC_DRIVERS)
+
+
+class AsyncSQLDocumentStore(DocumentStore):
+    """
+    原生异步的 SQL 文档存储
+
+    连接 DOCUMENT_STORE__URL 配置的数据库，与应用数据库相同时复用 app.core.database.Database
+    的连接池，否则按该地址创建自己的异步引擎。读写均为原生异步，表结构在第一次访问时创建；
+    同步接口在第一次调用时按同一地址创建同步引擎。
+    """
+
+    def __init__(self, settings: DocumentStoreSettings, db: Optional[Database] = None, batch_size: int = 500):
+        """
+        Args:
+            settings: 文档存储配置，使用其中的 URL、NAMESPACE 与序列化配置
+            db: 应用数据库，与 URL 指向同一数据库时复用其连接池
+            batch_size: 单条 SQL 中最多包含的 key 数量
+        """
+        self.url = make_url(settings.URL)
+        if db is not None and _same_database(db.engine.url, self.url):
+            self.engine: AsyncEngine = db.engine
+            self._owns_engine = False
+        else:
+            self.engine = create_async_engine(_with_driver(self.url, _ASYNC_DRIVERS), pool_pre_ping=True)
+            self._owns_engine = True
+        self._sync_engine: Optional[Engine] = None
+        self.namespace = settings.NAMESPACE
+        self.codec = create_codec(settings.CODEC, zstd_level=settings.ZSTD_LEVEL)
+        self.batch_size = batch_size
+        self._schema_ready = False
+        self._schema_lock = asyncio.Lock()
+        self._sync_lock = threading.Lock()
+
+    async def aclose(self) -> None:
+        """释放自己创建的引擎，复用的应用连接池由 Database 管理"""
+        if self._owns_engine:
+            await self.engine.dispose()
+        if self._sync_engine is not None:
+            self._sync_engine.dispose()
+
+    async def _ensure_schema(self) -> None:
+        if self._schema_ready:
+            return
+        async with self._schema_lock:
+            if self._schema_ready:
+                return
+            logger.info("start to create document store schema")
+            async with self.engine.begin() as conn:
+                await conn.run_sync(metadata.create_all)
+            self._schema_ready = True
+
+    def _get_sync_engine(self) -> Engine:
+        with self._sync_lock:
+            if self._sync_engine is None:
+                self._sync_engine = create_engine(_with_driver(self.url, _SYNC_DRIVERS), pool_pre_ping=True)
+            if not self._schema_ready:
+                logger.info("start to create document store schema")
+                metadata.create_all(self._sync_engine)
+                self._schema_ready = True
+            return self._sync_engine
+
+    def _batches(self, items: Sequence) -> list[Sequence]:
+        return [items[i:i + self.batch_size] for i in range(0, len(items), self.batch_size)]
+
+    def _upsert(self, rows: list[dict]):
+        """按方言生成批量 upsert 语句"""
+        dialect = self.engine.dialect.name
+        if dialect == "mysql":
+            stmt = mysql.insert(key_value_table).values(rows)
+            return stmt.on_duplicate_key_update(value=stmt.inserted.value)
+        if dialect in ("postgresql", "sqlite"):
+            insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            stmt = insert(key_value_table).values(rows)
+            return stmt.on_conflict_do_update(
+                index_elements=[key_value_table.c.namespace, key_value_table.c.key],
+                set_={"value": stmt.excluded.value},
+            )
+        raise ValueError(f"Unsupported dialect for document store: {dialect}")
+
+    def _select(self, batch: Sequence[str]):
+        return select(key_value_table.c.key, key_value_table.c.value).where(
+            key_value_table.c.namespace == self.namespace,
+            key_value_table.c.key.in_(batch),
+        )
+
+    def _delete(self, batch: Sequence[str]):
+        return delete(key_value_table).where(
+            key_value_table.c.namespace == self.namespace,
+            key_value_table.c.key.in_(batch),
+        )
+
+    def _rows(self, key_value_pairs: Sequence[tuple[str, Document]]) -> list[dict]:
+        # 同一批次中重复的 key 以最后一个为准
+        return list({
+            key: {"namespace": self.namespace, "key": key, "value": self.codec.encode(value)}
+            for key, value in key_value_pairs
+        }.values())
+
+    def _decode(self, keys: Sequence[str], found: dict[str, bytes]) -> list[Optional[Document]]:
+        return [
+            self.codec.decode(found[key]) if key in found else None
+            for key in keys
+        ]
+
+    async def amget(self, keys: Sequence[str]) -> list[Optional[Document]]:
+        if not keys:
+            return []
+        await self._ensure_schema()
+
+        found: dict[str, bytes] = {}
+        async with self.engine.connect() as conn:
+            for batch in self._batches(list(dict.fromkeys(keys))):
+                result = await conn.execute(self._select(batch))
+                found.update(result.all())
+        return self._decode(keys, found)
+
+    async def amset(self, key_value_pairs: Sequence[tuple[str, Document]]) -> None:
+        if not key_value_pairs:
+            return
+        await self._ensure_schema()
+
+        async with self.engine.begin() as conn:
+            for batch in self._batches(self._rows(key_value_pairs)):
+                await conn.execute(self._upsert(list(batch)))
+
+    async def amdelete(self, keys: Sequence[str]) -> None:
+        if not keys:
+            return
+        await self._ensure_schema()
+
+        async with self.engine.begin() as conn:
+            for batch in self._batches(list(keys)):
+                await conn.execute(self._delete(batch))
+
+    def mget(self, keys: Sequence[str]) -> list[Optional[Document]]:
+        if not keys:
+            return []
+        found: dict[str, bytes] = {}
+        with self._get_sync_engine().connect() as conn:
+            for batch in self._batches(list(dict.fromkeys(keys))):
+                found.update(conn.execute(self._select(batch)).all())
+        return self._decode(keys, found)
+
+    def mset(self, key_value_pairs: Sequence[tuple[str, Document]]) -> None:
+        if not key_value_pairs:
+            return
+        with self._get_sync_engine().begin() as conn:
+            for batch in self._batches(self._rows(key_value_pairs)):
+                conn.execute(self._upsert(list(batch)))
+
+    def mdelete(self, keys: Sequence[str]) -> None:
+        if not keys:
+            return
+        with self._get_sync_engine().begin() as conn:
+            for batch in self._batches(list(keys)):
+                conn.execute(self._delete(batch))
@@ -1,13 +1,16 @@
 from enum import Enum
-from typing import Union
+from typing import Optional, Union
 
 from .base import DocumentSplitter
+from .chunk import Chunk, materialize
+from .fast import FastSplitter, Tokenizer
 from .langchain import LangChainSplitter
 
 
 class SplitterType(Enum):
     """文档分割器类型枚举"""
     LANGCHAIN = "langchain"
+    FAST = "fast"
 
 
 def create_splitter(
@@ -15,6 +18,7 @@ def create_splitter(
         mime_type: str = None,
         chunk_size: int = 1000,
         chunk_overlap: int = 200,
+        tokenizer: Tokenizer = None,
         **kwargs
 ) -> DocumentSplitter:
     """
@@ -23,15 +27,16 @@ def create_splitter(
     Args:
         splitter_type: 分割器类型，可以是 SplitterType 枚举或对应的字符串
         mime_type: 文档的 MIME 类型，用于选择合适的分割器
-        chunk_size: 每个文本块的最大字符数
-        chunk_overlap: 相邻文本块之间的重叠字符数
+        chunk_size: 每个文本块的最大字符数，指定 tokenizer 时为最大 token 数
+        chunk_overlap: 相邻文本块之间的重叠字符数，指定 tokenizer 时为重叠 token 数
+        tokenizer: token 计数方式(如 "tiktoken:cl100k_base")，None 时按字符计数；只有 fast 分割器支持
         **kwargs: 分割器的其他参数
 
     Returns:
         DocumentSplitter: 对应类型的分割器实例
 
     Raises:
-        ValueError: 当分割器类型不支持时抛出
+        ValueError: 当分割器类型不支持，或分割器不支持指定的 tokenizer 时抛出
     """
     if isinstance(splitter_type, str):
         try:
@@ -40,11 +45,20 @@ def create_splitter(
             raise ValueError(f"不支持的分割器类型: {splitter_type}")
 
     if splitter_type == SplitterType.LANGCHAIN:
+        if tokenizer is not None:
+            raise ValueError("langchain 分割器不支持 tokenizer，请使用 fast 分割器")
         return LangChainSplitter(
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
             mime_type=mime_type,
             **kwargs
         )
+    elif splitter_type == SplitterType.FAST:
+        return FastSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            tokenizer=tokenizer,
+            **kwargs
+        )
     else:
         raise ValueError(f"不支持的分割器类型: {splitter_type}")
@@ -3,6 +3,8 @@ from typing import List, AsyncGenerator
 
 from langchain_core.documents import Document
 
+from .chunk import Chunk
+
 
 class DocumentSplitter(ABC):
     def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200, **kwargs):
@@ -29,3 +31,16 @@ class DocumentSplitter(ABC):
             异步生成器，逐个生成分割后的文档片段
         """
         pass
+
+    async def split_chunks(self, documents: List[Document]) -> AsyncGenerator[Chunk, None]:
+        """
+        将文档分割为轻量分块，默认基于 split 的结果包装，可引用原文偏移的分割器应覆盖此方法
+
+        Args:
+            documents: 要分割的文档列表
+
+        Returns:
+            异步生成器，逐个生成分块
+        """
+        async for doc in self.split(documents):
+            yield Chunk.from_document(doc)
@@ -0,0 +1,74 @@
+from collections import ChainMap
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from langchain_core.documents import Document
+
+
+class Chunk:
+    """
+    轻量分块
+
+    只保存源文档引用、在源文档中的偏移以及相对源文档 metadata 的增量，
+    正文与完整 metadata 在访问时才生成，写入存储前通过 to_document 转换为 Document。
+    """
+
+    __slots__ = ("source", "start", "end", "id", "_delta", "_content")
+
+    def __init__(
+            self,
+            source: Document,
+            start: int = 0,
+            end: Optional[int] = None,
+            id: Optional[str] = None,
+            metadata: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Args:
+            source: 源文档
+            start: 在源文档正文中的起始偏移
+            end: 在源文档正文中的结束偏移，None 表示到结尾
+            id: 分块ID
+            metadata: 相对源文档 metadata 的增量
+        """
+        self.source = source
+        self.start = start
+        self.end = len(source.page_content) if end is None else end
+        self.id = id
+        self._delta = metadata
+        self._content: Optional[str] = None
+
+    @classmethod
+    def from_document(cls, document: Document) -> "Chunk":
+        return cls(document, id=document.id)
+
+    @property
+    def page_content(self) -> str:
+        if self._content is not None:
+            return self._content
+        return self.source.page_content[self.start:self.end]
+
+    @page_content.setter
+    def page_content(self, value: str) -> None:
+        # 修改正文后不再引用源文档中的区间
+        self._content = value
+
+    @property
+    def metadata(self) -> ChainMap:
+        """源文档 metadata 与增量的合并视图，写入只影响增量"""
+        if self._delta is None:
+            self._delta = {}
+        return ChainMap(self._delta, self.source.metadata)
+
+    def __len__(self) -> int:
+        return len(self._content) if self._content is not None else self.end - self.start
+
+    def __repr__(self) -> str:
+        return f"Chunk(id={self.id!r}, start={self.start}, end={self.end})"
+
+    def to_document(self) -> Document:
+        return Document(id=self.id, page_content=self.page_content, metadata=dict(self.metadata))
+
+
+def materialize(items: Iterable[Union[Chunk, Document]]) -> List[Document]:
+    """将分块转换为 Document，已经是 Document 的保持不变"""
+    return [item.to_document() if isinstance(item, Chunk) else item for item in items]
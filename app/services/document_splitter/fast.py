@@ -0,0 +1,269 @@
+import asyncio
+import re
+from functools import lru_cache
+from typing import AsyncGenerator, Callable, Dict, List, Optional, Tuple, Union
+
+from langchain_core.documents import Document
+
+from app.utils.process_pool import get_process_pool
+from .base import DocumentSplitter
+from .chunk import Chunk
+
+# 边界等级，数值越大越适合作为分块位置
+PARAGRAPH, LINE, SENTENCE, WORD = 3, 2, 1, 0
+
+# 由粗到细的边界，只有超出大小限制的片段才会继续按更细的边界扫描
+_BOUNDARIES = [
+    (PARAGRAPH, re.compile(r"\n[ \t]*\n\s*")),
+    (LINE, re.compile(r"\n\s*")),
+    (SENTENCE, re.compile(r"(?<=[.!?;])\s+|(?<=[。！？；])")),
+    (WORD, re.compile(r"\s+")),
+]
+
+TokenCounter = Callable[[str], int]
+Tokenizer = Union[str, TokenCounter, None]
+
+_counters: Dict[Union[str, TokenCounter], TokenCounter] = {}
+
+
+def create_token_counter(tokenizer: Tokenizer = None, cache_size: int = 65536) -> TokenCounter:
+    """
+    创建带缓存的 token 计数函数
+
+    Args:
+        tokenizer: None 按字符计数；"tiktoken:<encoding>" 使用 tiktoken；
+            "hf:<model>" 使用 HuggingFace tokenizers；也可以直接传入计数函数
+        cache_size: 计数缓存大小，相同的片段(单词、句子)只分词一次
+
+    Raises:
+        ValueError: 当 tokenizer 格式不支持时
+    """
+    if tokenizer is None:
+        return len
+    if tokenizer in _counters:
+        return _counters[tokenizer]
+    if callable(tokenizer):
+        _counters[tokenizer] = lru_cache(maxsize=cache_size)(tokenizer)
+        return _counters[tokenizer]
+
+    kind, _, name = tokenizer.partition(":")
+    if kind == "tiktoken":
+        import tiktoken
+
+        encoding = tiktoken.get_encoding(name or "cl100k_base")
+
+        def count(text: str) -> int:
+            return len(encoding.encode(text, disallowed_special=()))
+    elif kind == "hf":
+        from tokenizers import Tokenizer as HFTokenizer
+
+        hf_tokenizer = HFTokenizer.from_pretrained(name)
+
+        def count(text: str) -> int:
+            return len(hf_tokenizer.encode(text, add_special_tokens=False).ids)
+    else:
+        raise ValueError(f"不支持的 tokenizer: {tokenizer}")
+
+    _counters[tokenizer] = lru_cache(maxsize=cache_size)(count)
+    return _counters[tokenizer]
+
+
+def _scan_segments(
+        text: str,
+        count: TokenCounter,
+        chunk_size: int,
+        start: int = 0,
+        end: Optional[int] = None,
+        depth: int = 0,
+        end_level: int = PARAGRAPH,
+        segments: Optional[List[Tuple[int, int, int, int]]] = None,
+) -> List[Tuple[int, int, int, int]]:
+    """
+    扫描文本得到 (起始, 结束, 结束处边界等级, token 数) 的片段列表，分隔符归入前一个片段
+
+    片段按段落切分，超出 chunk_size 的片段再依次按换行、句子、单词切分，
+    每一段文本只在需要的粒度上扫描一次，不生成中间字符串。
+    """
+    if segments is None:
+        segments = []
+    if end is None:
+        end = len(text)
+
+    level, pattern = _BOUNDARIES[depth]
+    pieces = []
+    piece_start = start
+    for match in pattern.finditer(text, start, end):
+        if match.end() > piece_start:
+            pieces.append((piece_start, match.end(), level))
+            piece_start = match.end()
+    if piece_start < end:
+        pieces.append((piece_start, end, end_level))
+    elif pieces:
+        # 最后一个边界与上层边界重合时取较高的等级
+        last_start, last_end, last_level = pieces[-1]
+        pieces[-1] = (last_start, last_end, max(last_level, end_level))
+
+    for piece_start, piece_end, piece_level in pieces:
+        tokens = piece_end - piece_start if count is len else count(text[piece_start:piece_end])
+        if tokens > chunk_size and depth + 1 < len(_BOUNDARIES):
+            _scan_segments(text, count, chunk_size, piece_start, piece_end, depth + 1, piece_level, segments)
+        else:
+            segments.append((piece_start, piece_end, piece_level, tokens))
+    return segments
+
+
+def split_text_offsets(
+        text: str,
+        chunk_size: int,
+        chunk_overlap: int = 0,
+        tokenizer: Tokenizer = None,
+        min_fill: float = 0.5,
+) -> List[Tuple[int, int]]:
+    """
+    按 token 数将文本切分为若干 (start, end) 偏移区间
+
+    在不超过 chunk_size 的前提下，优先在段落、换行、句子、单词边界处切分；
+    填充率低于 min_fill 的高等级边界会被忽略，避免产生过小的分块。
+    单个片段超过 chunk_size 时按字符强制切分。
+
+    Args:
+        text: 原始文本
+        chunk_size: 每个分块的最大 token 数
+        chunk_overlap: 相邻分块之间的最大重叠 token 数
+        tokenizer: token 计数方式，见 create_token_counter
+        min_fill: 选择切分边界时分块的最小填充率
+
+    Returns:
+        原文中的偏移区间列表，已去除首尾空白
+    """
+    count = create_token_counter(tokenizer)
+    segments = _scan_segments(text, count, chunk_size)
+    tokens = [segment[3] for segment in segments]
+
+    offsets: List[Tuple[int, int]] = []
+
+    def emit(start: int, end: int) -> None:
+        # 去除首尾空白，只调整偏移，不复制文本
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if end > start:
+            offsets.append((start, end))
+
+    i, n = 0, len(segments)
+    while i < n:
+        total, j = 0, i
+        best_cut, best_level = None, -1
+        while j < n and total + tokens[j] <= chunk_size:
+            total += tokens[j]
+            j += 1
+            level = segments[j - 1][2]
+            if level >= best_level and total >= chunk_size * min_fill:
+                best_cut, best_level = j, level
+
+        if j == i:
+            # 单个片段超出大小限制，按字符比例强制切分
+            start, end, _, _ = segments[i]
+            step = max(1, (end - start) * chunk_size // tokens[i])
+            for piece in range(start, end, step):
+                emit(piece, min(piece + step, end))
+            i += 1
+            continue
+
+        cut = j if j == n or best_cut is None else best_cut
+        emit(segments[i][0], segments[cut - 1][1])
+        if cut == n:
+            break
+
+        # 从切分点向前回退若干片段作为重叠部分，重叠不跨越段落
+        k, overlap = cut, 0
+        while k - 1 > i and segments[k - 1][2] < PARAGRAPH and overlap + tokens[k - 1] <= chunk_overlap:
+            overlap += tokens[k - 1]
+            k -= 1
+        i = k
+
+    return offsets
+
+
+class FastSplitter(DocumentSplitter):
+    """
+    单次边界扫描的分割器
+
+    按 token 计数控制分块大小，分块在 metadata 中记录其在原文中的 start_index / end_index，
+    多个文档时可在进程池中并行切分。
+    """
+
+    def __init__(
+            self,
+            chunk_size: int = 1000,
+            chunk_overlap: int = 200,
+            tokenizer: Tokenizer = None,
+            max_workers: int = 0,
+            parallel_threshold: int = 1_000_000,
+            **kwargs
+    ):
+        """
+        Args:
+            chunk_size: 每个文本块的最大 token 数
+            chunk_overlap: 相邻文本块之间的重叠 token 数
+            tokenizer: token 计数方式，None 时按字符计数，见 create_token_counter
+            max_workers: 并行切分的进程数，为 0 时在当前进程中切分
+            parallel_threshold: 文档总字符数超过该值时才使用进程池
+            **kwargs: 其他参数
+        """
+        super().__init__(chunk_size=int(chunk_size), chunk_overlap=int(chunk_overlap), **kwargs)
+        self.tokenizer = tokenizer
+        self.max_workers = max_workers
+        self.parallel_threshold = parallel_threshold
+
+    async def _split_offsets(self, documents: List[Document]) -> List[List[Tuple[int, int]]]:
+        args = (self.chunk_size, self.chunk_overlap, self.tokenizer)
+        total_size = sum(len(doc.page_content) for doc in documents)
+        if self.max_workers <= 0 or len(documents) < 2 or total_size < self.parallel_threshold:
+            return [split_text_offsets(doc.page_content, *args) for doc in documents]
+
+        loop = asyncio.get_running_loop()
+        pool = get_process_pool(self.max_workers)
+        return await asyncio.gather(*[
+            loop.run_in_executor(pool, split_text_offsets, doc.page_content, *args)
+            for doc in documents
+        ])
+
+    async def split_chunks(self, documents: List[Document]) -> AsyncGenerator[Chunk, None]:
+        """
+        将文档分割为引用原文偏移的分块，不复制正文与源文档 metadata
+
+        Args:
+            documents: 要分割的文档列表
+
+        Yields:
+            分块
+        """
+        all_offsets = await self._split_offsets(documents)
+        for doc, offsets in zip(documents, all_offsets):
+            for i, (start, end) in enumerate(offsets):
+                yield Chunk(
+                    doc,
+                    start,
+                    end,
+                    metadata={
+                        "chunk_index": i,
+                        "total_chunks": len(offsets),
+                        "start_index": start,
+                        "end_index": end,
+                    },
+                )
+
+    async def split(self, documents: List[Document]) -> AsyncGenerator[Document, None]:
+        """
+        将文档分割成更小的片段
+
+        Args:
+            documents: 要分割的文档列表
+
+        Yields:
+            分割后的文档片段
+        """
+        async for chunk in self.split_chunks(documents):
+            yield chunk.to_document()
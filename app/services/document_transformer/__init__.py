@@ -6,9 +6,11 @@ from langchain_core.language_models import BaseLLM
 from .base import DocumentTransformer
 from .chain import ChainTransformer
 from .clean import CleanTransformer
+from .dedup import DedupTransformer, DedupStats
 from .hypothetical_question import HypotheticalQuestionTransformer
 from .lower import LowercaseTransformer
 from .merge import MergeDocumentsTransformer
+from .normalize import NormalizeTransformer, fuse_transformers
 from .prefix import PrefixTransformer
 from .summary import SummaryTransformer
 
@@ -22,6 +24,8 @@ class TransformerType(Enum):
     MERGE = "merge"
     PREFIX = "prefix"
     CLEAN = "clean"
+    DEDUP = "dedup"
+    NORMALIZE = "normalize"
 
 
 def create_transformer(
@@ -72,6 +76,10 @@ def create_transformer(
         return PrefixTransformer(prefix=prefix_str, **kwargs)
     elif transformer_type == TransformerType.CLEAN:
         return CleanTransformer(**kwargs)
+    elif transformer_type == TransformerType.DEDUP:
+        return DedupTransformer(**kwargs)
+    elif transformer_type == TransformerType.NORMALIZE:
+        return NormalizeTransformer(**kwargs)
     elif transformer_type == TransformerType.CHAIN:
         transforms = kwargs.pop("transforms", None)
         if not transforms:
@@ -88,7 +96,7 @@ def create_chain_transformer(
         **kwargs
 ) -> ChainTransformer:
     """
-    创建串联多个转换器的 ChainTransformer
+    创建串联多个转换器的 ChainTransformer，相邻的轻量转换器会被融合为一个阶段
 
     Args:
         transformer_types: 要串联的转换器类型列表
@@ -103,4 +111,4 @@ def create_chain_transformer(
         transformer = create_transformer(t_type, llm=llm, **kwargs)
         transforms.append(transformer)
 
-    return ChainTransformer(transforms=transforms)
+    return ChainTransformer(transforms=fuse_transformers(transforms))
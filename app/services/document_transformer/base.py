@@ -1,8 +1,21 @@
 from abc import ABC, abstractmethod
-from typing import AsyncGenerator, List
+from typing import AsyncGenerator, AsyncIterable, List, Union
 
 from langchain_core.documents import Document
 
+# 转换器的输入可以是文档列表，也可以是上游转换器的异步生成器
+Documents = Union[List[Document], AsyncIterable[Document]]
+
+
+async def iterate_documents(documents: Documents) -> AsyncGenerator[Document, None]:
+    """统一按异步方式遍历文档列表或异步可迭代对象"""
+    if isinstance(documents, AsyncIterable):
+        async for doc in documents:
+            yield doc
+    else:
+        for doc in documents:
+            yield doc
+
 
 class DocumentTransformer(ABC):
     def __init__(self, **kwargs):
@@ -15,12 +28,12 @@ class DocumentTransformer(ABC):
         self.kwargs = kwargs
 
     @abstractmethod
-    async def transform(self, documents: List[Document]) -> AsyncGenerator[Document, None]:
+    async def transform(self, documents: Documents) -> AsyncGenerator[Document, None]:
         """
         对文档进行转换处理
         
         Args:
-            documents: 要处理的文档列表
+            documents: 要处理的文档列表或异步可迭代对象，使用 iterate_documents 遍历
 
         Returns:
             转换后的文档生成器
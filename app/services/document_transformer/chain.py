@@ -1,31 +1,128 @@
-from typing import AsyncGenerator, List
+import asyncio
+from typing import AsyncGenerator, List, Optional, Union
 
 from langchain_core.documents import Document
-from langchain_core.language_models import BaseLLM
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.prompts import PromptTemplate
 
-from .base import DocumentTransformer
+from .base import DocumentTransformer, Documents, iterate_documents
+
+# 阶段结束标记
+_DONE = object()
+
+
+class _StageFailed:
+    """上游阶段失败标记，沿流水线向下传递"""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+async def _drain(queue: asyncio.Queue) -> AsyncGenerator[Document, None]:
+    """将队列转换为异步生成器，上游失败时抛出其异常"""
+    while True:
+        item = await queue.get()
+        if item is _DONE:
+            return
+        if isinstance(item, _StageFailed):
+            raise item.error
+        yield item
+
 
 class ChainTransformer(DocumentTransformer):
-    def __init__(self, transforms: List[DocumentTransformer], **kwargs):
+    def __init__(
+            self,
+            transforms: List[DocumentTransformer],
+            buffer_size: int = 16,
+            concurrency: Union[int, List[int], None] = None,
+            **kwargs
+    ):
         """
         将多个转换器串联在一起的转换器
 
+        各阶段以流水线方式运行，阶段之间通过有界队列连接，文档经过所有阶段后立即输出，
+        内存占用与 buffer_size 成正比而不是与文档总数成正比。
+
         Args:
             transforms: 要串联的转换器列表
+            buffer_size: 阶段之间队列的最大长度
+            concurrency: 各阶段的并发数，可以是统一的整数或与 transforms 等长的列表。
+                并发数为 1 的阶段以流的方式消费上游输出，适用于合并、去重等有状态的转换器；
+                大于 1 时逐个文档并发调用转换器，适用于调用 LLM 等逐文档的转换器，输出顺序不保证
             **kwargs: 其他参数
         """
         super().__init__(**kwargs)
         self.transforms = transforms
+        self.buffer_size = buffer_size
+        if concurrency is None:
+            concurrency = 1
+        if isinstance(concurrency, int):
+            concurrency = [concurrency] * len(transforms)
+        if len(concurrency) != len(transforms):
+            raise ValueError("concurrency 的长度必须与 transforms 一致")
+        self.concurrency = concurrency
+
+    async def _feed(self, documents: Documents, outbox: asyncio.Queue) -> None:
+        try:
+            async for doc in iterate_documents(documents):
+                await outbox.put(doc)
+            await outbox.put(_DONE)
+        except Exception as e:
+            await outbox.put(_StageFailed(e))
+
+    async def _run_streaming(
+            self,
+            transform: DocumentTransformer,
+            inbox: asyncio.Queue,
+            outbox: asyncio.Queue,
+    ) -> None:
+        try:
+            async for doc in transform.transform(_drain(inbox)):
+                await outbox.put(doc)
+            await outbox.put(_DONE)
+        except Exception as e:
+            await outbox.put(_StageFailed(e))
+
+    async def _run_concurrent(
+            self,
+            transform: DocumentTransformer,
+            concurrency: int,
+            inbox: asyncio.Queue,
+            outbox: asyncio.Queue,
+    ) -> None:
+        failure: Optional[_StageFailed] = None
+
+        async def worker() -> None:
+            nonlocal failure
+            while failure is None:
+                item = await inbox.get()
+                if item is _DONE or isinstance(item, _StageFailed):
+                    # 放回结束标记，通知同阶段的其他 worker
+                    await inbox.put(item)
+                    if isinstance(item, _StageFailed):
+                        failure = item
+                    return
+                try:
+                    async for doc in transform.transform([item]):
+                        await outbox.put(doc)
+                except Exception as e:
+                    failure = _StageFailed(e)
+
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        await outbox.put(failure or _DONE)
+
+    async def transform(self, documents: Documents) -> AsyncGenerator[Document, None]:
+        queues = [asyncio.Queue(maxsize=self.buffer_size) for _ in range(len(self.transforms) + 1)]
+        tasks = [asyncio.create_task(self._feed(documents, queues[0]))]
+        for i, (transform, concurrency) in enumerate(zip(self.transforms, self.concurrency)):
+            if concurrency > 1:
+                stage = self._run_concurrent(transform, concurrency, queues[i], queues[i + 1])
+            else:
+                stage = self._run_streaming(transform, queues[i], queues[i + 1])
+            tasks.append(asyncio.create_task(stage))
 
-    async def transform(self, documents: List[Document]) -> AsyncGenerator[Document, None]:
-        current_docs = documents
-        for transform in self.transforms:
-            new_docs = []
-            async_generator = await transform.transform(current_docs)
-            async for doc in async_generator:
-                new_docs.append(doc)
-            current_docs = new_docs
-        for doc in current_docs:
-            yield doc
\ No newline at end of file
+        try:
+            async for doc in _drain(queues[-1]):
+                yield doc
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
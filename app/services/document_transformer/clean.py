@@ -1,15 +1,15 @@
-from typing import AsyncGenerator, List
+from typing import AsyncGenerator
 
 from langchain_core.documents import Document
 
-from .base import DocumentTransformer
+from .base import DocumentTransformer, Documents, iterate_documents
 
 
 class CleanTransformer(DocumentTransformer):
     """内容清理"""
 
-    async def transform(self, documents: List[Document]) -> AsyncGenerator[Document, None]:
-        for doc in documents:
+    async def transform(self, documents: Documents) -> AsyncGenerator[Document, None]:
+        async for doc in iterate_documents(documents):
             cleaned_text = (doc.page_content
                             .strip()
                             .replace('\n\n', '\n')
@@ -0,0 +1,178 @@
+import hashlib
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import AsyncGenerator, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from app.logger import get_logger
+from .base import DocumentTransformer, Documents, iterate_documents
+
+logger = get_logger(__name__)
+
+_SHIFT = np.uint64(32)
+_SHINGLE_BASE = np.uint64(1_000_003)
+_WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass
+class DedupStats:
+    """去重统计"""
+    total: int = 0
+    unique: int = 0
+    exact_duplicates: int = 0
+    near_duplicates: int = 0
+
+    @property
+    def duplicates(self) -> int:
+        return self.exact_duplicates + self.near_duplicates
+
+    @property
+    def ratio(self) -> float:
+        """被判定为重复的分块占比"""
+        return self.duplicates / self.total if self.total else 0.0
+
+
+def _optimal_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """选择 LSH 的分段数与每段行数，使 S 曲线的拐点 (1/b)^(1/r) 尽量接近阈值"""
+    best = (1, num_perm)
+    best_error = float("inf")
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        error = abs((1 / bands) ** (1 / rows) - threshold)
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+class DedupTransformer(DocumentTransformer):
+    """
+    近似重复分块去重
+
+    基于字符 shingle 的 MinHash 签名与 LSH 分桶查找候选，估计的 Jaccard 相似度
+    不低于阈值的分块视为重复。页眉、页脚、免责声明等模板内容只保留第一次出现的分块。
+    """
+
+    def __init__(
+            self,
+            threshold: float = 0.85,
+            num_perm: int = 128,
+            shingle_size: int = 5,
+            mode: str = "drop",
+            seed: int = 1,
+            **kwargs
+    ):
+        """
+        Args:
+            threshold: 判定为重复的 Jaccard 相似度阈值
+            num_perm: MinHash 置换次数，越大估计越准确
+            shingle_size: 字符 shingle 长度
+            mode: "drop" 丢弃重复分块；"link" 保留重复分块并在 metadata 中记录 duplicate_of
+            seed: 置换参数的随机种子，相同种子下签名可复现
+            **kwargs: 其他参数
+        """
+        super().__init__(**kwargs)
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold 必须在 (0, 1] 之间")
+        if mode not in ("drop", "link"):
+            raise ValueError(f"不支持的去重模式: {mode}")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.mode = mode
+        self.bands, self.rows = _optimal_bands(threshold, num_perm)
+        self.stats = DedupStats()
+
+        # multiply-shift 哈希族: h(x) = (a * x + b) >> 32，a 为奇数，乘法按 uint64 回绕
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.randint(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64)
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return _WHITESPACE.sub(" ", text).strip().lower()
+
+    def _shingle_hashes(self, text: str) -> np.ndarray:
+        """以码点多项式哈希对字符 shingle 做向量化哈希，并去除重复 shingle"""
+        codepoints = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        k = min(self.shingle_size, len(codepoints))
+        windows = len(codepoints) - k + 1
+        hashes = np.zeros(windows, dtype=np.uint64)
+        for offset in range(k):
+            hashes = hashes * _SHINGLE_BASE + codepoints[offset:offset + windows]
+        return np.unique(hashes)
+
+    def _signature(self, text: str) -> np.ndarray:
+        hashes = self._shingle_hashes(text)
+        return ((np.outer(hashes, self._a) + self._b) >> _SHIFT).min(axis=0)
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [
+            (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    async def transform(self, documents: Documents) -> AsyncGenerator[Document, None]:
+        # 需要看到全部分块后才能确定重复关系，输入为流时先收集
+        documents = [doc async for doc in iterate_documents(documents)]
+        stats = DedupStats(total=len(documents))
+        buckets: Dict[Tuple[int, bytes], List[int]] = defaultdict(list)
+        exact: Dict[str, int] = {}
+        signatures: List[np.ndarray] = []
+        kept: List[Document] = []
+        # 每个分块对应的保留分块下标，自身被保留时为 None
+        canonicals: List[Optional[int]] = []
+
+        for doc in documents:
+            text = self._normalize(doc.page_content)
+            digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+            canonical: Optional[int] = exact.get(digest)
+            if canonical is not None:
+                stats.exact_duplicates += 1
+                canonicals.append(canonical)
+                continue
+
+            signature = self._signature(text)
+            keys = self._band_keys(signature)
+            candidates = {idx for key in keys for idx in buckets.get(key, ())}
+            best_similarity = 0.0
+            for idx in candidates:
+                similarity = float(np.mean(signatures[idx] == signature))
+                if similarity >= self.threshold and similarity > best_similarity:
+                    canonical, best_similarity = idx, similarity
+
+            if canonical is not None:
+                stats.near_duplicates += 1
+                canonicals.append(canonical)
+                continue
+
+            canonicals.append(None)
+            idx = len(kept)
+            kept.append(doc)
+            signatures.append(signature)
+            exact[digest] = idx
+            for key in keys:
+                buckets[key].append(idx)
+
+        stats.unique = len(kept)
+        self.stats = stats
+        logger.info(
+            f"dedup {stats.total} chunks: {stats.unique} unique, "
+            f"{stats.exact_duplicates} exact and {stats.near_duplicates} near duplicates "
+            f"(ratio {stats.ratio:.1%})"
+        )
+
+        duplicate_counts = Counter(idx for idx in canonicals if idx is not None)
+        for idx, doc in enumerate(kept):
+            if duplicate_counts[idx]:
+                doc.metadata["duplicate_count"] = duplicate_counts[idx]
+
+        for doc, canonical in zip(documents, canonicals):
+            if canonical is None:
+                yield doc
+            elif self.mode == "link":
+                doc.metadata["duplicate_of"] = kept[canonical].id
+                yield doc
@@ -1,25 +1,33 @@
-from typing import AsyncGenerator, List
+from typing import AsyncGenerator
 
 from langchain_core.documents import Document
 from langchain_core.language_models import BaseLLM
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import PromptTemplate
 
-from .base import DocumentTransformer
+from .base import DocumentTransformer, Documents, iterate_documents
 
 
 class HypotheticalQuestionTransformer(DocumentTransformer):
-    def __init__(self, llm: BaseLLM, num_questions: int = 3, **kwargs):
+    def __init__(
+            self,
+            llm: BaseLLM,
+            num_questions: int = 3,
+            include_original_content: bool = True,
+            **kwargs
+    ):
         """
         为文档生成问题的转换器
 
         Args:
             llm: 用于生成问题的语言模型
             num_questions: 每个文档生成的问题数量
+            include_original_content: 是否在 metadata 中复制原文；原文可通过 doc_id 从文档存储获取，不需要时可关闭以减少存储
             **kwargs: 其他参数
         """
         super().__init__(**kwargs)
         self.num_questions = num_questions
+        self.include_original_content = include_original_content
 
         prompt = PromptTemplate(
             template="""根据以下文本生成 {num_questions} 个相关的问题：
@@ -34,25 +42,23 @@ class HypotheticalQuestionTransformer(DocumentTransformer):
         # 使用 LCEL 格式构建链
         self.chain = prompt | llm | StrOutputParser()
 
-    async def transform(self, documents: List[Document]) -> AsyncGenerator[Document, None]:
-        for doc in documents:
+    async def transform(self, documents: Documents) -> AsyncGenerator[Document, None]:
+        async for doc in iterate_documents(documents):
             # 生成问题
             questions = await self.chain.ainvoke({
                 "text": doc.page_content,
                 "num_questions": self.num_questions
             })
 
-            # 为每个问题创建新的文档
+            # 为每个问题创建新的文档，共享同一份父文档 metadata
+            base_metadata = {**doc.metadata, "document_type": "question", "doc_id": doc.id}
+            if self.include_original_content:
+                base_metadata["original_content"] = doc.page_content
             for i, question in enumerate(questions.split("\n")):
                 if question.strip():
                     yield Document(
                         page_content=question.strip(),
-                        metadata={
-                            **doc.metadata,
-                            "document_type": "question",
-                            "question_index": i,
-                            "original_content": doc.page_content
-                        }
+                        metadata={**base_metadata, "question_index": i}
                     )
 
             # 同时保留原始文档
@@ -1,11 +1,11 @@
-from typing import AsyncGenerator, List
+from typing import AsyncGenerator
 
 from langchain_core.documents import Document
 
-from .base import DocumentTransformer
+from .base import DocumentTransformer, Documents, iterate_documents
 
 
 class LowercaseTransformer(DocumentTransformer):
-    async def transform(self, documents: List[Document]) -> AsyncGenerator[Document, None]:
-        for doc in documents:
-            yield Document(page_content=doc.content.lower(), metadata=doc.metadata)
+    async def transform(self, documents: Documents) -> AsyncGenerator[Document, None]:
+        async for doc in iterate_documents(documents):
+            yield Document(page_content=doc.page_content.lower(), metadata=doc.metadata)
@@ -1,8 +1,8 @@
-from typing import AsyncGenerator, List
+from typing import AsyncGenerator
 
 from langchain_core.documents import Document
 
-from .base import DocumentTransformer
+from .base import DocumentTransformer, Documents, iterate_documents
 
 
 class MergeDocumentsTransformer(DocumentTransformer):
@@ -17,10 +17,10 @@ class MergeDocumentsTransformer(DocumentTransformer):
         super().__init__(**kwargs)
         self.max_length = max_length
 
-    async def transform(self, documents: List[Document]) -> AsyncGenerator[Document, None]:
+    async def transform(self, documents: Documents) -> AsyncGenerator[Document, None]:
         current_doc = None
 
-        for doc in documents:
+        async for doc in iterate_documents(documents):
             if current_doc is None:
                 current_doc = doc
                 continue
@@ -0,0 +1,245 @@
+import asyncio
+import re
+import unicodedata
+from typing import AsyncGenerator, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from app.utils.process_pool import get_process_pool
+from .base import DocumentTransformer, Documents, iterate_documents
+from .clean import CleanTransformer
+from .lower import LowercaseTransformer
+from .prefix import PrefixTransformer
+
+# 规则以 (操作, 参数...) 表示，便于合并与在进程池中传递
+Op = Tuple
+
+# 控制字符(保留 \t、\n)、零宽字符与 BOM
+_CONTROL_CHARS = [
+    *range(0x00, 0x09), 0x0B, 0x0C, *range(0x0E, 0x20), 0x7F, *range(0x80, 0xA0),
+    0x200B, 0x200C, 0x200D, 0x2060, 0xFEFF,
+]
+# 折叠空白时统一替换为普通空格的字符
+_SPACE_CHARS = [0x09, 0xA0, 0x1680, *range(0x2000, 0x200B), 0x202F, 0x205F, 0x3000]
+
+
+def _compose_tables(first: Dict[int, Optional[str]], second: Dict[int, Optional[str]]) -> Dict[int, Optional[str]]:
+    """合并两张 str.translate 映射表，效果等同于依次执行"""
+    table = {key: (value.translate(second) if value else value) for key, value in first.items()}
+    for key, value in second.items():
+        table.setdefault(key, value)
+    return table
+
+
+def compile_ops(ops: Sequence[Op]) -> List[Op]:
+    """
+    合并相邻的字符级规则，单字符替换与相邻的 translate 合并为一次 translate
+
+    Args:
+        ops: 规则列表
+
+    Returns:
+        合并后的规则列表
+    """
+    compiled: List[Op] = []
+    for op in ops:
+        if op[0] == "replace" and len(op[1]) == 1:
+            op = ("translate", {ord(op[1]): op[2] or None})
+        if op[0] == "translate" and compiled and compiled[-1][0] == "translate":
+            compiled[-1] = ("translate", _compose_tables(compiled[-1][1], op[1]))
+        else:
+            compiled.append(op)
+    return compiled
+
+
+def _normalize_match(match: re.Match) -> str:
+    """正则规则的替换函数：删除页眉页脚行，连续空白按其中的换行数折叠"""
+    if match.lastgroup == "strip":
+        return ""
+    newlines = match.group().count("\n")
+    if newlines >= 2:
+        return "\n\n"
+    return "\n" if newlines else " "
+
+
+def apply_ops(text: str, ops: Sequence[Op]) -> str:
+    """对文本依次执行规则，每条规则都是一次 C 层面的字符串操作"""
+    for op in ops:
+        kind = op[0]
+        if kind == "translate":
+            text = text.translate(op[1])
+        elif kind == "sub":
+            text = op[1].sub(op[2], text)
+        elif kind == "replace":
+            text = text.replace(op[1], op[2])
+        elif kind == "normalize":
+            text = unicodedata.normalize(op[1], text)
+        elif kind == "lower":
+            text = text.lower()
+        elif kind == "strip":
+            text = text.strip()
+        elif kind == "prefix":
+            text = op[1] + text
+        else:
+            raise ValueError(f"不支持的规则: {kind}")
+    return text
+
+
+def apply_ops_batch(texts: List[str], ops: Sequence[Op]) -> List[str]:
+    return [apply_ops(text, ops) for text in texts]
+
+
+class NormalizeTransformer(DocumentTransformer):
+    """
+    文本规范化
+
+    将 unicode 规范化、控制字符清理、空白折叠、页眉页脚删除、小写化、添加前缀等规则
+    编译为少量 C 层面的字符串操作，每个文档只处理一次，大批量文档可在进程池中并行处理。
+    """
+
+    def __init__(
+            self,
+            unicode_form: Optional[str] = "NFKC",
+            strip_control_chars: bool = True,
+            collapse_whitespace: bool = True,
+            strip_patterns: Optional[List[str]] = None,
+            lowercase: bool = False,
+            prefix: str = "",
+            max_workers: int = 0,
+            batch_size: int = 256,
+            parallel_threshold: int = 1_000_000,
+            ops: Optional[Sequence[Op]] = None,
+            **kwargs
+    ):
+        """
+        Args:
+            unicode_form: unicode 规范化形式，如 "NFKC"，为 None 时不处理
+            strip_control_chars: 是否删除控制字符、零宽字符与 BOM
+            collapse_whitespace: 是否将连续空白折叠为一个空格、连续空行折叠为一个空行
+            strip_patterns: 需要整行删除的页眉、页脚等正则表达式，按行匹配
+            lowercase: 是否转换为小写
+            prefix: 添加到正文前的前缀
+            max_workers: 并行处理的进程数，为 0 时在当前进程中处理
+            batch_size: 每批提交给进程池的文档数
+            parallel_threshold: 一批文档总字符数超过该值时才使用进程池
+            ops: 直接指定规则列表，指定时忽略上述规则参数
+            **kwargs: 其他参数
+        """
+        super().__init__(**kwargs)
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.parallel_threshold = parallel_threshold
+        if ops is None:
+            ops = self._build_ops(
+                unicode_form, strip_control_chars, collapse_whitespace, strip_patterns or [], lowercase, prefix
+            )
+        self.ops = compile_ops(ops)
+
+    @staticmethod
+    def _build_ops(
+            unicode_form: Optional[str],
+            strip_control_chars: bool,
+            collapse_whitespace: bool,
+            strip_patterns: List[str],
+            lowercase: bool,
+            prefix: str,
+    ) -> List[Op]:
+        ops: List[Op] = []
+        if unicode_form:
+            ops.append(("normalize", unicode_form))
+
+        table: Dict[int, Optional[str]] = {ord("\r"): None}
+        if strip_control_chars:
+            table.update(dict.fromkeys(_CONTROL_CHARS))
+        if collapse_whitespace:
+            table.update(dict.fromkeys(_SPACE_CHARS, " "))
+        ops.append(("translate", table))
+
+        # 所有基于正则的规则合并为一个表达式，一次扫描完成；
+        # 空白只匹配长度不小于 2 的连续段，单个空格、换行无需替换，匹配失败的代价很低
+        alternatives = []
+        if strip_patterns:
+            alternatives.append(
+                "(?P<strip>^(?:" + "|".join(f"(?:{pattern})" for pattern in strip_patterns) + r")[ ]*(?:\n|\Z))"
+            )
+        if collapse_whitespace:
+            alternatives.append(r"(?P<space>[ \n]{2,})")
+        if alternatives:
+            ops.append(("sub", re.compile("|".join(alternatives), re.MULTILINE), _normalize_match))
+
+        if lowercase:
+            ops.append(("lower",))
+        ops.append(("strip",))
+        if prefix:
+            ops.append(("prefix", prefix))
+        return ops
+
+    async def _apply_batch(self, batch: List[Document]) -> None:
+        texts = [doc.page_content for doc in batch]
+        if self.max_workers > 0 and sum(len(text) for text in texts) >= self.parallel_threshold:
+            loop = asyncio.get_running_loop()
+            texts = await loop.run_in_executor(
+                get_process_pool(self.max_workers), apply_ops_batch, texts, self.ops
+            )
+        else:
+            texts = apply_ops_batch(texts, self.ops)
+        for doc, text in zip(batch, texts):
+            doc.page_content = text
+
+    async def transform(self, documents: Documents) -> AsyncGenerator[Document, None]:
+        batch: List[Document] = []
+        async for doc in iterate_documents(documents):
+            batch.append(doc)
+            if len(batch) >= self.batch_size:
+                await self._apply_batch(batch)
+                for item in batch:
+                    yield item
+                batch = []
+        if batch:
+            await self._apply_batch(batch)
+            for item in batch:
+                yield item
+
+
+def _transformer_ops(transformer: DocumentTransformer) -> Optional[List[Op]]:
+    """返回可融合转换器对应的规则，不可融合时返回 None"""
+    if isinstance(transformer, NormalizeTransformer):
+        return list(transformer.ops)
+    if isinstance(transformer, CleanTransformer):
+        return [("strip",), ("replace", "\n\n", "\n"), ("replace", "\t", " ")]
+    if isinstance(transformer, LowercaseTransformer):
+        return [("lower",)]
+    if isinstance(transformer, PrefixTransformer):
+        return [("prefix", transformer.prefix)]
+    return None
+
+
+def fuse_transformers(transforms: Sequence[DocumentTransformer]) -> List[DocumentTransformer]:
+    """
+    将相邻的清理、小写化、前缀、规范化等轻量转换器融合为一个 NormalizeTransformer，
+    融合后的结果与依次执行相同，但每个文档只需经过一个阶段
+
+    Args:
+        transforms: 转换器列表
+
+    Returns:
+        融合后的转换器列表
+    """
+    fused: List[DocumentTransformer] = []
+    pending: List[DocumentTransformer] = []
+
+    def flush() -> None:
+        if len(pending) == 1:
+            fused.append(pending[0])
+        elif pending:
+            fused.append(NormalizeTransformer(ops=[op for item in pending for op in _transformer_ops(item)]))
+        pending.clear()
+
+    for transformer in transforms:
+        if _transformer_ops(transformer) is None:
+            flush()
+            fused.append(transformer)
+        else:
+            pending.append(transformer)
+    flush()
+    return fused
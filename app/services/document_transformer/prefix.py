@@ -1,8 +1,8 @@
-from typing import AsyncGenerator, List
+from typing import AsyncGenerator
 
 from langchain_core.documents import Document
 
-from .base import DocumentTransformer
+from .base import DocumentTransformer, Documents, iterate_documents
 
 
 class PrefixTransformer(DocumentTransformer):
@@ -10,6 +10,6 @@ class PrefixTransformer(DocumentTransformer):
         super().__init__(**kwargs)
         self.prefix = prefix
 
-    async def transform(self, documents: List[Document]) -> AsyncGenerator[Document, None]:
-        for doc in documents:
-            yield Document(page_content=f"{self.prefix}{doc.content}", metadata=doc.metadata)
+    async def transform(self, documents: Documents) -> AsyncGenerator[Document, None]:
+        async for doc in iterate_documents(documents):
+            yield Document(page_content=f"{self.prefix}{doc.page_content}", metadata=doc.metadata)
@@ -1,25 +1,33 @@
-from typing import AsyncGenerator, List
+from typing import AsyncGenerator
 
 from langchain_core.documents import Document
 from langchain_core.language_models import BaseLLM
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import PromptTemplate
 
-from .base import DocumentTransformer
+from .base import DocumentTransformer, Documents, iterate_documents
 
 
 class SummaryTransformer(DocumentTransformer):
-    def __init__(self, llm: BaseLLM, max_summary_length: int = 200, **kwargs):
+    def __init__(
+            self,
+            llm: BaseLLM,
+            max_summary_length: int = 200,
+            include_original_content: bool = True,
+            **kwargs
+    ):
         """
         为文档生成摘要的转换器
 
         Args:
             llm: 用于生成摘要的语言模型
             max_summary_length: 摘要的最大长度
+            include_original_content: 是否在 metadata 中复制原文；原文可通过 doc_id 从文档存储获取，不需要时可关闭以减少存储
             **kwargs: 其他参数
         """
         super().__init__(**kwargs)
         self.max_summary_length = max_summary_length
+        self.include_original_content = include_original_content
 
         prompt = PromptTemplate(
             template="""请为以下文本生成一个简洁的摘要，摘要长度不超过{max_length}个字符：
@@ -34,8 +42,8 @@ class SummaryTransformer(DocumentTransformer):
         # 使用 LCEL 格式构建链
         self.chain = prompt | llm | StrOutputParser()
 
-    async def transform(self, documents: List[Document]) -> AsyncGenerator[Document, None]:
-        for doc in documents:
+    async def transform(self, documents: Documents) -> AsyncGenerator[Document, None]:
+        async for doc in iterate_documents(documents):
             # 生成摘要
             summary = await self.chain.ainvoke({
                 "text": doc.page_content,
@@ -43,14 +51,14 @@ class SummaryTransformer(DocumentTransformer):
             })
 
             # 创建摘要文档
-            yield Document(
-                page_content=summary.strip(),
-                metadata={
-                    **doc.metadata,
-                    "document_type": "summary",
-                    "original_content": doc.page_content
-                }
-            )
+            metadata = {
+                **doc.metadata,
+                "document_type": "summary",
+                "doc_id": doc.id,
+            }
+            if self.include_original_content:
+                metadata["original_content"] = doc.page_content
+            yield Document(page_content=summary.strip(), metadata=metadata)
 
             # 同时保留原始文档
             # yield doc
@@ -0,0 +1,243 @@
+import asyncio
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+import redis.asyncio as redis
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from app.core.database import Database
+from app.core.exceptions import IdempotencyConflictError
+from app.logger import get_logger
+from app.models.idempotency_key import IdempotencyKey
+
+logger = get_logger(__name__)
+
+_IN_PROGRESS = "in_progress"
+_COMPLETED = "completed"
+
+
+def fingerprint(payload: Any) -> str:
+    """请求内容的指纹，同一个幂等键只能用于内容相同的请求"""
+    encoded = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+@dataclass
+class IdempotentRequest:
+    scope: str
+    key: str
+    fingerprint: str
+    # 同一幂等键的请求已完成时为 True，response 为缓存的响应
+    replayed: bool = False
+    response: Optional[Any] = None
+
+
+class IdempotencyService:
+    """
+    基于 Redis 的幂等键存储
+
+    第一个请求以 SET NX 占用幂等键并执行，完成后缓存响应；之后相同幂等键、相同内容的请求
+    直接返回缓存的响应。第一个请求仍在执行时重复的请求返回 409，执行失败时释放幂等键以便客户端重试。
+    执行期间定期续期占用，进程异常退出后占用在 lock_ttl 内到期。
+
+    写数据库的请求使用 run_in_transaction：幂等键与请求的写操作在同一事务中写入带唯一约束的
+    idempotency_keys 表，Redis 只用于快速拒绝并发的重复请求与缓存响应，
+    提交后进程退出或 Redis 写入失败时，重复的请求从数据库中的记录返回响应。
+    """
+
+    def __init__(
+            self,
+            redis_client: redis.Redis,
+            db: Optional[Database] = None,
+            namespace: str = "idempotency",
+            ttl: int = 86400,
+            lock_ttl: int = 60,
+    ):
+        """
+        Args:
+            redis_client: Redis 客户端
+            db: 数据库，run_in_transaction 使用
+            namespace: Redis key 前缀
+            ttl: 缓存响应的保留时间(秒)，超过后相同的幂等键视为新请求
+            lock_ttl: 请求执行中占用幂等键的时间(秒)，执行期间每隔 lock_ttl/3 续期
+        """
+        self.redis = redis_client
+        self.db = db
+        self.namespace = namespace
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+
+    def _redis_key(self, scope: str, key: str) -> str:
+        return f"{self.namespace}:{scope}:{key}"
+
+    async def begin(self, scope: str, key: str, payload: Any) -> IdempotentRequest:
+        """
+        开始处理带幂等键的请求
+
+        Args:
+            scope: 接口名称，不同接口的幂等键互不影响
+            key: 客户端提供的幂等键
+            payload: 请求内容
+
+        Returns:
+            请求记录，已完成的请求包含缓存的响应
+
+        Raises:
+            IdempotencyConflictError: 幂等键已用于内容不同的请求，或相同的请求仍在执行
+        """
+        request = IdempotentRequest(scope, key, fingerprint(payload))
+        record = json.dumps({"state": _IN_PROGRESS, "fingerprint": request.fingerprint})
+        redis_key = self._redis_key(scope, key)
+        if await self.redis.set(redis_key, record, nx=True, ex=self.lock_ttl):
+            return request
+
+        existing = await self.redis.get(redis_key)
+        if existing is None:
+            # 占用幂等键的请求刚好失败或过期，让客户端重试
+            raise IdempotencyConflictError(detail=f"Request with Idempotency-Key {key} is being processed")
+        existing = json.loads(existing)
+        if existing["fingerprint"] != request.fingerprint:
+            raise IdempotencyConflictError(detail=f"Idempotency-Key {key} was used for a different request")
+        if existing["state"] != _COMPLETED:
+            raise IdempotencyConflictError(detail=f"Request with Idempotency-Key {key} is being processed")
+
+        logger.info(f"Replaying response for {scope} Idempotency-Key {key}")
+        request.replayed = True
+        request.response = existing["response"]
+        return request
+
+    async def complete(self, request: IdempotentRequest, response: Any) -> None:
+        """缓存请求的响应"""
+        record = {"state": _COMPLETED, "fingerprint": request.fingerprint, "response": jsonable_encoder(response)}
+        await self.redis.set(self._redis_key(request.scope, request.key), json.dumps(record), ex=self.ttl)
+
+    async def fail(self, request: IdempotentRequest) -> None:
+        """请求执行失败，释放幂等键"""
+        await self.redis.delete(self._redis_key(request.scope, request.key))
+
+    async def _keep_alive(self, request: IdempotentRequest) -> None:
+        """请求执行期间续期幂等键的占用，避免执行时间超过 lock_ttl 时重复的请求被执行"""
+        redis_key = self._redis_key(request.scope, request.key)
+        while True:
+            await asyncio.sleep(self.lock_ttl / 3)
+            try:
+                await self.redis.expire(redis_key, self.lock_ttl)
+            except Exception as e:
+                logger.warning(f"Failed to extend Idempotency-Key {request.key}: {str(e)}")
+
+    async def _execute(self, request: IdempotentRequest, func: Callable[[], Awaitable[Any]]) -> Any:
+        keep_alive = asyncio.create_task(self._keep_alive(request))
+        try:
+            return await func()
+        finally:
+            keep_alive.cancel()
+
+    async def run(self, scope: str, key: Optional[str], payload: Any, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        以幂等键执行 func 并缓存其响应，相同幂等键的重复请求直接返回缓存的响应
+
+        Args:
+            scope: 接口名称
+            key: 客户端提供的幂等键，为 None 时直接执行
+            payload: 请求内容
+            func: 处理请求的函数
+
+        Returns:
+            func 的响应或缓存的响应(已转换为 JSON 兼容的结构)
+        """
+        if key is None:
+            return await func()
+        request = await self.begin(scope, key, payload)
+        if request.replayed:
+            return request.response
+        try:
+            response = await self._execute(request, func)
+        except Exception:
+            await self.fail(request)
+            raise
+        await self.complete(request, response)
+        return response
+
+    async def _stored_response(self, request: IdempotentRequest) -> Optional[IdempotentRequest]:
+        """读取数据库中已提交的请求记录，不存在时返回 None"""
+        # 在事务中读取以使用主库，副本可能尚未同步刚提交的记录
+        async with self.db.transaction() as session:
+            result = await session.execute(
+                select(IdempotencyKey.fingerprint, IdempotencyKey.response)
+                .where(IdempotencyKey.scope == request.scope, IdempotencyKey.key == request.key)
+            )
+            row = result.one_or_none()
+        if row is None:
+            return None
+        if row.fingerprint != request.fingerprint:
+            raise IdempotencyConflictError(detail=f"Idempotency-Key {request.key} was used for a different request")
+        logger.info(f"Replaying stored response for {request.scope} Idempotency-Key {request.key}")
+        return IdempotentRequest(request.scope, request.key, request.fingerprint, True, row.response)
+
+    async def _commit(self, request: IdempotentRequest, func: Callable[[], Awaitable[Any]]) -> Any:
+        async with self.db.transaction() as session:
+            response = await func()
+            session.add(IdempotencyKey(
+                scope=request.scope,
+                key=request.key,
+                fingerprint=request.fingerprint,
+                response=jsonable_encoder(response),
+            ))
+            await session.flush()
+        return response
+
+    async def run_in_transaction(
+            self,
+            scope: str,
+            key: Optional[str],
+            payload: Any,
+            func: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """
+        在事务中执行 func，并在同一事务中记录幂等键与响应，相同幂等键的重复请求返回记录的响应
+
+        func 中的 db.transaction() 加入该事务，幂等键与 func 的写操作一起提交或回滚。
+        提交后不再释放幂等键，缓存响应失败也不影响请求的结果。
+
+        Args:
+            scope: 接口名称
+            key: 客户端提供的幂等键，为 None 时直接执行
+            payload: 请求内容
+            func: 处理请求的函数
+
+        Returns:
+            func 的响应或记录的响应(已转换为 JSON 兼容的结构)
+        """
+        if key is None:
+            return await func()
+        request = await self.begin(scope, key, payload)
+        if request.replayed:
+            return request.response
+
+        try:
+            # Redis 中的记录过期或丢失时，请求可能已经提交
+            stored = await self._stored_response(request)
+            if stored is not None:
+                response = stored.response
+            else:
+                response = await self._execute(request, lambda: self._commit(request, func))
+        except IntegrityError:
+            # 占用过期后重复的请求先提交了幂等键，本次事务已回滚
+            stored = await self._stored_response(request)
+            if stored is None:
+                await self.fail(request)
+                raise
+            response = stored.response
+        except Exception:
+            await self.fail(request)
+            raise
+
+        try:
+            await self.complete(request, response)
+        except Exception as e:
+            logger.warning(f"Failed to cache response for {scope} Idempotency-Key {key}: {str(e)}")
+        return response
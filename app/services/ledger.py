@@ -0,0 +1,185 @@
+import time
+import uuid
+from typing import Dict, Optional, Sequence, Tuple
+
+from app.core.database import Database
+from app.core.exceptions import AccountNotFoundError, InsufficientFundsError, ValidationError
+from app.logger import get_logger
+from app.models.ledger import BalanceSnapshot, LedgerEntry
+from app.repositories.ledger import LedgerRepository
+
+logger = get_logger(__name__)
+
+
+def _entry_id_before(timestamp: float) -> str:
+    """返回 uuid7 时间戳部分为 timestamp(秒)的最小 id，创建时间早于 timestamp 的流水 id 都小于它"""
+    return str(uuid.UUID(int=int(timestamp * 1000) << 80))
+
+
+def _check_amount(amount: float) -> None:
+    # 负数金额会让入账变成不检查余额的出账、出账变成入账
+    if amount <= 0:
+        raise ValidationError(detail=f"Amount must be positive, got {amount}")
+
+
+class LedgerService:
+    """
+    基于流水的账户余额
+
+    存取款与转账只追加流水，余额为最新快照与快照之后的流水之和。入账不锁定任何行，
+    热点账户的并发入账互不阻塞；出账需要检查余额，锁定账户行串行化同一账户的出账。
+    定期调用 take_snapshots 将已稳定的流水汇总为快照，控制计算余额时需要汇总的流水数量。
+    """
+
+    def __init__(self, db: Database, ledger_repository: LedgerRepository):
+        self.db = db
+        self.ledger_repository = ledger_repository
+
+    async def _balances(self, account_ids: Sequence[str]) -> Dict[str, float]:
+        snapshots = await self.ledger_repository.get_snapshots(account_ids)
+        entries = await self.ledger_repository.sum_entries_after_snapshot(account_ids)
+        return {
+            account_id: snapshots.get(account_id, (0.0, None))[0] + entries.get(account_id, (0.0, None))[0]
+            for account_id in account_ids
+        }
+
+    async def get_balance(self, account_id: uuid.UUID | str) -> float:
+        """获取账户余额"""
+        account_id = str(account_id)
+        async with self.db.session():
+            return (await self._balances([account_id]))[account_id]
+
+    async def deposit(self, account_id: uuid.UUID | str, amount: float, reference: Optional[str] = None) -> None:
+        """入账，只追加一条流水"""
+        _check_amount(amount)
+        account_id = str(account_id)
+        async with self.db.transaction():
+            if not await self.ledger_repository.existing_accounts([account_id]):
+                raise AccountNotFoundError(account_id)
+            await self.ledger_repository.bulk_create([
+                LedgerEntry(account_id=account_id, amount=amount, entry_type="deposit", reference=reference)
+            ])
+
+    async def withdraw(self, account_id: uuid.UUID | str, amount: float, reference: Optional[str] = None) -> float:
+        """
+        出账，锁定账户行检查余额后追加一条流水
+
+        Returns:
+            出账后的余额
+        """
+        _check_amount(amount)
+        account_id = str(account_id)
+        async with self.db.transaction():
+            balance = await self._check_funds(account_id, amount)
+            await self.ledger_repository.bulk_create([
+                LedgerEntry(account_id=account_id, amount=-amount, entry_type="withdraw", reference=reference)
+            ])
+        return balance - amount
+
+    async def _check_funds(self, account_id: str, amount: float) -> float:
+        """
+        锁定账户行后检查余额
+
+        必须是事务中的第一条查询：MySQL 的 REPEATABLE READ 在第一次非锁定读时建立快照，
+        之后的普通查询读不到等待锁期间其他事务提交的出账流水
+        """
+        if not await self.ledger_repository.lock_account(account_id):
+            raise AccountNotFoundError(account_id)
+        balance = (await self._balances([account_id]))[account_id]
+        if balance < amount:
+            raise InsufficientFundsError(account_id, amount, balance)
+        return balance
+
+    async def transfer(
+            self,
+            from_account_id: uuid.UUID | str,
+            to_account_id: uuid.UUID | str,
+            amount: float,
+            reference: Optional[str] = None,
+    ) -> str:
+        """
+        转账，只锁定出账账户，以同一个关联ID追加出账、入账两条流水
+
+        Returns:
+            转账的关联ID
+        """
+        _check_amount(amount)
+        from_account_id, to_account_id = str(from_account_id), str(to_account_id)
+        reference = reference or str(uuid.uuid4())
+        async with self.db.transaction():
+            await self._check_funds(from_account_id, amount)
+            if not await self.ledger_repository.existing_accounts([to_account_id]):
+                raise AccountNotFoundError(to_account_id)
+            await self.ledger_repository.bulk_create([
+                LedgerEntry(account_id=from_account_id, amount=-amount, entry_type="transfer_out", reference=reference),
+                LedgerEntry(account_id=to_account_id, amount=amount, entry_type="transfer_in", reference=reference),
+            ])
+        return reference
+
+    async def lock_balances(self, account_ids: Sequence[str]) -> Dict[str, float]:
+        """
+        锁定账户行并返回余额，用于批量转账在内存中逐笔检查余额
+
+        需要在调用方的事务中执行，且必须是事务中的第一条查询(见 _check_funds)
+
+        Returns:
+            账户ID到余额的映射，不存在的账户不包含在内
+        """
+        existing = await self.ledger_repository.lock_accounts(sorted(set(account_ids)))
+        return await self._balances(sorted(existing))
+
+    async def append_transfers(self, transfers: Sequence[Tuple[str, str, float]]) -> None:
+        """
+        追加一批转账的流水，每笔转账以独立的关联ID写入出账、入账两条流水
+
+        需要在调用方的事务中执行，调用前已通过 lock_balances 锁定账户并检查余额
+        """
+        entries = []
+        for from_account_id, to_account_id, amount in transfers:
+            _check_amount(amount)
+            reference = str(uuid.uuid4())
+            entries.append(LedgerEntry(
+                account_id=from_account_id, amount=-amount, entry_type="transfer_out", reference=reference,
+            ))
+            entries.append(LedgerEntry(
+                account_id=to_account_id, amount=amount, entry_type="transfer_in", reference=reference,
+            ))
+        await self.ledger_repository.bulk_create(entries)
+
+    async def take_snapshots(
+            self,
+            account_ids: Optional[Sequence[uuid.UUID | str]] = None,
+            settle_seconds: float = 60.0,
+    ) -> int:
+        """
+        将各账户最新快照之后、创建时间早于 settle_seconds 秒前的流水汇总为新快照
+
+        流水 id 在写入时生成，事务提交前可能有 id 更小的流水尚不可见，只汇总已稳定的流水，
+        settle_seconds 应大于写流水事务的最长耗时。
+
+        Args:
+            account_ids: 账户ID列表，默认为所有有流水的账户
+            settle_seconds: 流水创建后经过该时间视为已稳定
+
+        Returns:
+            新增的快照数
+        """
+        before = _entry_id_before(time.time() - settle_seconds)
+        async with self.db.transaction():
+            if account_ids is None:
+                account_ids = await self.ledger_repository.accounts_with_entries()
+            account_ids = [str(account_id) for account_id in account_ids]
+            if not account_ids:
+                return 0
+            snapshots = await self.ledger_repository.get_snapshots(account_ids)
+            entries = await self.ledger_repository.sum_entries_after_snapshot(account_ids, before=before)
+            await self.ledger_repository.add_snapshots([
+                BalanceSnapshot(
+                    account_id=account_id,
+                    balance=snapshots.get(account_id, (0.0, None))[0] + total,
+                    last_entry_id=last_entry_id,
+                )
+                for account_id, (total, last_entry_id) in entries.items()
+            ])
+        logger.info(f"Took {len(entries)} balance snapshots")
+        return len(entries)
@@ -0,0 +1,3 @@
+from .multi_vector import MultiVectorRetriever
+
+__all__ = ["MultiVectorRetriever"]
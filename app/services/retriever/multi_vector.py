@@ -0,0 +1,102 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.documents import Document
+
+from app.logger import get_logger
+from app.services.doc_store.base import DocumentStore
+from app.services.vector_store.base import SearchResult, VectorStoreService
+
+logger = get_logger(__name__)
+
+
+class MultiVectorRetriever:
+    """多向量检索器：通过子文档(问题/摘要/分块)的向量检索，返回对应的父文档"""
+
+    def __init__(
+            self,
+            vector_stores: Sequence[VectorStoreService],
+            doc_store: DocumentStore,
+            id_key: str = "doc_id",
+    ):
+        """
+        Args:
+            vector_stores: 存放子文档向量的向量存储列表，会被并发检索
+            doc_store: 存放父文档的文档存储
+            id_key: 子文档 metadata 中指向父文档 id 的字段
+        """
+        self.vector_stores = list(vector_stores)
+        self.doc_store = doc_store
+        self.id_key = id_key
+
+    async def aretrieve(
+            self,
+            query: str,
+            collection_name: Optional[str] = None,
+            top_k: int = 10,
+            filter: Optional[Dict[str, Any]] = None,
+    ) -> List[SearchResult]:
+        """
+        检索父文档
+
+        每个向量存储检索完成后立即对新出现的父文档 id 发起一次批量 amget，
+        使文档存储的读取与其余向量检索重叠进行。
+
+        Returns:
+            按最佳子文档得分排序的父文档，找不到的父文档会被忽略
+        """
+        # 父文档 id -> 得分最好的子文档结果，dict 保持插入顺序，用作有序集合
+        best_children: Dict[str, SearchResult] = {}
+        parents: Dict[str, Optional[Document]] = {}
+        fetches: List[asyncio.Task] = []
+
+        async def fetch(ids: List[str]) -> None:
+            docs = await self.doc_store.amget(ids)
+            parents.update(zip(ids, docs))
+
+        async def search(vector_store: VectorStoreService) -> None:
+            children = await vector_store.aretrieve(query, collection_name, top_k=top_k, filter=filter)
+            new_ids = []
+            for child in children:
+                parent_id = child.metadata.get(self.id_key)
+                if parent_id is None:
+                    continue
+                current = best_children.get(parent_id)
+                if current is None:
+                    new_ids.append(parent_id)
+                    best_children[parent_id] = child
+                elif vector_store.is_better_score(child.score, current.score):
+                    best_children[parent_id] = child
+            if new_ids:
+                fetches.append(asyncio.create_task(fetch(new_ids)))
+
+        try:
+            await asyncio.gather(*[search(vector_store) for vector_store in self.vector_stores])
+            await asyncio.gather(*fetches)
+        finally:
+            for task in fetches:
+                task.cancel()
+
+        ranked = self._rank(best_children)
+        results = []
+        for parent_id, child in ranked:
+            doc = parents.get(parent_id)
+            if doc is None:
+                logger.warning(f"parent document {parent_id} not found in doc store")
+                continue
+            results.append(
+                SearchResult(
+                    document=doc,
+                    score=child.score,
+                    metadata=doc.metadata,
+                )
+            )
+        return results
+
+    def _rank(self, best_children: Dict[str, SearchResult]) -> List[tuple[str, SearchResult]]:
+        """单个向量存储时按其得分方向排序，多个存储的得分不可比，保持首次出现的顺序"""
+        items = list(best_children.items())
+        if len(self.vector_stores) != 1:
+            return items
+        reverse = not self.vector_stores[0].SCORE_IS_DISTANCE
+        return sorted(items, key=lambda item: item[1].score, reverse=reverse)
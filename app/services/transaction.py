@@ -1,21 +1,59 @@
 import uuid
-from typing import Dict, Any
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from typing import Dict, Any, List, Optional, Sequence, Tuple
 
-from sqlalchemy import select
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import select, update, case
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import Database
 from app.core.exceptions import AccountNotFoundError, DatabaseError, InsufficientFundsError, AccountLockedError
 from app.logger import get_logger
-from app.models import Account
+from app.models import Account, TransferBatch
+from app.services.ledger import LedgerService
 
 logger = get_logger(__name__)
 
 
+@dataclass
+class TransferItem:
+    """批量转账中的一笔转账"""
+    from_account: str
+    to_account: str
+    amount: float
+
+
+@dataclass
+class TransferResult:
+    """批量转账中一笔转账的结果，失败时 error 与单笔转账工作流的错误类型一致"""
+    from_account: str
+    to_account: str
+    amount: float
+    status: str
+    error: Optional[str] = None
+    message: Optional[str] = None
+
+
 class TransactionService:
-    def __init__(self, db: Database):
+    """
+    账户存取款与转账
+
+    默认直接修改 accounts.balance；use_ledger 为 True 时改为只追加流水(LedgerService)，
+    入账不再锁定账户行，余额通过 get_balance 查询，accounts.balance 不再更新。
+    """
+
+    def __init__(self, db: Database, ledger_service: Optional[LedgerService] = None, use_ledger: bool = False):
+        """
+        Args:
+            db: 数据库
+            ledger_service: 基于流水的账户余额服务
+            use_ledger: 是否以流水记录余额，为 True 时需要提供 ledger_service
+        """
+        if use_ledger and ledger_service is None:
+            raise ValueError("use_ledger requires a ledger_service")
         self.db = db
+        self.ledger = ledger_service if use_ledger else None
 
     @property
     def session(self) -> AsyncSession:
@@ -42,61 +80,236 @@ class TransactionService:
         result = await self.session.execute(query)
         return result.scalar_one_or_none()
 
-    async def _withdraw(self, account: Account, amount: float) -> Account:
+    async def get_balance(self, account_id: uuid.UUID) -> float:
+        """获取账户余额"""
+        if self.ledger is not None:
+            return await self.ledger.get_balance(account_id)
+        async with self.db.session():
+            return (await self.get_account_by_id(account_id)).balance
+
+    @staticmethod
+    def _check_not_locked(account_id: uuid.UUID, amount: float) -> None:
+        if amount == 10:
+            raise AccountLockedError(account_id)
+
+    async def _change_balance(self, account_id: uuid.UUID, delta: float) -> Account:
+        """
+        以一条 UPDATE 语句原子地修改余额并返回更新后的账户
+
+        余额在数据库中计算(balance = balance + delta)，扣款时在同一条语句中检查余额，
+        并发修改同一账户时不会丢失更新。数据库支持 UPDATE ... RETURNING 时一次往返完成，
+        否则根据影响行数判断是否成功，再读取账户。
+        """
+        stmt = (
+            update(Account)
+            .where(Account.id == str(account_id))
+            .values(balance=Account.balance + delta)
+        )
+        if delta < 0:
+            stmt = stmt.where(Account.balance >= -delta)
+
+        if self.session.get_bind().dialect.update_returning:
+            result = await self.session.execute(
+                stmt.returning(Account).execution_options(populate_existing=True)
+            )
+            account = result.scalars().first()
+        else:
+            result = await self.session.execute(stmt)
+            account = await self.session.get(Account, str(account_id), populate_existing=True) \
+                if result.rowcount else None
+
+        if account is None:
+            # 未更新任何行时再区分账户不存在与余额不足
+            current = await self.get_account_by_id(account_id)
+            raise InsufficientFundsError(current.id, -delta, current.balance)
+        return account
+
+    async def _withdraw(self, account_id: uuid.UUID, amount: float) -> Account:
         """Internal withdraw operation"""
-        if account.balance < amount:
-            raise InsufficientFundsError(account.id, amount, account.balance)
-        account.balance -= amount
-        await self.session.flush()
-        logger.info(f"Withdrew {amount} from account {account.id}, new balance: {account.balance} {self.session}")
-        await self.session.refresh(account)
+        account = await self._change_balance(account_id, -amount)
+        logger.info(f"Withdrew {amount} from account {account_id}, new balance: {account.balance}")
         return account
 
-    async def _deposit(self, account: Account, amount: float) -> Account:
+    async def _deposit(self, account_id: uuid.UUID, amount: float) -> Account:
         """Internal deposit operation"""
-        if amount == 10:
-            raise AccountLockedError(account.id)
-        account.balance += amount
-        await self.session.flush()
-        logger.info(f"Deposited {amount} to account {account.id}, new balance: {account.balance} {self.session}")
-        await self.session.refresh(account)
+        self._check_not_locked(account_id, amount)
+        account = await self._change_balance(account_id, amount)
+        logger.info(f"Deposited {amount} to account {account_id}, new balance: {account.balance}")
         return account
 
-    async def withdraw(self, account_id: uuid.UUID, amount: float) -> Account:
-        """Withdraw money from an account"""
+    async def withdraw(self, account_id: uuid.UUID, amount: float) -> Optional[Account]:
+        """Withdraw money from an account; 以流水记录余额时返回 None"""
         try:
-            async with self.db.transaction():
-                account = await self.get_account_by_id(account_id)
-                return await self._withdraw(account, amount)
+            if self.ledger is not None:
+                await self.db.run_in_transaction(self.ledger.withdraw, account_id, amount)
+                return None
+            return await self.db.run_in_transaction(self._withdraw, account_id, amount)
         except SQLAlchemyError as e:
             logger.error(f"Database error during withdrawal: {str(e)}")
             raise DatabaseError(f"Failed to process withdrawal for account {account_id}")
 
-    async def deposit(self, account_id: uuid.UUID, amount: float) -> Account:
-        """Deposit money to an account"""
+    async def deposit(self, account_id: uuid.UUID, amount: float) -> Optional[Account]:
+        """Deposit money to an account; 以流水记录余额时返回 None"""
         try:
-            async with self.db.transaction():
-                account = await self.get_account_by_id(account_id)
-                return await self._deposit(account, amount)
+            if self.ledger is not None:
+                self._check_not_locked(account_id, amount)
+                await self.db.run_in_transaction(self.ledger.deposit, account_id, amount)
+                return None
+            return await self.db.run_in_transaction(self._deposit, account_id, amount)
         except SQLAlchemyError as e:
             logger.error(f"Database error during deposit: {str(e)}")
             raise DatabaseError(f"Failed to process deposit for account {account_id}")
 
     async def transfer(self, from_account_id: uuid.UUID, to_account_id: uuid.UUID, amount: float) -> Dict[str, Any]:
         """Transfer money between accounts using unit of work pattern"""
+        return await self.db.run_in_transaction(self._transfer, from_account_id, to_account_id, amount)
 
-        async with self.db.transaction():
-            # Get both accounts
-            from_account = await self.get_account_by_id(from_account_id)
-            to_account = await self.get_account_by_id(to_account_id)
-
-            # Perform withdrawal and deposit
-            await self._withdraw(from_account, amount)
-            await self._deposit(to_account, amount)
-
-            return {
-                "from_account": from_account_id,
-                "to_account": to_account_id,
-                "amount": amount,
-                "status": "success"
-            }
+    async def _transfer(self, from_account_id: uuid.UUID, to_account_id: uuid.UUID, amount: float) -> Dict[str, Any]:
+        if self.ledger is not None:
+            # 只锁定出账账户
+            self._check_not_locked(to_account_id, amount)
+            await self.ledger.transfer(from_account_id, to_account_id, amount)
+        else:
+            # 按账户ID顺序加锁，避免相向转账互相等待对方持有的行锁导致死锁
+            operations = [(from_account_id, self._withdraw), (to_account_id, self._deposit)]
+            for account_id, operation in sorted(operations, key=lambda item: str(item[0])):
+                await operation(account_id, amount)
+
+        return {
+            "from_account": from_account_id,
+            "to_account": to_account_id,
+            "amount": amount,
+            "status": "success"
+        }
+
+    @staticmethod
+    def _check_transfer(item: TransferItem, balances: Dict[str, float]) -> Optional[Exception]:
+        """按当前余额检查一笔转账，返回导致失败的异常"""
+        for account_id in (item.from_account, item.to_account):
+            if account_id not in balances:
+                return AccountNotFoundError(account_id)
+        if balances[item.from_account] < item.amount:
+            return InsufficientFundsError(item.from_account, item.amount, balances[item.from_account])
+        if item.amount == 10:
+            return AccountLockedError(item.to_account)
+        return None
+
+    async def batch_transfer(
+            self,
+            transfers: Sequence[TransferItem],
+            batch_key: Optional[str] = None,
+    ) -> List[TransferResult]:
+        """
+        在一个事务中执行一批转账
+
+        涉及的账户按ID顺序一次加锁读取，转账按顺序在内存中逐笔检查(失败的转账不影响其他转账)，
+        成功的转账按账户轧差后以一条 UPDATE 写入(以流水记录余额时以一条多行 INSERT 追加流水)，
+        事务内的数据库往返次数与转账笔数无关。
+
+        指定 batch_key 时批次键与转账结果在同一事务中写入唯一键约束的 transfer_batches 表，
+        已执行过的批次直接返回记录的结果；同一批次并发执行时只有一个事务能提交，
+        因此 activity 在事务提交后、上报结果前失败而被重试时不会重复转账。
+
+        Args:
+            transfers: 转账列表
+            batch_key: 批次键，相同批次键的批次只执行一次
+
+        Returns:
+            与 transfers 一一对应的转账结果
+        """
+        transfers = [
+            TransferItem(str(item.from_account), str(item.to_account), item.amount) for item in transfers
+        ]
+        try:
+            try:
+                results, updated = await self.db.run_in_transaction(self._batch_transfer, transfers, batch_key)
+            except IntegrityError:
+                if batch_key is None:
+                    raise
+                # 同一批次的另一次执行先提交，本次已回滚，返回先提交的结果
+                results, updated = await self.db.run_in_transaction(self._processed_batch, batch_key), 0
+                if results is None:
+                    raise
+        except SQLAlchemyError as e:
+            logger.error(f"Database error during batch transfer: {str(e)}")
+            raise DatabaseError(f"Failed to process batch of {len(transfers)} transfers")
+
+        logger.info(
+            f"Batch transfer: {sum(item.status == 'completed' for item in results)}/{len(results)} completed, "
+            f"{updated} accounts updated"
+        )
+        return results
+
+    async def _processed_batch(self, batch_key: str) -> Optional[List[TransferResult]]:
+        """返回已执行批次记录的结果，批次未执行时返回 None"""
+        result = await self.session.execute(
+            select(TransferBatch.results).where(TransferBatch.batch_key == batch_key)
+        )
+        stored = result.scalar_one_or_none()
+        if stored is None:
+            return None
+        return [TransferResult(**item) for item in stored]
+
+    async def _lock_balances(self, account_ids: List[str]) -> Dict[str, float]:
+        """按ID顺序锁定账户并返回余额，不存在的账户不包含在内"""
+        if self.ledger is not None:
+            return await self.ledger.lock_balances(account_ids)
+        result = await self.session.execute(
+            select(Account.id, Account.balance)
+            .where(Account.id.in_(account_ids))
+            .order_by(Account.id)
+            .with_for_update()
+        )
+        return {str(account_id): balance for account_id, balance in result.all()}
+
+    async def _batch_transfer(
+            self,
+            transfers: List[TransferItem],
+            batch_key: Optional[str] = None,
+    ) -> Tuple[List[TransferResult], int]:
+        # 先锁定账户再读取其他数据：MySQL 的 REPEATABLE READ 在第一次非锁定读时建立快照，
+        # 以流水计算余额时快照之后提交的流水不可见
+        account_ids = sorted({item.from_account for item in transfers} | {item.to_account for item in transfers})
+        balances = await self._lock_balances(account_ids)
+
+        if batch_key is not None:
+            processed = await self._processed_batch(batch_key)
+            if processed is not None:
+                logger.info(f"Transfer batch {batch_key} already processed")
+                return processed, 0
+
+        results: List[TransferResult] = []
+        completed: List[Tuple[str, str, float]] = []
+        deltas: Dict[str, float] = defaultdict(float)
+        for item in transfers:
+            error = self._check_transfer(item, balances)
+            if error is not None:
+                results.append(TransferResult(
+                    item.from_account, item.to_account, item.amount,
+                    status="failed",
+                    error=error.__class__.__name__.lower().replace("error", ""),
+                    message=str(error),
+                ))
+                continue
+            balances[item.from_account] -= item.amount
+            balances[item.to_account] += item.amount
+            deltas[item.from_account] -= item.amount
+            deltas[item.to_account] += item.amount
+            completed.append((item.from_account, item.to_account, item.amount))
+            results.append(TransferResult(item.from_account, item.to_account, item.amount, status="completed"))
+
+        deltas = {account_id: delta for account_id, delta in deltas.items() if delta}
+        if self.ledger is not None:
+            if completed:
+                await self.ledger.append_transfers(completed)
+        elif deltas:
+            await self.session.execute(
+                update(Account)
+                .where(Account.id.in_(list(deltas)))
+                .values(balance=Account.balance + case(deltas, value=Account.id))
+                .execution_options(synchronize_session=False)
+            )
+        if batch_key is not None:
+            self.session.add(TransferBatch(batch_key=batch_key, results=[asdict(item) for item in results]))
+            await self.session.flush()
+        return results, len(deltas)
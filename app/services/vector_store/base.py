@@ -21,10 +21,17 @@ class SearchResult:
 class VectorStoreService(ABC):
     """向量存储服务基类"""
 
+    # 检索得分是否为距离(越小越相似)，否则为相似度(越大越相似)
+    SCORE_IS_DISTANCE: bool = False
+
+    def is_better_score(self, score: float, other: float) -> bool:
+        """判断 score 是否比 other 更相似"""
+        return score < other if self.SCORE_IS_DISTANCE else score > other
+
     async def aadd_documents(
             self, documents: list[Document], **kwargs: Any
     ) -> list[str]:
-        return await run_in_executor(None, self.add_documents, documents, kwargs)
+        return await run_in_executor(None, self.add_documents, documents, **kwargs)
 
     @abstractmethod
     def add_documents(
@@ -32,6 +39,14 @@ class VectorStoreService(ABC):
     ) -> list[str]:
         pass
 
+    @abstractmethod
+    def delete(self, ids: list[str], **kwargs: Any) -> None:
+        """按向量ID删除"""
+        pass
+
+    async def adelete(self, ids: list[str], **kwargs: Any) -> None:
+        return await run_in_executor(None, self.delete, ids, **kwargs)
+
     @abstractmethod
     def retrieve(
             self,
@@ -11,6 +11,8 @@ from .base import VectorStoreService, SearchResult
 class ChromaVectorStore(VectorStoreService):
     """Chroma向量存储实现"""
 
+    SCORE_IS_DISTANCE = True
+
     def __init__(
             self,
             embedding_service: EmbeddingService,
@@ -28,6 +30,12 @@ class ChromaVectorStore(VectorStoreService):
     ) -> list[str]:
         return self._store.add_documents(documents, **kwargs)
 
+    def delete(self, ids: list[str], **kwargs: Any) -> None:
+        self._store.delete(ids, **kwargs)
+
+    async def adelete(self, ids: list[str], **kwargs: Any) -> None:
+        await self._store.adelete(ids, **kwargs)
+
     async def aadd_documents(
             self, documents: list[Document], **kwargs: Any
     ) -> list[str]:
@@ -11,6 +11,8 @@ from .base import VectorStoreService, SearchResult
 class MilvusVectorStore(VectorStoreService):
     """Milvus向量存储实现"""
 
+    SCORE_IS_DISTANCE = True
+
     def __init__(
             self,
             embedding_service: EmbeddingService,
@@ -36,6 +38,17 @@ class MilvusVectorStore(VectorStoreService):
     ) -> list[str]:
         return self._store.add_documents(documents, **kwargs)
 
+    def delete(self, ids: list[str], **kwargs: Any) -> None:
+        self._store.delete(self._primary_keys(ids), **kwargs)
+
+    async def adelete(self, ids: list[str], **kwargs: Any) -> None:
+        await self._store.adelete(self._primary_keys(ids), **kwargs)
+
+    @staticmethod
+    def _primary_keys(ids: list[str]) -> list:
+        # auto_id 生成的主键为 int64，记录时统一转成了字符串
+        return [int(i) if str(i).isdigit() else i for i in ids]
+
     async def aadd_documents(
             self, documents: list[Document], **kwargs: Any
     ) -> list[str]:
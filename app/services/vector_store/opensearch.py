@@ -48,6 +48,12 @@ class OpenSearchVectorStore(VectorStoreService):
     ) -> list[str]:
         return self._store.add_documents(documents, **kwargs)
 
+    def delete(self, ids: list[str], **kwargs: Any) -> None:
+        self._store.delete(ids, **kwargs)
+
+    async def adelete(self, ids: list[str], **kwargs: Any) -> None:
+        await self._store.adelete(ids, **kwargs)
+
     async def aadd_documents(
             self, documents: list[Document], **kwargs: Any
     ) -> list[str]:
@@ -16,6 +16,9 @@ class APISettings(BaseSettings):
     SERVICE_NAME: str = "api-server"
     ENVIRONMENT: str = "development"
     COMPRESSION: str = "gzip"
+    # 幂等键缓存响应的保留时间，以及请求执行中占用幂等键的最长时间(秒)
+    IDEMPOTENCY_TTL: int = 86400
+    IDEMPOTENCY_LOCK_TTL: int = 60
 
     model_config = SettingsConfigDict(
         env_file=".env",
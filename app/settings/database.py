@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 from pydantic import ValidationInfo, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -10,6 +10,31 @@ class DatabaseSettings(BaseSettings):
     ENGINE: str = ""
     DATABASE: str = ""
     URL: Optional[str] = None
+    # 连接池配置，API 与 worker 进程可分别设置；每个进程的连接数上限为 POOL_SIZE + MAX_OVERFLOW
+    POOL_SIZE: int = 20
+    MAX_OVERFLOW: int = 10
+    POOL_TIMEOUT: float = 30
+    # 连接创建超过该时间(秒)后重建，应小于数据库的空闲连接超时，-1 表示不重建
+    POOL_RECYCLE: int = -1
+    POOL_PRE_PING: bool = True
+    # session 持有超过该时间(秒)视为泄漏，记录日志并计入 db_session_leaks_total
+    SESSION_LEAK_THRESHOLD: float = 30.0
+    # 是否记录创建 session 的调用栈，用于定位泄漏；每次创建 session 都会采集调用栈，只在排查时开启
+    SESSION_TRACK_STACK: bool = False
+    # 死锁、锁等待超时、序列化失败时事务最多执行的次数，以及退避等待时间(秒)
+    TRANSACTION_RETRY_ATTEMPTS: int = 3
+    TRANSACTION_RETRY_BASE_DELAY: float = 0.05
+    TRANSACTION_RETRY_MAX_DELAY: float = 1.0
+    # 存取款与转账只追加流水(ledger_entries)，余额由快照与流水计算，不再更新 accounts.balance；
+    # 开启后 accounts.balance 不再反映余额，已有余额需要先写入期初流水
+    LEDGER_BALANCES: bool = False
+    # 只读副本连接地址，Database.session() 中的查询路由到副本
+    REPLICA_URLS: List[str] = []
+    # 副本选择策略：round_robin 或 least_loaded
+    REPLICA_STRATEGY: str = "round_robin"
+    # 复制延迟超过该值(秒)的副本不参与路由，全部不可用时回退到主库
+    REPLICA_MAX_LAG: float = 5.0
+    REPLICA_CHECK_INTERVAL: float = 10.0
 
     @field_validator("URL", mode="before")
     def assemble_db_connection(cls, v: str, info: ValidationInfo):
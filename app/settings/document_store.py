@@ -5,7 +5,7 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class DocumentStoreSettings(BaseSettings):
-    PROVIDER: str = "mysql"  # mysql
+    PROVIDER: str = "mysql"  # mysql, database(原生异步，URL 与应用数据库相同时复用其连接池)
 
     # mysql settings
     NAMESPACE: str = "doc_store"
@@ -18,6 +18,17 @@ class DocumentStoreSettings(BaseSettings):
     URL: Optional[str] = None
     ASYNC_MODE: bool = False
 
+    # 序列化格式: compact(紧凑二进制) 或 langchain(旧格式)，读取时两种格式均兼容
+    CODEC: str = "compact"
+    # compact 格式的 zstd 压缩级别，为空时不压缩
+    ZSTD_LEVEL: Optional[int] = None
+
+    # 读缓存: none 或 redis(进程内 LRU + Redis)
+    CACHE: str = "none"
+    CACHE_LRU_SIZE: int = 10000
+    CACHE_TTL: int = 3600
+    CACHE_NEGATIVE_TTL: int = 60
+
     @field_validator("URL", mode="before")
     def assemble_db_connection(cls, v: str, info: ValidationInfo):
         if v is None:
@@ -1,10 +1,20 @@
+from typing import Dict
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class TemporalSettings(BaseSettings):
     HOST: str = "localhost:7233"
     TRANSFER_QUEUE: str = "transfer-task-queue"
+    # 批量转账每个事务处理的转账笔数
+    TRANSFER_BATCH_SIZE: int = 1000
     TRANSLATE_QUEUE: str = "translate-task-queue"
     DSL_QUEUE: str = "dsl-task-queue"
+    # DSL activity 类型(parse、llm、embed、store)到任务队列的映射，未配置的类型在 DSL_QUEUE 上执行
+    DSL_ACTIVITY_QUEUES: Dict[str, str] = {}
+    # 各类型 worker 的最大并发 activity 数
+    DSL_ACTIVITY_CONCURRENCY: Dict[str, int] = {"parse": 4, "llm": 50, "embed": 8, "store": 20}
+    # parse worker 中 FastSplitter 使用的进程数，0 表示在事件循环中分块
+    DSL_PARSE_PROCESSES: int = 0
 
     model_config = SettingsConfigDict(
         env_file=".env",
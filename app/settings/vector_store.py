@@ -6,6 +6,8 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 class VectorStoreSettings(BaseSettings):
     PROVIDER: str = "opensearch"  # chroma, milvus, opensearch
     COLLECTION_NAME: str = "vector"
+    # 多向量检索时与主集合一起检索的子文档集合后缀，如 dataset 的问题、摘要向量存放在 dataset_faq、dataset_summary
+    CHILD_COLLECTION_SUFFIXES: List[str] = ["_faq", "_summary"]
 
     # Chroma settings
     CHROMA_PERSIST_DIR: str = "./chroma_db"
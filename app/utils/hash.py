@@ -1,3 +1,6 @@
+import hashlib
+import uuid
+
 from passlib.context import CryptContext
 
 # 创建一个模块级别的密码上下文实例
@@ -29,3 +32,33 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         bool: 如果密码匹配返回 True，否则返回 False
     """
     return pwd_context.verify(plain_password, hashed_password)
+
+
+def hash_content(text: str) -> str:
+    """
+    计算文本内容的 sha256 摘要，用于判断分块内容是否变化
+
+    Args:
+        text: 文本内容
+
+    Returns:
+        str: 64 位十六进制摘要
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_chunk_id(resource_id: str, content_hash: str, occurrence: int = 0) -> str:
+    """
+    根据资源ID与内容哈希生成确定性的分块ID
+
+    同一资源中内容相同的分块通过出现序号区分，重复处理同一资源时生成的ID保持不变。
+
+    Args:
+        resource_id: 资源ID
+        content_hash: 分块内容哈希
+        occurrence: 相同内容在资源中第几次出现(从 0 开始)
+
+    Returns:
+        str: 分块ID
+    """
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{resource_id}:{content_hash}:{occurrence}"))
@@ -0,0 +1,19 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict
+
+_pools: Dict[int, ProcessPoolExecutor] = {}
+
+
+def get_process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """
+    获取进程内共享的进程池，相同 worker 数的调用方复用同一个进程池
+
+    Args:
+        max_workers: 进程数
+
+    Returns:
+        ProcessPoolExecutor: 进程池
+    """
+    if max_workers not in _pools:
+        _pools[max_workers] = ProcessPoolExecutor(max_workers=max_workers)
+    return _pools[max_workers]
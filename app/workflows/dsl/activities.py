@@ -1,5 +1,6 @@
 import uuid
-from typing import List, Optional
+from collections import Counter
+from typing import Any, Dict, List, Optional
 
 from langchain_core.documents import Document
 from langchain_core.language_models import BaseLLM
@@ -7,6 +8,7 @@ from temporalio import activity
 
 from app.logger import get_logger
 from app.repositories.resource import ResourceRepository
+from app.services.chunk_manifest import ChunkManifestService
 from app.services.doc_store.base import DocumentStore
 from app.services.document_loader import create_loader, LoaderType
 from app.services.document_splitter import create_splitter, SplitterType
@@ -14,13 +16,29 @@ from app.services.document_transformer import (
     create_transformer,
 )
 from app.services.embeddings import EmbeddingService
+from app.services.retriever import MultiVectorRetriever
 from app.services.storage import StorageService
 from app.services.vector_store import create_vector_store, SearchResult
 from app.settings import VectorStoreSettings
+from app.utils.hash import hash_content, make_chunk_id
 
 logger = get_logger(__name__)
 
 
+def heartbeat(*details: Any) -> None:
+    """上报心跳与进度，不在 activity 中运行(如直接调用)时忽略"""
+    if activity.in_activity():
+        activity.heartbeat(*details)
+
+
+def last_checkpoint() -> Optional[Any]:
+    """返回上一次尝试最后一次心跳记录的进度，首次执行时为 None"""
+    if not activity.in_activity():
+        return None
+    details = activity.info().heartbeat_details
+    return details[0] if details else None
+
+
 class LoadDocumentActivity:
     """资源获取和处理Activity"""
 
@@ -32,52 +50,110 @@ class LoadDocumentActivity:
         self.storage_service = storage_service
         self.resource_repository = resource_repository
 
-    @activity.defn(name="load_document")
-    async def run(self, resource_id: str) -> List[Document]:
-        if resource_id is None:
-            return []
+    def _load(self, resource_id: str):
         # 使用工厂方法创建加载器
         loader = create_loader(
             loader_type=LoaderType.LANGCHAIN,
             resource_repository=self.resource_repository,
             storage_service=self.storage_service
         )
+        return loader.load_document(uuid.UUID(resource_id))
+
+    @activity.defn(name="load_document")
+    async def run(self, resource_id: str, shard: Optional[Dict[str, int]] = None) -> List[Document]:
+        """
+        加载资源的文档
+
+        Args:
+            resource_id: 资源ID
+            shard: 分片范围 {"offset": 起始位置, "limit": 文档数}，为空时加载全部文档
+        """
+        if resource_id is None:
+            return []
+        start = shard["offset"] if shard else 0
+        stop = start + shard["limit"] if shard else None
 
         documents = []
-        async for doc in loader.load_document(uuid.UUID(resource_id)):
-            documents.append(doc)
+        index = 0
+        async for doc in self._load(resource_id):
+            if stop is not None and index >= stop:
+                break
+            if index >= start:
+                doc.metadata["resource_id"] = resource_id
+                documents.append(doc)
+            index += 1
         logger.info(f"loaded {len(documents)} documents")
         return documents
 
+    @activity.defn(name="count_documents")
+    async def count(self, resource_id: str) -> int:
+        """统计资源的文档数，分片入库时父工作流只记录文档数，由各分片按范围加载文档"""
+        if resource_id is None:
+            return 0
+        total = 0
+        async for _ in self._load(resource_id):
+            total += 1
+        logger.info(f"resource {resource_id} has {total} documents")
+        return total
+
 
 class SplitDocumentsActivity:
     """文档分块Activity"""
 
-    def __init__(self):
-        pass
+    def __init__(self, max_workers: int = 0):
+        """
+        Args:
+            max_workers: FastSplitter 在进程池中分块使用的进程数，0 表示在事件循环中分块
+        """
+        self.max_workers = max_workers
 
     @activity.defn(name="split_documents")
     async def run(
             self,
             documents: List[Document],
-            chunk_size: int = 1000
+            chunk_size: int = 1000,
+            splitter_type: str = SplitterType.LANGCHAIN.value,
+            tokenizer: Optional[str] = None,
     ) -> List[Document]:
+        """
+        Args:
+            documents: 待分块的文档
+            chunk_size: 分块大小，指定 tokenizer 时按 token 计数，否则按字符计数
+            splitter_type: 分割器类型
+            tokenizer: token 计数方式，如 "tiktoken:cl100k_base"、"hf:<model>"，只有 fast 分割器支持
+        """
         if not documents:
             return []
 
-        logger.info(f"SplitDocumentsActivity for length {len(documents)} {type(documents[0])}")
+        logger.info(f"SplitDocumentsActivity {splitter_type} for length {len(documents)} {type(documents[0])}")
         # 使用工厂方法创建分割器
+        options = {}
+        if splitter_type == SplitterType.FAST.value and self.max_workers:
+            options["max_workers"] = self.max_workers
         splitter = create_splitter(
-            splitter_type=SplitterType.LANGCHAIN,
+            splitter_type=splitter_type,
             chunk_size=chunk_size,
+            # DSL 中未定义的变量传入空字符串
+            tokenizer=tokenizer or None,
+            **options,
         )
 
-        split_docs = []
-        async for doc in splitter.split(documents):
-            doc.id = str(uuid.uuid4())
-            split_docs.append(doc)
-        logger.info(f"split {len(documents)} documents")
-        return split_docs
+        chunks: List[Document] = []
+        # 相同内容在同一资源中可能出现多次，以出现序号区分
+        occurrences = Counter()
+        async for chunk in splitter.split_chunks(documents):
+            resource_id = chunk.metadata.get("resource_id")
+            if resource_id is None:
+                chunk.id = str(uuid.uuid4())
+            else:
+                content_hash = hash_content(chunk.page_content)
+                chunk.metadata["content_hash"] = content_hash
+                chunk.id = make_chunk_id(resource_id, content_hash, occurrences[(resource_id, content_hash)])
+                occurrences[(resource_id, content_hash)] += 1
+            # Activity 结果需要序列化为 Document，逐个转换，不同时保留所有分块与 Document
+            chunks.append(chunk.to_document())
+        logger.info(f"split {len(documents)} documents into {len(chunks)} chunks")
+        return chunks
 
 
 class TransformDocumentsActivity:
@@ -107,9 +183,10 @@ class TransformDocumentsActivity:
         )
 
         transformed_docs = []
-        # document_generator = await transformer.transform(documents)
+        # 转换器可能有状态(合并、去重)，无法从中途恢复，心跳只用于及时发现卡住的 LLM 调用
         async for doc in transformer.transform(documents):
             transformed_docs.append(doc)
+            heartbeat(len(transformed_docs))
 
         return transformed_docs
 
@@ -138,10 +215,16 @@ class StoreDocumentsActivity:
             for i in range(0, len(documents), self.batch_size)
         ]
 
-        for idx, batch in enumerate(batches):
+        # 重试时跳过上一次尝试已经写入的批次
+        start = last_checkpoint() or 0
+        if start:
+            logger.info(f"resuming StoreDocumentsActivity from batch {start + 1}/{len(batches)}")
+        for idx in range(start, len(batches)):
+            batch = batches[idx]
             doc_ids = [doc.id for doc in batch if doc.id]
             logger.info(f"Processing batch {idx + 1}/{len(batches)} with {len(batch)} {type(batch[0])} documents.")
             await self.doc_store.amset(list(zip(doc_ids, batch)))
+            heartbeat(idx + 1)
 
 
 class VectorStoreActivity:
@@ -150,10 +233,14 @@ class VectorStoreActivity:
     def __init__(
             self,
             embedding_service: EmbeddingService,
-            vector_store_settings: VectorStoreSettings
+            vector_store_settings: VectorStoreSettings,
+            chunk_manifest_service: Optional[ChunkManifestService] = None,
+            batch_size: int = 64,
     ):
         self.embedding_service = embedding_service
         self.vector_store_settings = vector_store_settings
+        self.chunk_manifest_service = chunk_manifest_service
+        self.batch_size = batch_size
 
     @activity.defn(name="store_vectors")
     async def run(
@@ -171,7 +258,126 @@ class VectorStoreActivity:
             store_type=self.vector_store_settings.PROVIDER,
         )
 
-        return vector_store.add_documents(documents=documents)
+        # 按批向量化并写入，每批完成后以下一批的序号作为心跳进度，重试时从最后一批继续而不是重新向量化全部文档。
+        # 心跳只记录序号，大小固定；之前的尝试写入的向量ID从分块清单中恢复
+        start = last_checkpoint() or 0
+        batches = [documents[i: i + self.batch_size] for i in range(0, len(documents), self.batch_size)]
+        vector_ids: List[str] = []
+        if start:
+            logger.info(f"resuming VectorStoreActivity from batch {start + 1}/{len(batches)}")
+            vector_ids = await self._recorded_vectors(documents[:start * self.batch_size], collection_name)
+        for idx in range(start, len(batches)):
+            batch_ids = await vector_store.aadd_documents(batches[idx])
+            await self._record_vectors(batches[idx], batch_ids, collection_name)
+            vector_ids.extend(batch_ids)
+            heartbeat(idx + 1)
+        return vector_ids
+
+    @staticmethod
+    def _chunk_ref(doc: Document) -> tuple[Optional[str], Optional[str]]:
+        """文档所属的 (资源ID, 分块ID)，问题、摘要等派生文档通过 doc_id 指向原始分块"""
+        return doc.metadata.get("resource_id"), doc.metadata.get("doc_id") or doc.id
+
+    async def _recorded_vectors(self, documents: List[Document], collection_name: Optional[str]) -> List[str]:
+        """
+        从分块清单中读取之前的尝试为这些文档写入的向量ID
+
+        未配置分块清单或文档不属于资源时无法恢复，只返回本次尝试写入的向量ID
+        """
+        if self.chunk_manifest_service is None:
+            logger.warning("chunk manifest is not configured, vector ids written by previous attempts are not returned")
+            return []
+
+        collection_name = collection_name or self.vector_store_settings.COLLECTION_NAME
+        by_resource: Dict[str, List[str]] = {}
+        for doc in documents:
+            resource_id, chunk_id = self._chunk_ref(doc)
+            if resource_id and chunk_id:
+                by_resource.setdefault(resource_id, []).append(chunk_id)
+
+        vector_ids: List[str] = []
+        for resource_id, chunk_ids in by_resource.items():
+            vectors = await self.chunk_manifest_service.get_vectors(resource_id, chunk_ids)
+            vector_ids.extend(vectors.get(collection_name, []))
+        return vector_ids
+
+    async def _record_vectors(
+            self,
+            documents: List[Document],
+            vector_ids: List[str],
+            collection_name: Optional[str],
+    ) -> None:
+        """记录向量所属的分块，资源重新处理时据此清理过期向量"""
+        if self.chunk_manifest_service is None:
+            return
+
+        collection_name = collection_name or self.vector_store_settings.COLLECTION_NAME
+        by_resource: Dict[str, List[tuple[str, str]]] = {}
+        for doc, vector_id in zip(documents, vector_ids):
+            resource_id, chunk_id = self._chunk_ref(doc)
+            if resource_id and chunk_id:
+                by_resource.setdefault(resource_id, []).append((chunk_id, str(vector_id)))
+
+        for resource_id, vectors in by_resource.items():
+            await self.chunk_manifest_service.record_vectors(resource_id, collection_name, vectors)
+
+
+class DiffChunksActivity:
+    """分块比对Activity，只保留清单中不存在的分块用于增量入库"""
+
+    def __init__(self, chunk_manifest_service: ChunkManifestService):
+        self.chunk_manifest_service = chunk_manifest_service
+
+    @activity.defn(name="diff_chunks")
+    async def run(
+            self,
+            documents: List[Document],
+            resource_id: str,
+    ) -> List[Document]:
+        if not documents:
+            return []
+        added, _ = await self.chunk_manifest_service.diff(resource_id, documents)
+        return added
+
+
+class CommitChunksActivity:
+    """分块清单提交Activity，清理过期分块并将本次分块写入清单"""
+
+    def __init__(
+            self,
+            chunk_manifest_service: ChunkManifestService,
+            doc_store: DocumentStore,
+            embedding_service: EmbeddingService,
+            vector_store_settings: VectorStoreSettings,
+    ):
+        self.chunk_manifest_service = chunk_manifest_service
+        self.doc_store = doc_store
+        self.embedding_service = embedding_service
+        self.vector_store_settings = vector_store_settings
+
+    @activity.defn(name="commit_chunks")
+    async def run(
+            self,
+            documents: List[Document],
+            resource_id: str,
+    ) -> Dict[str, int]:
+        added, stale = await self.chunk_manifest_service.diff(resource_id, documents)
+
+        if stale:
+            vectors = await self.chunk_manifest_service.get_vectors(resource_id, stale)
+            for collection_name, vector_ids in vectors.items():
+                vector_store = create_vector_store(
+                    embedding_service=self.embedding_service,
+                    settings=self.vector_store_settings,
+                    collection_name=collection_name,
+                    store_type=self.vector_store_settings.PROVIDER,
+                )
+                await vector_store.adelete(vector_ids)
+                logger.info(f"deleted {len(vector_ids)} stale vectors from {collection_name}")
+            await self.doc_store.amdelete(stale)
+
+        await self.chunk_manifest_service.commit(resource_id, documents, stale)
+        return {"added": len(added), "deleted": len(stale)}
 
 
 class RetrieveActivity:
@@ -187,38 +393,43 @@ class RetrieveActivity:
         self.embedding_service = embedding_service
         self.vector_store_settings = vector_store_settings
 
+    def _vector_store(self, collection_name: Optional[str]):
+        return create_vector_store(
+            embedding_service=self.embedding_service,
+            settings=self.vector_store_settings,
+            collection_name=collection_name,
+            store_type=self.vector_store_settings.PROVIDER,
+        )
+
     @activity.defn(name="retrieve_documents")
     async def run(
             self,
             query: str,
             collection_name: Optional[str] = None,
             retriever_type: Optional[str] = None,
+            child_collections: Optional[List[str]] = None,
     ) -> List[SearchResult]:
-        vector_store = create_vector_store(
-            embedding_service=self.embedding_service,
-            settings=self.vector_store_settings,
-            collection_name=collection_name,
-            store_type=self.vector_store_settings.PROVIDER,
-        )
-
-        docs = await vector_store.aretrieve(query, collection_name)
-        if not docs:
-            return []
+        """
+        Args:
+            query: 查询
+            collection_name: 向量集合名称
+            retriever_type: 为 "multi" 时检索子文档向量并返回对应的父文档
+            child_collections: 多向量检索时与主集合一起检索的子文档集合，
+                默认为主集合名称加 CHILD_COLLECTION_SUFFIXES 中的后缀
+        """
+        vector_store = self._vector_store(collection_name)
 
         if retriever_type and retriever_type == "multi":
-            ids = []
-            for d in docs:
-                if "doc_id" in d.metadata and d.metadata["doc_id"] not in ids:
-                    ids.append(d.metadata["doc_id"])
-            docs = self.doc_store.mget(ids)
-
-            return [
-                SearchResult(
-                    document=doc,
-                    score=1,
-                    metadata=d.metadata,
-                )
-                for doc in docs
-            ]
-
-        return docs
+            if not child_collections:
+                base = collection_name or self.vector_store_settings.COLLECTION_NAME
+                child_collections = [
+                    f"{base}{suffix}" for suffix in self.vector_store_settings.CHILD_COLLECTION_SUFFIXES
+                ]
+            # 各集合并发检索，先完成的集合的父文档读取与其余集合的检索重叠进行
+            retriever = MultiVectorRetriever(
+                vector_stores=[vector_store, *[self._vector_store(name) for name in child_collections]],
+                doc_store=self.doc_store,
+            )
+            return await retriever.aretrieve(query, collection_name)
+
+        return await vector_store.aretrieve(query, collection_name)
@@ -0,0 +1,75 @@
+from enum import Enum
+from typing import Any, Dict, FrozenSet, Optional, Sequence
+
+
+class ActivityKind(str, Enum):
+    """DSL activity 的类型，不同类型可以路由到独立的任务队列与 worker"""
+    PARSE = "parse"  # 加载、分块等 CPU 密集型
+    LLM = "llm"  # 调用 LLM 的转换
+    EMBED = "embed"  # 向量化与检索
+    STORE = "store"  # 文档存储与分块清单
+
+
+# 各 activity 的默认类型，DSL 中可以通过 task_queue 覆盖
+ACTIVITY_KINDS: Dict[str, ActivityKind] = {
+    "load_document": ActivityKind.PARSE,
+    "count_documents": ActivityKind.PARSE,
+    "split_documents": ActivityKind.PARSE,
+    "transform_documents": ActivityKind.LLM,
+    "store_vectors": ActivityKind.EMBED,
+    "retrieve_documents": ActivityKind.EMBED,
+    "store_documents": ActivityKind.STORE,
+    "diff_chunks": ActivityKind.STORE,
+    "commit_chunks": ActivityKind.STORE,
+}
+
+# 需要调用 LLM 的转换器，其他转换器的 transform_documents 在 parse 队列执行；
+# chain 可能包含需要 LLM 的转换器
+LLM_TRANSFORMERS: FrozenSet[str] = frozenset({"summary", "hypothetical_question", "chain"})
+
+
+def activity_kind(activity_name: str, args: Sequence[Any] = ()) -> Optional[ActivityKind]:
+    """
+    activity 的默认类型，transform_documents 按转换器类型(第二个参数)区分是否调用 LLM
+
+    Args:
+        activity_name: activity 名称
+        args: activity 的参数
+    """
+    if activity_name == "transform_documents" and len(args) > 1 and isinstance(args[1], str):
+        return ActivityKind.LLM if args[1].lower() in LLM_TRANSFORMERS else ActivityKind.PARSE
+    return ACTIVITY_KINDS.get(activity_name)
+
+
+def worker_activities(kind: ActivityKind) -> FrozenSet[str]:
+    """该类型的 worker 需要注册的 activity"""
+    names = {name for name, default_kind in ACTIVITY_KINDS.items() if default_kind == kind}
+    if kind == ActivityKind.PARSE:
+        names.add("transform_documents")
+    return frozenset(names)
+
+
+def resolve_task_queue(
+        activity_name: str,
+        args: Sequence[Any],
+        task_queue: Optional[str],
+        task_queues: Dict[str, str],
+) -> Optional[str]:
+    """
+    确定 activity 执行的任务队列，DSL 中指定的 task_queue 优先于默认类型
+
+    Args:
+        activity_name: activity 名称
+        args: activity 的参数
+        task_queue: DSL 中指定的 activity 类型或任务队列名
+        task_queues: activity 类型到任务队列的映射
+
+    Returns:
+        任务队列名，None 表示使用工作流所在的任务队列
+    """
+    kind = task_queue or activity_kind(activity_name, args)
+    if kind in task_queues:
+        return task_queues[kind]
+    if task_queue and task_queue not in ActivityKind._value2member_map_:
+        return task_queue
+    return None
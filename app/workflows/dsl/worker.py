@@ -1,4 +1,6 @@
+import argparse
 import asyncio
+from typing import Optional
 
 from dependency_injector.wiring import inject, Provide
 from temporalio.client import Client
@@ -14,15 +16,23 @@ from app.workflows.dsl.activities import (
     TransformDocumentsActivity,
     VectorStoreActivity,
     RetrieveActivity,
+    DiffChunksActivity,
+    CommitChunksActivity,
 )
-from app.workflows.dsl.workflows import DSLWorkflow
+from app.workflows.dsl.queues import ActivityKind, worker_activities
+from app.workflows.dsl.workflows import DSLWorkflow, ShardedDSLWorkflow
 from app.workflows.runner.sandbox import new_sandbox_runner
 
 logger = get_logger(__name__)
 
 
+# 只执行工作流、不执行 activity 的 worker 类型
+WORKFLOW_KIND = "workflow"
+
+
 @inject
 async def create_worker(
+        kind: Optional[str] = None,
         settings: TemporalSettings = Provide[Container.settings.provided.TEMPORAL],
         client: Client = Provide[Container.clients.temporal_client],
         load_document_activity: LoadDocumentActivity = Provide[Container.activities.load_document_activity],
@@ -31,23 +41,51 @@ async def create_worker(
         transform_activity: TransformDocumentsActivity = Provide[Container.activities.transform_activity],
         vector_store_activity: VectorStoreActivity = Provide[Container.activities.vector_store_activity],
         retrieve_activity: RetrieveActivity = Provide[Container.activities.retrieve_activity],
+        diff_chunks_activity: DiffChunksActivity = Provide[Container.activities.diff_chunks_activity],
+        commit_chunks_activity: CommitChunksActivity = Provide[Container.activities.commit_chunks_activity],
 ) -> Worker:
-    """Create and configure a Temporal worker"""
+    """
+    Create and configure a Temporal worker
+
+    Args:
+        kind: None 时在 DSL_QUEUE 上同时执行工作流与全部 activity；
+            "workflow" 时只执行工作流；为 activity 类型时只在该类型的任务队列上执行该类型的 activity
+    """
+    activities_by_name = {
+        "load_document": load_document_activity.run,
+        "count_documents": load_document_activity.count,
+        "split_documents": split_documents_activity.run,
+        "store_documents": store_documents_activity.run,
+        "transform_documents": transform_activity.run,
+        "store_vectors": vector_store_activity.run,
+        "retrieve_documents": retrieve_activity.run,
+        "diff_chunks": diff_chunks_activity.run,
+        "commit_chunks": commit_chunks_activity.run,
+    }
+    activities = list(activities_by_name.values())
+    workflows = [DSLWorkflow, ShardedDSLWorkflow]
+    task_queue = settings.DSL_QUEUE
+    max_concurrent_activities = 100
+
+    if kind == WORKFLOW_KIND:
+        activities = []
+    elif kind is not None:
+        kind = ActivityKind(kind)
+        if kind.value not in settings.DSL_ACTIVITY_QUEUES:
+            raise ValueError(f"未配置 {kind.value} 类型 activity 的任务队列")
+        activities = [run for name, run in activities_by_name.items() if name in worker_activities(kind)]
+        workflows = []
+        task_queue = settings.DSL_ACTIVITY_QUEUES[kind.value]
+        max_concurrent_activities = settings.DSL_ACTIVITY_CONCURRENCY.get(kind.value, max_concurrent_activities)
+
     return Worker(
         client,
-        task_queue=settings.DSL_QUEUE,
-        activities=[
-            load_document_activity.run,
-            split_documents_activity.run,
-            store_documents_activity.run,
-            transform_activity.run,
-            vector_store_activity.run,
-            retrieve_activity.run,
-        ],
-        workflows=[DSLWorkflow],
+        task_queue=task_queue,
+        activities=activities,
+        workflows=workflows,
         max_cached_workflows=1000,
         max_concurrent_workflow_tasks=100,
-        max_concurrent_activities=100,
+        max_concurrent_activities=max_concurrent_activities,
         max_concurrent_local_activities=100,
         max_concurrent_workflow_task_polls=10,
         max_concurrent_activity_task_polls=10,
@@ -57,6 +95,14 @@ async def create_worker(
 
 async def main():
     """Worker entry point"""
+    parser = argparse.ArgumentParser(description="DSL worker")
+    parser.add_argument(
+        "--kind",
+        choices=[WORKFLOW_KIND, *[kind.value for kind in ActivityKind]],
+        default=None,
+        help="只运行工作流或某一类型的 activity，默认在 DSL_QUEUE 上运行全部",
+    )
+    args = parser.parse_args()
 
     container = Container()
     container.wire(modules=[__name__])
@@ -64,7 +110,7 @@ async def main():
     setup_logging(settings)
 
     logger.info("Starting worker...")
-    async with await create_worker() as worker:
+    async with await create_worker(args.kind) as worker:
         logger.info(f"Worker started on queue: {worker.task_queue}")
         await asyncio.Event().wait()
 
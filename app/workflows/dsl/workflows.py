@@ -3,21 +3,31 @@ from __future__ import annotations
 import asyncio
 import dataclasses
 from dataclasses import dataclass
-from datetime import timedelta
-from typing import Any, Dict, List, Optional, Union
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
 
 from temporalio import workflow
+from temporalio.common import RetryPolicy
 
 with workflow.unsafe.imports_passed_through():
     from app.logger import get_logger
+    from app.workflows.dsl.queues import resolve_task_queue
 
 logger = get_logger(__name__)
 
+DEFAULT_START_TO_CLOSE_TIMEOUT = timedelta(minutes=100)
+
 
 @dataclass
 class DSLInput:
     root: Statement
     variables: Dict[str, Any] = dataclasses.field(default_factory=dict)
+    # 指定时工作流只返回这些变量，作为子工作流运行时避免把整个作用域写回父工作流的历史
+    outputs: Optional[List[str]] = None
+    # 为 True 时 outputs 中的变量只返回其数量(列表的长度或数值本身)，分片子工作流据此只向协调工作流返回计数
+    count_outputs: bool = False
+    # activity 类型到任务队列的映射，由提交方根据配置填写并记录在工作流历史中
+    task_queues: Dict[str, str] = dataclasses.field(default_factory=dict)
 
 
 @dataclass
@@ -25,11 +35,55 @@ class ActivityStatement:
     activity: ActivityInvocation
 
 
+@dataclass
+class RetryOptions:
+    """activity 重试策略，时间单位为秒"""
+    initial_interval: float = 1
+    backoff_coefficient: float = 2.0
+    maximum_interval: Optional[float] = None
+    # 0 表示不限制重试次数
+    maximum_attempts: int = 0
+    non_retryable_error_types: Optional[List[str]] = None
+
+    def to_retry_policy(self) -> RetryPolicy:
+        return RetryPolicy(
+            initial_interval=timedelta(seconds=self.initial_interval),
+            backoff_coefficient=self.backoff_coefficient,
+            maximum_interval=timedelta(seconds=self.maximum_interval) if self.maximum_interval else None,
+            maximum_attempts=self.maximum_attempts,
+            non_retryable_error_types=self.non_retryable_error_types,
+        )
+
+
 @dataclass
 class ActivityInvocation:
     name: str
     arguments: List[str] = dataclasses.field(default_factory=list)
     result: Optional[str] = None
+    # 超时时间(秒)，均未指定时 start_to_close_timeout 为 DEFAULT_START_TO_CLOSE_TIMEOUT
+    start_to_close_timeout: Optional[float] = None
+    schedule_to_close_timeout: Optional[float] = None
+    # 超过该时间未收到心跳即认为 activity 卡住并重试，重试从最后一次心跳记录的进度继续
+    heartbeat_timeout: Optional[float] = None
+    retry: Optional[RetryOptions] = None
+    # activity 类型(parse、llm、embed、store)或任务队列名，未指定时按 activity 名称确定类型
+    task_queue: Optional[str] = None
+
+    def execute_options(self) -> Dict[str, Any]:
+        """转换为 workflow.execute_activity 的超时与重试参数"""
+        start_to_close = self.start_to_close_timeout
+        if start_to_close is None and self.schedule_to_close_timeout is None:
+            start_to_close = DEFAULT_START_TO_CLOSE_TIMEOUT.total_seconds()
+        return {
+            "start_to_close_timeout": _seconds(start_to_close),
+            "schedule_to_close_timeout": _seconds(self.schedule_to_close_timeout),
+            "heartbeat_timeout": _seconds(self.heartbeat_timeout),
+            "retry_policy": self.retry.to_retry_policy() if self.retry else None,
+        }
+
+
+def _seconds(value: Optional[float]) -> Optional[timedelta]:
+    return timedelta(seconds=value) if value is not None else None
 
 
 @dataclass
@@ -52,47 +106,314 @@ class Parallel:
     branches: List[Statement]
 
 
-Statement = Union[ActivityStatement, SequenceStatement, ParallelStatement]
+@dataclass
+class ForeachStatement:
+    foreach: Foreach
+
+
+@dataclass
+class Foreach:
+    """
+    对列表变量逐项(或逐批)执行 body
+
+    每次迭代在独立的变量作用域中执行：作用域继承外层变量，并将当前项写入 item，
+    body 中写入的变量不会影响外层与其他迭代。指定 result 时，按输入顺序收集每次迭代中
+    collect 变量的值写入外层的 result 变量(fan-in)，之后的 activity 可以对其做汇总。
+    """
+    items: str
+    item: str
+    body: Statement
+    # 同时执行的迭代数，0 表示不限制
+    max_concurrency: int = 0
+    # 大于 1 时将 items 按批分组，item 变量为一个列表
+    batch_size: int = 1
+    collect: Optional[str] = None
+    result: Optional[str] = None
+    # 收集的值是列表时是否展开合并为一个列表
+    flatten: bool = False
+
+
+@dataclass
+class ShardStatement:
+    shard: Shard
+
+
+@dataclass
+class Shard:
+    """
+    将 total 个项按 shard_size 分片，每个分片作为一个独立的子工作流执行 body
+
+    分片只传递引用而不传递数据：item 变量为 {"offset": 起始位置, "limit": 项数}，body 根据
+    外层传入的资源ID等变量与该范围自行加载数据，结果写入存储后只返回数量。协调子工作流与
+    父工作流的历史只包含分片范围与计数，启动的分片数超过 max_shards_per_run 后协调工作流
+    continue-as-new，历史长度不随分片总数增长。
+    """
+    total: str
+    item: str
+    body: Statement
+    # 每个分片包含的项数
+    shard_size: int = 100
+    # 同时执行的分片数，0 表示不限制
+    max_concurrency: int = 0
+    # 协调工作流单次运行最多启动的分片数
+    max_shards_per_run: int = 100
+    # 传递给分片的外层变量，None 表示全部变量，应只包含资源ID、集合名等引用
+    variables: Optional[List[str]] = None
+    # 分片结束后统计数量的变量，各分片的数量之和写入外层的 result 变量
+    collect: Optional[str] = None
+    result: Optional[str] = None
+
+
+@dataclass
+class ShardInput:
+    shard: Shard
+    total: int
+    variables: Dict[str, Any] = dataclasses.field(default_factory=dict)
+    # 已经启动的分片数，continue-as-new 后从该分片继续
+    offset: int = 0
+    # 已完成分片的 collect 数量之和
+    collected: int = 0
+    task_queues: Dict[str, str] = dataclasses.field(default_factory=dict)
+
+
+Statement = Union[ActivityStatement, SequenceStatement, ParallelStatement, ForeachStatement, ShardStatement]
+
+
+@dataclass
+class DSLProgress:
+    """工作流进度，通过 DSLWorkflow.progress 查询"""
+    started_at: Optional[datetime] = None
+    # 正在执行的 activity
+    running: List[str] = dataclasses.field(default_factory=list)
+    completed_activities: int = 0
+    # 预计执行的 activity 总数，foreach 展开后更新
+    total_activities: int = 0
+    # foreach、shard 已处理与总共的项数(如分块数)
+    processed_items: int = 0
+    total_items: int = 0
+
+
+def count_activities(stmt: Statement) -> int:
+    """统计语句中的 activity 数，foreach 按一次迭代计算，shard 整体计为一个"""
+    if isinstance(stmt, SequenceStatement):
+        return sum(count_activities(elem) for elem in stmt.sequence.elements)
+    if isinstance(stmt, ParallelStatement):
+        return sum(count_activities(branch) for branch in stmt.parallel.branches)
+    if isinstance(stmt, ForeachStatement):
+        return count_activities(stmt.foreach.body)
+    return 1
+
+
+async def run_all(coros: List[Awaitable[Any]]) -> List[Any]:
+    """
+    并发执行并按顺序返回结果，任一失败时取消其余仍在执行的任务并抛出该异常
+
+    不使用 TaskGroup：其抛出的 ExceptionGroup 不是 Temporal 的失败类型，
+    会导致工作流任务反复重试而不是让工作流失败。
+    """
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    if not tasks:
+        return []
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in tasks:
+            if task.done() and not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+        return [task.result() for task in tasks]
+    finally:
+        pending = [task for task in tasks if not task.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def map_bounded(
+        items: List[Any],
+        max_concurrency: int,
+        fn: Callable[[int, Any], Awaitable[Any]],
+) -> List[Any]:
+    """以不超过 max_concurrency(0 表示不限制)的并发对每一项调用 fn(index, item)，按输入顺序返回结果"""
+    results: List[Any] = [None] * len(items)
+    next_index = 0
+
+    async def worker() -> None:
+        # 固定数量的 worker 依次领取任务，限制并发的同时避免一次创建大量任务
+        nonlocal next_index
+        while next_index < len(items):
+            index = next_index
+            next_index += 1
+            results[index] = await fn(index, items[index])
+
+    concurrency = max_concurrency or len(items)
+    await run_all([worker() for _ in range(min(concurrency, len(items)))])
+    return results
+
+
+def partition(items: List[Any], size: int) -> List[List[Any]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def fan_in(results: List[Any], flatten: bool) -> List[Any]:
+    if flatten:
+        return [value for result in results if result for value in result]
+    return results
+
+
+def count_of(value: Any) -> int:
+    """变量的数量：列表为长度，数值为其本身，None 为 0"""
+    if value is None:
+        return 0
+    if isinstance(value, (list, tuple, dict)):
+        return len(value)
+    return int(value)
+
+
+@workflow.defn
+class ShardedDSLWorkflow:
+    """分片协调工作流，以子工作流执行各分片并汇总 collect 变量的数量"""
+
+    @workflow.run
+    async def run(self, input: ShardInput) -> int:
+        shard = input.shard
+        shard_count = -(-input.total // shard.shard_size)
+        window = list(range(input.offset, min(shard_count, input.offset + shard.max_shards_per_run)))
+        workflow_id = workflow.info().workflow_id
+
+        async def run_shard(_: int, index: int) -> int:
+            offset = index * shard.shard_size
+            outputs = await workflow.execute_child_workflow(
+                DSLWorkflow.run,
+                DSLInput(
+                    root=shard.body,
+                    variables={
+                        **input.variables,
+                        shard.item: {"offset": offset, "limit": min(shard.shard_size, input.total - offset)},
+                    },
+                    outputs=[shard.collect] if shard.collect else [],
+                    count_outputs=True,
+                    task_queues=input.task_queues,
+                ),
+                id=f"{workflow_id}-{index}",
+            )
+            return outputs.get(shard.collect, 0) if shard.collect else 0
+
+        collected = input.collected + sum(await map_bounded(window, shard.max_concurrency, run_shard))
+        offset = input.offset + len(window)
+        if offset < shard_count:
+            workflow.logger.info(f"{shard_count - offset} shards remaining, continue as new")
+            workflow.continue_as_new(dataclasses.replace(input, offset=offset, collected=collected))
+        return collected
 
 
 @workflow.defn
 class DSLWorkflow:
+    def __init__(self) -> None:
+        self.variables: Dict[str, Any] = {}
+        self.task_queues: Dict[str, str] = {}
+        self._progress = DSLProgress()
+
     @workflow.run
     async def run(self, input: DSLInput) -> Dict[str, Any]:
         self.variables = dict(input.variables)
+        self.task_queues = dict(input.task_queues)
+        self._progress = DSLProgress(started_at=workflow.now(), total_activities=count_activities(input.root))
         workflow.logger.info("Running DSL workflow")
         await self.execute_statement(input.root)
         workflow.logger.info("DSL workflow completed")
+        if input.outputs is not None:
+            if input.count_outputs:
+                return {name: count_of(self.variables.get(name)) for name in input.outputs}
+            return {name: self.variables.get(name) for name in input.outputs}
         return self.variables
 
-    async def execute_statement(self, stmt: Statement) -> None:
+    @workflow.query
+    def progress(self) -> DSLProgress:
+        return self._progress
+
+    async def execute_statement(self, stmt: Statement, variables: Optional[Dict[str, Any]] = None) -> None:
+        # 未指定作用域时使用工作流的全局变量，foreach 的每次迭代使用独立的作用域
+        if variables is None:
+            variables = self.variables
         if isinstance(stmt, ActivityStatement):
             # Invoke activity loading arguments from variables and optionally
             # storing result as a variable
-            result = await workflow.execute_activity(
-                stmt.activity.name,
-                args=[self.variables.get(arg, "") for arg in stmt.activity.arguments],
-                start_to_close_timeout=timedelta(minutes=100),
-            )
+            self._progress.running.append(stmt.activity.name)
+            try:
+                args = [variables.get(arg, "") for arg in stmt.activity.arguments]
+                result = await workflow.execute_activity(
+                    stmt.activity.name,
+                    args=args,
+                    task_queue=resolve_task_queue(stmt.activity.name, args, stmt.activity.task_queue, self.task_queues),
+                    **stmt.activity.execute_options(),
+                )
+            finally:
+                self._progress.running.remove(stmt.activity.name)
+            self._progress.completed_activities += 1
             if stmt.activity.result:
-                if isinstance(result, list):
+                if isinstance(result, list) and result:
                     logger.info(
                         f"{stmt.activity.name} result: {len(result)} {type(result[0])} ")
                 else:
                     logger.info(
                         f"{stmt.activity.name} result:  {type(result)} ")
-                self.variables[stmt.activity.result] = result
+                variables[stmt.activity.result] = result
         elif isinstance(stmt, SequenceStatement):
             # Execute each statement in order
             for elem in stmt.sequence.elements:
-                await self.execute_statement(elem)
+                await self.execute_statement(elem, variables)
         elif isinstance(stmt, ParallelStatement):
-            # Execute all in parallel. Note, this will raise an exception when
-            # the first activity fails and will not cancel the others. We could
-            # store tasks and cancel if we wanted. In newer Python versions this
-            # would use a TaskGroup instead.
+            # Execute all in parallel, the first failure cancels the other
+            # branches and is re-raised
             for branch in stmt.parallel.branches:
                 logger.info(f"parallel branch {branch}")
-            await asyncio.gather(
-                *[self.execute_statement(branch) for branch in stmt.parallel.branches]
+            await run_all(
+                [self.execute_statement(branch, variables) for branch in stmt.parallel.branches]
+            )
+        elif isinstance(stmt, ForeachStatement):
+            await self.execute_foreach(stmt.foreach, variables)
+        elif isinstance(stmt, ShardStatement):
+            await self.execute_shard(stmt.shard, variables)
+
+    async def execute_foreach(self, foreach: Foreach, variables: Dict[str, Any]) -> None:
+        items = list(variables.get(foreach.items) or [])
+        if foreach.batch_size > 1:
+            items = partition(items, foreach.batch_size)
+        logger.info(f"foreach {foreach.items}: {len(items)} iterations")
+        # 预计的 activity 数已包含一次迭代
+        self._progress.total_activities += count_activities(foreach.body) * (len(items) - 1)
+        self._progress.total_items += len(variables.get(foreach.items) or [])
+
+        async def iterate(index: int, item: Any) -> Any:
+            scope = {**variables, foreach.item: item}
+            await self.execute_statement(foreach.body, scope)
+            self._progress.processed_items += len(item) if foreach.batch_size > 1 else 1
+            return scope.get(foreach.collect) if foreach.collect else None
+
+        results = await map_bounded(items, foreach.max_concurrency, iterate)
+        if foreach.result:
+            variables[foreach.result] = fan_in(results, foreach.flatten)
+
+    async def execute_shard(self, shard: Shard, variables: Dict[str, Any]) -> None:
+        total = int(variables.get(shard.total) or 0)
+        logger.info(f"shard {shard.total}: {total} items in shards of {shard.shard_size}")
+        self._progress.total_items += total
+        self._progress.running.append(f"shard:{shard.total}")
+        names = shard.variables if shard.variables is not None else list(variables)
+        try:
+            collected = await workflow.execute_child_workflow(
+                ShardedDSLWorkflow.run,
+                ShardInput(
+                    shard=shard,
+                    total=total,
+                    variables={name: variables.get(name) for name in names},
+                    task_queues=self.task_queues,
+                ),
+                id=f"{workflow.info().workflow_id}-{shard.total}-{workflow.uuid4()}",
             )
+        finally:
+            self._progress.running.remove(f"shard:{shard.total}")
+        self._progress.completed_activities += 1
+        self._progress.processed_items += total
+        if shard.result:
+            variables[shard.result] = collected
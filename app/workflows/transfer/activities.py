@@ -1,11 +1,13 @@
 import uuid
 from dataclasses import dataclass
+from typing import List
 
 from temporalio import activity
 from temporalio.exceptions import ApplicationError
 
 from app.core.exceptions import InsufficientFundsError, AccountNotFoundError, AccountLockedError
 from app.services import TransactionService
+from app.services.transaction import TransferItem, TransferResult
 from app.logger import get_logger
 logger = get_logger(__name__)
 
@@ -77,3 +79,8 @@ class AccountActivities:
         except AccountLockedError as e:
             logger.error(f"Account locked: {e}")
             raise
+
+    @activity.defn
+    async def batch_transfer_activity(self, batch_key: str, transfers: List[TransferItem]) -> List[TransferResult]:
+        """Apply a batch of transfers in a single transaction, at most once per batch key"""
+        return await self._transaction_service.batch_transfer(transfers, batch_key=batch_key)
@@ -9,7 +9,7 @@ from app.core.containers import Container
 from app.logger import get_logger, setup_logging
 from app.settings import TemporalSettings
 from app.workflows.transfer.activities import AccountActivities
-from app.workflows.transfer.workflows import TransferWorkflow
+from app.workflows.transfer.workflows import BatchTransferWorkflow, TransferWorkflow
 
 logger = get_logger(__name__)
 
@@ -26,11 +26,12 @@ async def create_worker(
     return Worker(
         client,
         task_queue=settings.TRANSFER_QUEUE,
-        workflows=[TransferWorkflow],
+        workflows=[TransferWorkflow, BatchTransferWorkflow],
         activities=[
             activities.withdraw_activity,
             activities.deposit_activity,
             activities.transform_activity,
+            activities.batch_transfer_activity,
         ],
     )
 
@@ -1,11 +1,14 @@
 import uuid
+from dataclasses import dataclass, field
 from datetime import timedelta
+from typing import List
 
 from temporalio import workflow
 from temporalio.common import RetryPolicy
 from temporalio.exceptions import ApplicationError, ActivityError
 
 with workflow.unsafe.imports_passed_through():
+    from app.services.transaction import TransferItem, TransferResult
     from app.workflows.transfer.activities import AccountActivities
 
 @workflow.defn
@@ -81,3 +84,59 @@ class TransferWorkflow:
                 "error": "unexpected_error",
                 "message": str(e)
             }
+
+
+@dataclass
+class BatchTransferInput:
+    transfers: List[TransferItem]
+    # 每个事务(activity)处理的转账笔数
+    batch_size: int = 1000
+
+
+@dataclass
+class BatchTransferOutput:
+    status: str
+    total: int
+    completed: int
+    failed: int
+    results: List[TransferResult] = field(default_factory=list)
+
+
+@workflow.defn
+class BatchTransferWorkflow:
+    """
+    Batch transfer workflow implementation
+
+    转账按 batch_size 分批，每批在一个 activity(一个数据库事务)中轧差执行。
+    批次按顺序执行，后续批次能看到前面批次的余额变化。每批以工作流ID与批次序号作为批次键，
+    批次键与转账在同一事务中写入，activity 在事务提交后被重试时返回已记录的结果，不会重复转账。
+    """
+
+    @workflow.run
+    async def run(self, batch: BatchTransferInput) -> BatchTransferOutput:
+        retry_policy = RetryPolicy(
+            initial_interval=timedelta(seconds=1),
+            maximum_interval=timedelta(seconds=10),
+            maximum_attempts=5,
+        )
+        batch_size = max(1, batch.batch_size)
+
+        results: List[TransferResult] = []
+        workflow_id = workflow.info().workflow_id
+        for index, start in enumerate(range(0, len(batch.transfers), batch_size)):
+            results.extend(await workflow.execute_activity(
+                AccountActivities.batch_transfer_activity,
+                args=[f"{workflow_id}-{index}", batch.transfers[start:start + batch_size]],
+                start_to_close_timeout=timedelta(minutes=5),
+                retry_policy=retry_policy,
+            ))
+
+        completed = sum(result.status == "completed" for result in results)
+        workflow.logger.info(f"Batch transfer completed: {completed}/{len(results)}")
+        return BatchTransferOutput(
+            status="completed",
+            total=len(results),
+            completed=completed,
+            failed=len(results) - completed,
+            results=results,
+        )
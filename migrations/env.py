@@ -27,7 +27,7 @@ from app.models import *
 
 
 def get_all_models():
-    return [User, Account, Order, Workspace, Resource, Dataset]
+    return [User, Account, Order, Workspace, Resource, Dataset, ResourceChunk, ResourceChunkVector]
 
 
 # target_metadata = mymodel.Base.metadata
@@ -0,0 +1,136 @@
+"""
+文档存储序列化格式基准测试
+
+对比 langchain / compact / compact+zstd 三种格式的存储字节数、编解码吞吐以及 mget 吞吐。
+默认使用临时 sqlite 文件，可通过 --url 指定 MySQL 等同步连接串。
+
+    python scripts/benchmark_doc_store_codec.py --chunks 100000
+
+默认参数(100k 个约 1000 字符的分块，临时 sqlite)的一次结果：
+
+    codec              MB stored    encode/s    decode/s      mget/s
+    langchain              123.0      14,960      19,692      10,881
+    compact                107.5     376,946     118,508      29,884
+    compact+zstd3           71.9      45,020      34,871      13,804
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.documents import Document
+
+from app.services.doc_store import MySQLDocumentStore
+from app.services.doc_store.codec import create_codec
+from app.settings import DocumentStoreSettings
+
+CODECS = [
+    ("langchain", None),
+    ("compact", None),
+    ("compact", 3),
+]
+
+
+def make_documents(count: int, chunk_size: int) -> list[Document]:
+    rng = random.Random(42)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 10))) for _ in range(2000)]
+    documents = []
+    for i in range(count):
+        text = []
+        length = 0
+        while length < chunk_size:
+            word = rng.choice(words)
+            text.append(word)
+            length += len(word) + 1
+        documents.append(
+            Document(
+                id=str(uuid.uuid4()),
+                page_content=" ".join(text),
+                metadata={
+                    "source": f"resources/manual_{i // 500}.pdf",
+                    "page": i % 500,
+                    "chunk_index": i % 20,
+                    "total_chunks": 20,
+                },
+            )
+        )
+    return documents
+
+
+def bench_codec(name: str, zstd_level, documents: list[Document]) -> dict:
+    codec = create_codec(name, zstd_level=zstd_level)
+
+    start = time.perf_counter()
+    encoded = [codec.encode(doc) for doc in documents]
+    encode_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for value in encoded:
+        codec.decode(value)
+    decode_seconds = time.perf_counter() - start
+
+    return {
+        "bytes": sum(len(value) for value in encoded),
+        "encode_per_sec": len(documents) / encode_seconds,
+        "decode_per_sec": len(documents) / decode_seconds,
+    }
+
+
+def bench_mget(name: str, zstd_level, documents: list[Document], url: str, batch_size: int) -> float:
+    settings = DocumentStoreSettings(
+        URL=url,
+        NAMESPACE=f"bench_{name}_{zstd_level or 0}",
+        CODEC=name,
+        ZSTD_LEVEL=zstd_level,
+    )
+    store = MySQLDocumentStore(settings)
+    for i in range(0, len(documents), batch_size):
+        batch = documents[i:i + batch_size]
+        store.mset([(doc.id, doc) for doc in batch])
+
+    keys = [doc.id for doc in documents]
+    start = time.perf_counter()
+    for i in range(0, len(keys), batch_size):
+        store.mget(keys[i:i + batch_size])
+    seconds = time.perf_counter() - start
+
+    store.mdelete(keys)
+    return len(keys) / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--url", default=None, help="同步数据库连接串，默认临时 sqlite")
+    parser.add_argument("--skip-mget", action="store_true")
+    args = parser.parse_args()
+
+    documents = make_documents(args.chunks, args.chunk_size)
+    print(f"{len(documents)} chunks, ~{args.chunk_size} chars each")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite:///{os.path.join(tmp, 'doc_store.db')}"
+        print(f"{'codec':<16}{'MB stored':>12}{'encode/s':>12}{'decode/s':>12}{'mget/s':>12}")
+        for name, zstd_level in CODECS:
+            label = f"{name}+zstd{zstd_level}" if zstd_level else name
+            result = bench_codec(name, zstd_level, documents)
+            mget = "-" if args.skip_mget else f"{bench_mget(name, zstd_level, documents, url, args.batch_size):,.0f}"
+            print(
+                f"{label:<16}"
+                f"{result['bytes'] / 1024 / 1024:>12.1f}"
+                f"{result['encode_per_sec']:>12,.0f}"
+                f"{result['decode_per_sec']:>12,.0f}"
+                f"{mget:>12}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+import sqlite3
+import uuid
+
+import pytest_asyncio
+
+from app.core.database import Database
+from app.utils import uuid6
+
+
+@pytest_asyncio.fixture
+async def db(tmp_path):
+    """建好所有表的 sqlite 数据库"""
+    # 模型主键为 CHAR(36) 的 UUID，MySQL 驱动会自动转为字符串，sqlite 需要注册适配器
+    for uuid_type in (uuid.UUID, uuid6.UUID):
+        sqlite3.register_adapter(uuid_type, str)
+    db = Database(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    await db.init_db()
+    yield db
+    await db.engine.dispose()
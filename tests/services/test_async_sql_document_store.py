@@ -0,0 +1,74 @@
+import pytest
+import pytest_asyncio
+from langchain_core.documents import Document
+
+from app.core.database import Database
+from app.services.doc_store import AsyncSQLDocumentStore
+from app.settings import DocumentStoreSettings
+
+
+@pytest_asyncio.fixture
+async def store(tmp_path):
+    db = Database(f"sqlite+aiosqlite:///{tmp_path / 'doc_store.db'}")
+    settings = DocumentStoreSettings(URL=f"sqlite:///{tmp_path / 'doc_store.db'}", NAMESPACE="test")
+    store = AsyncSQLDocumentStore(settings=settings, db=db, batch_size=2)
+    yield store
+    await store.aclose()
+    await db.engine.dispose()
+
+
+def test_engine_is_built_from_settings(store, tmp_path):
+    """测试与应用数据库相同时复用其连接池，不同时按 DOCUMENT_STORE 的地址创建引擎"""
+    assert not store._owns_engine
+
+    other = AsyncSQLDocumentStore(settings=DocumentStoreSettings(URL=f"sqlite:///{tmp_path / 'other.db'}"))
+    assert other._owns_engine
+    assert other.engine.url.drivername == "sqlite+aiosqlite"
+    assert str(other.engine.url.database).endswith("other.db")
+
+
+@pytest.mark.asyncio
+async def test_amset_and_amget(store):
+    """测试批量写入与按顺序读取，缺失的 key 返回 None"""
+    docs = [Document(id=f"d{i}", page_content=f"content {i}") for i in range(5)]
+    await store.amset([(doc.id, doc) for doc in docs])
+
+    result = await store.amget(["d3", "missing", "d0", "d4"])
+
+    assert [doc.page_content if doc else None for doc in result] == [
+        "content 3", None, "content 0", "content 4"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_amset_overwrites_existing_keys(store):
+    """测试重复写入时覆盖已有值"""
+    await store.amset([("d1", Document(page_content="old"))])
+    await store.amset([("d1", Document(page_content="new")), ("d2", Document(page_content="other"))])
+
+    result = await store.amget(["d1", "d2"])
+
+    assert [doc.page_content for doc in result] == ["new", "other"]
+
+
+@pytest.mark.asyncio
+async def test_amdelete(store):
+    """测试批量删除"""
+    await store.amset([(f"d{i}", Document(page_content=str(i))) for i in range(3)])
+    await store.amdelete(["d0", "d2"])
+
+    result = await store.amget(["d0", "d1", "d2"])
+
+    assert [doc.page_content if doc else None for doc in result] == [None, "1", None]
+
+
+@pytest.mark.asyncio
+async def test_sync_interface_shares_the_table(store):
+    """测试同步接口读写同一张表，与异步接口的数据互通"""
+    await store.amset([("d1", Document(page_content="async"))])
+
+    store.mset([("d2", Document(page_content="sync")), ("d1", Document(page_content="sync 1"))])
+    assert [doc.page_content for doc in store.mget(["d1", "d2"])] == ["sync 1", "sync"]
+
+    store.mdelete(["d1"])
+    assert [doc.page_content if doc else None for doc in await store.amget(["d1", "d2"])] == [None, "sync"]
@@ -0,0 +1,162 @@
+import uuid
+from unittest.mock import patch
+
+import pytest
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.dialects import mysql
+
+from app.core.exceptions import NotFoundError
+from app.models import Workspace
+from app.repositories.workspace import WorkspaceRepository
+
+
+class WorkspaceUpdate(BaseModel):
+    name: str | None = None
+    description: str | None = None
+
+
+@pytest.fixture
+def statements(db):
+    """记录执行的 SQL 语句"""
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement.split()[0].upper())
+
+    event.listen(db.engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    yield executed
+    event.remove(db.engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+async def create_workspace(db, repository, name="old"):
+    async with db.transaction():
+        workspace = await repository.create(Workspace(name=name, user_id=uuid.uuid4()))
+        return workspace.id
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("returning", [True, False])
+async def test_update_is_a_single_round_trip(db, statements, returning):
+    """测试更新只执行一条 UPDATE 语句，不支持 RETURNING 时根据影响行数判断记录是否存在"""
+    repository = WorkspaceRepository(db.get_session)
+    workspace_id = await create_workspace(db, repository)
+
+    with patch.object(db.engine.dialect, "update_returning", returning):
+        async with db.transaction():
+            await repository.read_by_id(workspace_id)
+            statements.clear()
+            updated = await repository.update(workspace_id, WorkspaceUpdate(name="new"))
+            # 不支持 RETURNING 时需要再读取一次 updated_at 等由数据库生成的列
+            assert statements == (["UPDATE"] if returning else ["UPDATE", "SELECT"])
+            assert updated.name == "new"
+
+            renamed = await repository.update_attr(workspace_id, "description", "desc")
+            assert (renamed.name, renamed.description) == ("new", "desc")
+
+            with pytest.raises(NotFoundError):
+                await repository.update(uuid.uuid4(), WorkspaceUpdate(name="missing"))
+
+    async with db.session():
+        assert (await repository.read_by_id(workspace_id)).name == "new"
+
+
+@pytest.mark.asyncio
+async def test_delete_is_a_single_statement(db, statements):
+    """测试删除只执行一条 DELETE ... RETURNING 语句，记录不存在时抛出 NotFoundError"""
+    repository = WorkspaceRepository(db.get_session)
+    workspace_id = await create_workspace(db, repository)
+
+    async with db.transaction():
+        statements.clear()
+        deleted = await repository.delete_by_id(workspace_id)
+        assert statements == ["DELETE"]
+        assert deleted.id == workspace_id
+
+    async with db.transaction():
+        with pytest.raises(NotFoundError):
+            await repository.delete_by_id(workspace_id)
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_inserts_in_chunks(db, statements):
+    """测试批量创建按批次执行多行 INSERT，并按输入顺序返回 id"""
+    repository = WorkspaceRepository(db.get_session)
+    user_id = uuid.uuid4()
+    items = [{"name": f"ws-{i}", "user_id": user_id} for i in range(2500)]
+
+    async with db.transaction():
+        statements.clear()
+        ids = await repository.bulk_create(items, chunk_size=1000, returning=True)
+        assert statements == ["INSERT"] * 3
+
+    async with db.session():
+        assert await repository.read_by_id(ids[0]) is not None
+        assert (await repository.read_by_id(ids[-1])).name == "ws-2499"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("returning", [True, False])
+async def test_bulk_upsert_updates_existing_rows(db, statements, returning):
+    """测试批量写入时已存在的记录被更新、保留创建时间，新记录被插入"""
+    repository = WorkspaceRepository(db.get_session)
+    workspace_id = await create_workspace(db, repository)
+    async with db.session():
+        created_at = (await repository.read_by_id(workspace_id)).created_at
+
+    user_id = uuid.uuid4()
+    items = [
+        Workspace(id=workspace_id, name="renamed", user_id=user_id),
+        Workspace(name="added", user_id=user_id),
+    ]
+    with patch.object(db.engine.dialect, "insert_returning", returning):
+        async with db.transaction():
+            statements.clear()
+            ids = await repository.bulk_upsert(items, returning=True)
+            assert statements == ["INSERT"]
+    assert [str(item) for item in ids] == [str(item.id) for item in items]
+
+    async with db.session():
+        existing = await repository.read_by_id(workspace_id)
+        assert (existing.name, existing.created_at) == ("renamed", created_at)
+        assert (await repository.read_by_id(ids[1])).name == "added"
+
+
+@pytest.mark.asyncio
+async def test_bulk_upsert_without_update_columns_keeps_existing_rows(db):
+    """测试不更新任何列时保留已有记录，MySQL 将主键赋值为自身而不是生成空的 UPDATE 子句"""
+    repository = WorkspaceRepository(db.get_session)
+    workspace_id = await create_workspace(db, repository)
+    items = [Workspace(id=workspace_id, name="renamed", user_id=uuid.uuid4())]
+
+    async with db.transaction():
+        await repository.bulk_upsert(items, update_columns=[])
+    async with db.session():
+        assert (await repository.read_by_id(workspace_id)).name == "old"
+
+    async with db.session():
+        with patch.object(db.engine.dialect, "name", "mysql"):
+            stmt = repository._upsert_statement([repository._to_row(items[0])], ["id"], [])
+    assert "ON DUPLICATE KEY UPDATE id = workspaces.id" in str(stmt.compile(dialect=mysql.dialect()))
+
+
+@pytest.mark.asyncio
+async def test_bulk_upsert_falls_back_for_other_databases(db, statements):
+    """测试不支持 upsert 语法的数据库先查询已有记录，再更新已有记录、插入新记录"""
+    repository = WorkspaceRepository(db.get_session)
+    workspace_id = await create_workspace(db, repository)
+    user_id = uuid.uuid4()
+    items = [
+        Workspace(id=workspace_id, name="renamed", user_id=user_id),
+        Workspace(name="added", user_id=user_id),
+    ]
+    with patch.object(db.engine.dialect, "name", "mssql"):
+        async with db.transaction():
+            statements.clear()
+            ids = await repository.bulk_upsert(items, returning=True)
+            assert statements == ["SELECT", "UPDATE", "INSERT"]
+    assert [str(item) for item in ids] == [str(item.id) for item in items]
+
+    async with db.session():
+        assert (await repository.read_by_id(workspace_id)).name == "renamed"
+        assert (await repository.read_by_id(ids[1])).name == "added"
@@ -0,0 +1,229 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from langchain_core.documents import Document
+
+from app.services.doc_store import CachedDocumentStore, DocumentStore
+
+
+class FakePipeline:
+    """立即执行命令的管道，同时支持同步与异步的用法"""
+
+    def __init__(self, redis):
+        self.redis = redis
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def set(self, key, value, ex=None, nx=False):
+        if not (nx and key in self.redis.data):
+            self.redis.data[key] = value
+
+    def publish(self, channel, message):
+        for queue in self.redis.subscribers.get(channel, []):
+            queue.put_nowait({"type": "message", "data": message})
+
+    def execute(self):
+        return _Done()
+
+
+class _Done:
+    """execute() 的返回值，同步调用时忽略，异步调用时可以 await"""
+
+    def __await__(self):
+        return iter([])
+
+
+class FakePubSub:
+    def __init__(self, redis):
+        self.redis = redis
+        self.queue = asyncio.Queue()
+        self.channel = None
+
+    async def subscribe(self, channel):
+        self.channel = channel
+        self.redis.subscribers.setdefault(channel, []).append(self.queue)
+        self.redis.subscribed.set()
+
+    async def listen(self):
+        while True:
+            yield await self.queue.get()
+
+    async def aclose(self):
+        if self.channel:
+            self.redis.subscribers[self.channel].remove(self.queue)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.subscribers = {}
+        self.subscribed = asyncio.Event()
+
+    async def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+    def sync(self):
+        """共享数据的同步客户端"""
+        return SyncFakeRedis(self)
+
+
+class SyncFakeRedis:
+    def __init__(self, redis):
+        self.redis = redis
+
+    def mget(self, keys):
+        return [self.redis.data.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self.redis)
+
+
+def cached(backend, redis_client):
+    return CachedDocumentStore(backend, redis_client=redis_client, sync_redis_client=redis_client.sync())
+
+
+@pytest.fixture
+def backend():
+    docs = {"d1": Document(page_content="one"), "d2": Document(page_content="two")}
+    store = MagicMock(spec=DocumentStore)
+    store.amget = AsyncMock(side_effect=lambda keys: [docs.get(key) for key in keys])
+    store.amset = AsyncMock()
+    store.amdelete = AsyncMock()
+    return store
+
+
+@pytest.fixture
+def redis_client():
+    return FakeRedis()
+
+
+@pytest.mark.asyncio
+async def test_hits_are_served_from_memory(backend, redis_client):
+    """测试命中进程内缓存时不访问 Redis 与底层存储"""
+    store = cached(backend, redis_client)
+
+    first = await store.amget(["d1", "d2"])
+    second = await store.amget(["d2", "d1"])
+
+    backend.amget.assert_awaited_once_with(["d1", "d2"])
+    assert [doc.page_content for doc in first] == ["one", "two"]
+    assert [doc.page_content for doc in second] == ["two", "one"]
+
+
+@pytest.mark.asyncio
+async def test_redis_tier_is_shared(backend, redis_client):
+    """测试其他进程写入的 Redis 缓存可以被命中"""
+    await cached(backend, redis_client).amget(["d1"])
+    other = cached(backend, redis_client)
+
+    result = await other.amget(["d1"])
+
+    backend.amget.assert_awaited_once()
+    assert result[0].page_content == "one"
+
+
+@pytest.mark.asyncio
+async def test_missing_keys_are_negatively_cached(backend, redis_client):
+    """测试不存在的 key 被负缓存"""
+    store = cached(backend, redis_client)
+
+    assert await store.amget(["missing"]) == [None]
+    assert await store.amget(["missing"]) == [None]
+    assert await cached(backend, redis_client).amget(["missing"]) == [None]
+    backend.amget.assert_awaited_once_with(["missing"])
+
+
+@pytest.mark.asyncio
+async def test_write_through_and_invalidation(backend, redis_client):
+    """测试写入时更新缓存，删除时将缓存替换为负缓存"""
+    store = cached(backend, redis_client)
+    await store.amget(["d3"])
+
+    await store.amset([("d3", Document(page_content="three"))])
+    assert (await store.amget(["d3"]))[0].page_content == "three"
+
+    await store.amdelete(["d3"])
+    backend.amdelete.assert_awaited_once_with(["d3"])
+    # 删除后写入负缓存，而不是删除 key
+    assert redis_client.data == {"doc_store:doc:d3": b""}
+    assert await store.amget(["d3"]) == [None]
+    # 删除后的读取命中负缓存，不再访问底层存储
+    assert backend.amget.await_count == 1
+
+
+def test_sync_interface_uses_sync_redis(backend, redis_client):
+    """测试同步接口通过同步客户端读写 Redis，与异步接口共享缓存"""
+    backend.mget = MagicMock(side_effect=lambda keys: [None for _ in keys])
+    store = cached(backend, redis_client)
+
+    store.mset([("d1", Document(page_content="new"))])
+    backend.mset.assert_called_once()
+    assert store.mget(["d1"])[0].page_content == "new"
+    assert cached(backend, redis_client).mget(["d1"])[0].page_content == "new"
+
+    store.mdelete(["d1"])
+    assert cached(backend, redis_client).mget(["d1"]) == [None]
+    backend.mget.assert_not_called()
+
+
+def test_redis_client_requires_sync_client(backend, redis_client):
+    with pytest.raises(ValueError):
+        CachedDocumentStore(backend, redis_client=redis_client)
+
+
+@pytest.mark.asyncio
+async def test_read_through_does_not_overwrite_newer_values(backend, redis_client):
+    """测试读穿透读到旧值时，回填不覆盖读取期间写入的新值"""
+    store = cached(backend, redis_client)
+    writer = cached(backend, redis_client)
+
+    async def read_then_write(keys):
+        # 读到旧值之后、回填之前，另一个实例写入了新值
+        await writer.amset([("d1", Document(page_content="new"))])
+        await store.amset([("d1", Document(page_content="new"))])
+        return [Document(page_content="old")]
+
+    backend.amget = AsyncMock(side_effect=read_then_write)
+    await store.amget(["d1"])
+
+    assert (await store.amget(["d1"]))[0].page_content == "new"
+    assert (await cached(backend, redis_client).amget(["d1"]))[0].page_content == "new"
+
+
+@pytest.mark.asyncio
+async def test_writes_invalidate_other_processes(backend, redis_client):
+    """测试写入与删除通过 Redis 通知其他进程清除进程内缓存"""
+    reader = cached(backend, redis_client)
+    writer = cached(backend, redis_client)
+    # 订阅建立时会清空进程内缓存，等订阅建立后再读取
+    await reader.amget(["d1"])
+    await asyncio.wait_for(redis_client.subscribed.wait(), 1)
+    assert (await reader.amget(["d1"]))[0].page_content == "one"
+
+    await writer.amset([("d1", Document(page_content="updated"))])
+    await asyncio.sleep(0)
+    assert (await reader.amget(["d1"]))[0].page_content == "updated"
+
+    await writer.amdelete(["d1"])
+    await asyncio.sleep(0)
+    assert await reader.amget(["d1"]) == [None]
+
+    await reader.aclose()
+    await writer.aclose()
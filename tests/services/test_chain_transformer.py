@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+from langchain_core.documents import Document
+
+from app.services.document_transformer import create_transformer, ChainTransformer
+from app.services.document_transformer.base import DocumentTransformer, iterate_documents
+
+
+class SlowUpperTransformer(DocumentTransformer):
+    """模拟调用 LLM 的逐文档转换器"""
+
+    def __init__(self, delay: float = 0.01, **kwargs):
+        super().__init__(**kwargs)
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+
+    async def transform(self, documents):
+        async for doc in iterate_documents(documents):
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            await asyncio.sleep(self.delay)
+            self.active -= 1
+            yield Document(page_content=doc.page_content.upper(), metadata=doc.metadata)
+
+
+class FailingTransformer(DocumentTransformer):
+    async def transform(self, documents):
+        async for doc in iterate_documents(documents):
+            if doc.page_content == "bad":
+                raise RuntimeError("boom")
+            yield doc
+
+
+@pytest.mark.asyncio
+async def test_chain_streams_first_result_before_input_is_consumed():
+    """测试第一个结果在输入读完之前输出，且上游最多领先缓冲区大小"""
+    produced = 0
+
+    async def source():
+        nonlocal produced
+        for i in range(100):
+            produced += 1
+            yield Document(page_content=f"Doc {i}")
+
+    chain = ChainTransformer(
+        transforms=[create_transformer("lowercase"), create_transformer("prefix", prefix="> ")],
+        buffer_size=2,
+    )
+
+    results = chain.transform(source())
+    first = await results.__anext__()
+    await results.aclose()
+
+    assert first.page_content == "> doc 0"
+    assert produced < 20
+
+
+@pytest.mark.asyncio
+async def test_chain_runs_stage_concurrently():
+    """测试并发阶段同时处理多个文档，且结果完整"""
+    slow = SlowUpperTransformer()
+    chain = ChainTransformer(transforms=[create_transformer("clean"), slow], concurrency=[1, 4])
+    documents = [Document(page_content=f" doc {i} ") for i in range(20)]
+
+    results = [doc async for doc in chain.transform(documents)]
+
+    assert sorted(doc.page_content for doc in results) == sorted(f"DOC {i}" for i in range(20))
+    assert slow.max_active == 4
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("concurrency", [1, 3])
+async def test_chain_propagates_stage_errors(concurrency):
+    """测试任一阶段失败时异常传递给调用方"""
+    chain = ChainTransformer(
+        transforms=[FailingTransformer(), create_transformer("lowercase")],
+        concurrency=[concurrency, 1],
+    )
+    documents = [Document(page_content=text) for text in ["ok", "bad", "ok"]]
+
+    with pytest.raises(RuntimeError, match="boom"):
+        [doc async for doc in chain.transform(documents)]
@@ -0,0 +1,46 @@
+import pytest
+from langchain_core.documents import Document
+
+from app.services.document_splitter import Chunk, create_splitter, materialize
+
+SOURCE = Document(id="src", page_content="hello world, this is the source text", metadata={"source": "a.pdf"})
+
+
+def test_chunk_references_source_without_copying():
+    """测试分块按偏移读取正文，metadata 写入只影响增量"""
+    chunk = Chunk(SOURCE, 6, 11, id="c1", metadata={"chunk_index": 0})
+
+    chunk.metadata["content_hash"] = "h"
+
+    assert chunk.page_content == "world"
+    assert len(chunk) == 5
+    assert chunk.metadata["source"] == "a.pdf"
+    assert SOURCE.metadata == {"source": "a.pdf"}
+
+
+def test_materialize_converts_chunks_only():
+    """测试 materialize 将分块转换为独立的 Document"""
+    chunk = Chunk(SOURCE, 0, 5, id="c1", metadata={"chunk_index": 0})
+    chunk.page_content = "HELLO"
+    other = Document(page_content="plain")
+
+    documents = materialize([chunk, other])
+
+    assert documents[0].id == "c1"
+    assert documents[0].page_content == "HELLO"
+    assert documents[0].metadata == {"source": "a.pdf", "chunk_index": 0}
+    assert documents[1] is other
+
+
+@pytest.mark.asyncio
+async def test_split_chunks_share_source_document():
+    """测试分割器生成的分块引用同一个源文档，与 split 的结果一致"""
+    source = Document(page_content="First paragraph here.\n\nSecond paragraph here.", metadata={"source": "b"})
+    splitter = create_splitter("fast", chunk_size=25, chunk_overlap=0)
+
+    chunks = [chunk async for chunk in splitter.split_chunks([source])]
+    documents = [doc async for doc in splitter.split([source])]
+
+    assert all(chunk.source is source for chunk in chunks)
+    assert [doc.page_content for doc in materialize(chunks)] == [doc.page_content for doc in documents]
+    assert [doc.metadata for doc in materialize(chunks)] == [doc.metadata for doc in documents]
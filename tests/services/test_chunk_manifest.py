@@ -0,0 +1,65 @@
+
+import pytest
+from langchain_core.documents import Document
+
+from app.repositories.chunk_manifest import ChunkManifestRepository
+from app.services.chunk_manifest import ChunkManifestService
+from app.utils.hash import hash_content, make_chunk_id
+
+RESOURCE_ID = "0194434a-70cc-78d0-b960-1157ce9c02d3"
+
+
+def make_chunks(texts):
+    docs = []
+    for text in texts:
+        content_hash = hash_content(text)
+        docs.append(Document(
+            id=make_chunk_id(RESOURCE_ID, content_hash),
+            page_content=text,
+            metadata={"resource_id": RESOURCE_ID, "content_hash": content_hash},
+        ))
+    return docs
+
+
+@pytest.fixture
+def service(db):
+    return ChunkManifestService(db=db, chunk_manifest_repository=ChunkManifestRepository(db.get_session))
+
+
+def test_make_chunk_id_is_deterministic():
+    """测试相同资源与内容生成相同的分块ID，出现序号不同则ID不同"""
+    content_hash = hash_content("hello")
+    assert make_chunk_id(RESOURCE_ID, content_hash) == make_chunk_id(RESOURCE_ID, content_hash)
+    assert make_chunk_id(RESOURCE_ID, content_hash, 0) != make_chunk_id(RESOURCE_ID, content_hash, 1)
+
+
+@pytest.mark.asyncio
+async def test_first_run_adds_all_chunks(service):
+    """测试首次处理时所有分块均为新增"""
+    docs = make_chunks(["a", "b", "c"])
+
+    added, stale = await service.diff(RESOURCE_ID, docs)
+
+    assert [doc.id for doc in added] == [doc.id for doc in docs]
+    assert stale == []
+
+
+@pytest.mark.asyncio
+async def test_rerun_only_returns_changed_chunks(service):
+    """测试重新处理时只返回变化的分块，并找出过期分块及其向量"""
+    old = make_chunks(["a", "b", "c"])
+    await service.commit(RESOURCE_ID, old, [])
+    await service.record_vectors(RESOURCE_ID, "dataset", [(old[1].id, "v1"), (old[2].id, "v2")])
+    await service.record_vectors(RESOURCE_ID, "dataset_faq", [(old[1].id, "q1"), (old[1].id, "q1")])
+
+    new = make_chunks(["a", "b2", "c"])
+    added, stale = await service.diff(RESOURCE_ID, new)
+
+    assert [doc.page_content for doc in added] == ["b2"]
+    assert stale == [old[1].id]
+    assert await service.get_vectors(RESOURCE_ID, stale) == {"dataset": ["v1"], "dataset_faq": ["q1"]}
+
+    await service.commit(RESOURCE_ID, new, stale)
+
+    assert await service.diff(RESOURCE_ID, new) == ([], [])
+    assert await service.get_vectors(RESOURCE_ID, stale) == {}
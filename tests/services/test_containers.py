@@ -0,0 +1,49 @@
+from unittest.mock import MagicMock
+
+import pytest
+from dependency_injector import providers
+
+from app.core.containers.repositories import RepositoriesContainer
+from app.core.containers.services import ServicesContainer
+from app.core.database import Database
+from app.settings import get_settings
+
+# ChatService 需要的 llm_service 在 AIContainer 中，不在服务容器内解析
+UNRESOLVED_SERVICES = {"chat_service"}
+
+
+def make_containers():
+    db = MagicMock(spec=Database)
+    repositories = RepositoriesContainer(db=db)
+    services = ServicesContainer(
+        repositories=repositories,
+        clients=providers.DependenciesContainer(
+            redis_client=providers.Object(MagicMock()),
+            sync_redis_client=providers.Object(MagicMock()),
+        ),
+        db=db,
+        settings=get_settings(),
+    )
+    # 存储服务在创建时连接 MinIO
+    services.storage_service.override(providers.Object(MagicMock()))
+    return repositories, services
+
+
+def factory_names(container):
+    return [name for name, provider in container.providers.items() if isinstance(provider, providers.Factory)]
+
+
+@pytest.mark.parametrize("name", factory_names(RepositoriesContainer))
+def test_repository_providers_resolve(name):
+    """测试每个 repository 的 provider 都能创建实例"""
+    repositories, _ = make_containers()
+    assert getattr(repositories, name)() is not None
+
+
+@pytest.mark.parametrize("name", [
+    name for name in factory_names(ServicesContainer) if name not in UNRESOLVED_SERVICES
+])
+def test_service_providers_resolve(name):
+    """测试每个服务的 provider 都能创建实例"""
+    _, services = make_containers()
+    assert getattr(services, name)() is not None
@@ -0,0 +1,260 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.core.database import Database, is_retryable_error
+from app.core.exceptions import DatabaseError
+from app.core.metrics import REGISTRY
+from app.core.session_tracker import SessionTracker
+
+
+async def create_marker(db: Database, engine, marker: str) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE TABLE marker (name VARCHAR(32))"))
+        await conn.execute(text("INSERT INTO marker VALUES (:name)"), {"name": marker})
+
+
+async def read_marker(session) -> str:
+    return (await session.execute(text("SELECT name FROM marker"))).scalar()
+
+
+@pytest_asyncio.fixture
+async def db(tmp_path):
+    db = Database(
+        f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}",
+        replica_urls=[f"sqlite+aiosqlite:///{tmp_path / f'replica{i}.db'}" for i in range(2)],
+    )
+    # 每个库写入不同的标记，以判断查询实际路由到了哪个库
+    await create_marker(db, db.engine, "primary")
+    for replica in db.replicas:
+        await create_marker(db, replica.engine, replica.name)
+    await db.check_replicas()
+    yield db
+    await db.engine.dispose()
+    for replica in db.replicas:
+        await replica.engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_reads_are_routed_to_replicas_round_robin(db):
+    """测试只读会话轮询路由到副本，仓储通过 get_session 获取的会话使用相同的路由"""
+    markers = []
+    for _ in range(3):
+        async with db.session():
+            markers.append(await read_marker(db.get_session()))
+
+    assert markers == ["replica-0", "replica-1", "replica-0"]
+
+
+@pytest.mark.asyncio
+async def test_transactions_read_and_write_on_primary(db):
+    """测试事务内的读写以及事务内嵌套的只读会话都使用主库"""
+    async with db.transaction() as session:
+        await session.execute(text("UPDATE marker SET name = 'primary-updated'"))
+        async with db.session() as read_session:
+            assert await read_marker(read_session) == "primary-updated"
+
+    async with db.session() as session:
+        assert await read_marker(session) == "replica-0"
+
+
+@pytest.mark.asyncio
+async def test_primary_reads_skip_replicas(db):
+    """测试指定 primary 的只读会话查询主库"""
+    async with db.session(primary=True) as session:
+        assert await read_marker(session) == "primary"
+
+
+@pytest.mark.asyncio
+async def test_replica_checks_run_in_the_background(db):
+    """测试检测结果过期时查询不等待副本检测，检测在后台执行"""
+    checked = asyncio.Event()
+    release = asyncio.Event()
+
+    async def slow_check():
+        checked.set()
+        await release.wait()
+
+    db._replicas_checked_at = float("-inf")
+    with patch.object(db, "check_replicas", slow_check):
+        async with db.session() as session:
+            assert await read_marker(session) == "replica-0"
+        await asyncio.wait_for(checked.wait(), 1)
+        # 检测仍在执行时不会重复启动
+        async with db.session():
+            pass
+        release.set()
+        await db._replica_check
+
+
+@pytest.mark.asyncio
+async def test_lagging_replicas_fall_back_to_primary(db):
+    """测试复制延迟超过阈值的副本不参与路由，全部不可用时回退到主库"""
+    def measure(conn):
+        return 30.0 if "replica0" in str(conn.engine.url) else 0.5
+
+    with patch("app.core.database.measure_replica_lag", side_effect=measure):
+        await db.check_replicas()
+    async with db.session() as session:
+        assert await read_marker(session) == "replica-1"
+
+    for replica in db.replicas:
+        replica.healthy = False
+    async with db.session() as session:
+        assert await read_marker(session) == "primary"
+
+
+@pytest.mark.asyncio
+async def test_pool_metrics(tmp_path):
+    """测试连接池大小可配置，并导出已取出连接数、获取等待时间与连接年龄"""
+    db = Database(f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}", pool_size=1, max_overflow=0, pool_timeout=5)
+    # 指标按连接池名称区分，测试之间共享注册表，以差值判断
+    waits_before = REGISTRY.get_sample_value("db_pool_checkout_wait_seconds_count", {"pool": "primary"}) or 0
+    ages_before = REGISTRY.get_sample_value("db_pool_connection_age_seconds_count", {"pool": "primary"}) or 0
+
+    async with db.engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+        assert REGISTRY.get_sample_value("db_pool_checked_out_connections", {"pool": "primary"}) == 1
+        assert db.engine.pool.size() == 1
+    assert REGISTRY.get_sample_value("db_pool_checked_out_connections", {"pool": "primary"}) == 0
+
+    async with db.session() as session:
+        await session.execute(text("SELECT 1"))
+    await db.engine.dispose()
+
+    waits = REGISTRY.get_sample_value("db_pool_checkout_wait_seconds_count", {"pool": "primary"})
+    ages = REGISTRY.get_sample_value("db_pool_connection_age_seconds_count", {"pool": "primary"})
+    assert waits - waits_before == 2
+    assert ages - ages_before == 1
+
+
+@pytest.mark.asyncio
+async def test_active_sessions_are_balanced_and_leaks_reported(tmp_path):
+    """测试活跃 session 数在 session、transaction 结束后归零，长时间未关闭的 direct session 被识别为泄漏"""
+    tracker = SessionTracker(leak_threshold=0.05, capture_stack=True)
+    db = Database(f"sqlite+aiosqlite:///{tmp_path / 'sessions.db'}", session_tracker=tracker)
+
+    def active(session_type):
+        return REGISTRY.get_sample_value("db_active_sessions", {"session_type": session_type}) or 0
+
+    before = {session_type: active(session_type) for session_type in ("read", "transaction", "direct")}
+
+    async with db.session() as session:
+        await session.execute(text("SELECT 1"))
+        assert active("read") - before["read"] == 1
+    async with db.transaction() as session:
+        await session.execute(text("SELECT 1"))
+    assert active("read") == before["read"]
+    assert active("transaction") == before["transaction"]
+    assert tracker.live() == []
+
+    # 直接获取的 session 没有被关闭
+    leaked_session = db.get_session()
+    await leaked_session.execute(text("SELECT 1"))
+    assert active("direct") - before["direct"] == 1
+    await asyncio.sleep(0.06)
+
+    leaked = tracker.check_leaks()
+    assert [item.session_id for item in leaked] == [id(leaked_session)]
+    assert any("test_database.py" in line for line in leaked[0].stack)
+    # 同一个 session 只报告一次
+    assert tracker.check_leaks() == []
+
+    await leaked_session.close()
+    assert active("direct") == before["direct"]
+    await db.engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_leaks_are_reported_without_new_sessions_and_direct_sessions_close_with_task(tmp_path):
+    """测试没有新 session 时后台任务仍报告泄漏，direct session 在创建它的任务结束时关闭"""
+    tracker = SessionTracker(leak_threshold=0.05, check_interval=0.01)
+    db = Database(f"sqlite+aiosqlite:///{tmp_path / 'direct.db'}", session_tracker=tracker)
+    started = asyncio.Event()
+    finish = asyncio.Event()
+
+    async def handler():
+        await db.get_session().execute(text("SELECT 1"))
+        started.set()
+        await finish.wait()
+
+    task = asyncio.create_task(handler())
+    await started.wait()
+    before = REGISTRY.get_sample_value("db_session_leaks_total", {"session_type": "direct"}) or 0
+    await asyncio.sleep(0.1)
+    assert REGISTRY.get_sample_value("db_session_leaks_total", {"session_type": "direct"}) - before == 1
+
+    finish.set()
+    await task
+    for _ in range(10):
+        if not tracker.live():
+            break
+        await asyncio.sleep(0.01)
+    assert tracker.live() == []
+    assert task not in db._session_factory.registry.registry
+    await db.engine.dispose()
+
+
+def deadlock() -> OperationalError:
+    return OperationalError("UPDATE accounts", {}, Exception(1213, "Deadlock found when trying to get lock"))
+
+
+@pytest.mark.asyncio
+async def test_run_in_transaction_retries_deadlocks(tmp_path):
+    """测试死锁时回滚并重新执行整个事务，超过最大次数后抛出，非可重试错误不重试"""
+    db = Database(f"sqlite+aiosqlite:///{tmp_path / 'retry.db'}", retry_max_attempts=3, retry_base_delay=0.001)
+    await create_marker(db, db.engine, "initial")
+
+    def retries(name):
+        return REGISTRY.get_sample_value(name, {"error_type": "OperationalError"}) or 0
+
+    retried_before = retries("db_transaction_retries_total")
+    exhausted_before = retries("db_transaction_retries_exhausted_total")
+    attempts = []
+
+    async def update_marker(fail_times):
+        attempts.append(1)
+        await db.get_session().execute(text("UPDATE marker SET name = :name"), {"name": f"attempt-{len(attempts)}"})
+        if len(attempts) <= fail_times:
+            raise deadlock()
+        return len(attempts)
+
+    assert await db.run_in_transaction(update_marker, 2) == 3
+    async with db.session() as session:
+        assert await read_marker(session) == "attempt-3"
+
+    attempts.clear()
+    with pytest.raises(OperationalError):
+        await db.run_in_transaction(update_marker, 3)
+    assert len(attempts) == 3
+
+    async def fail():
+        attempts.append(1)
+        raise ValueError("not retryable")
+
+    attempts.clear()
+    with pytest.raises(ValueError):
+        await db.run_in_transaction(fail)
+    assert len(attempts) == 1
+
+    assert retries("db_transaction_retries_total") - retried_before == 4
+    assert retries("db_transaction_retries_exhausted_total") - exhausted_before == 1
+    async with db.session() as session:
+        assert await read_marker(session) == "attempt-3"
+    await db.engine.dispose()
+
+
+def test_retryable_errors_are_found_through_exception_chain():
+    """测试业务代码转换后的数据库异常仍能识别为可重试"""
+    try:
+        try:
+            raise deadlock()
+        except OperationalError:
+            raise DatabaseError("Failed to get account")
+    except DatabaseError as e:
+        assert is_retryable_error(e)
+    assert not is_retryable_error(OperationalError("SELECT 1", {}, Exception(1146, "Table doesn't exist")))
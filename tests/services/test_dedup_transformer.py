@@ -0,0 +1,71 @@
+import random
+import string
+
+import pytest
+from langchain_core.documents import Document
+
+from app.services.document_transformer import create_transformer, DedupTransformer
+
+DISCLAIMER = (
+    "This document contains confidential information intended only for the recipient. "
+    "Any distribution, copying or disclosure is strictly prohibited without prior written consent."
+)
+
+
+def random_text(rng: random.Random, length: int = 400) -> str:
+    return "".join(rng.choices(string.ascii_lowercase + " ", k=length))
+
+
+async def collect(transformer, documents):
+    return [doc async for doc in transformer.transform(documents)]
+
+
+@pytest.mark.asyncio
+async def test_drop_exact_and_near_duplicates():
+    """测试完全相同与近似重复(页码不同)的免责声明只保留第一份"""
+    rng = random.Random(0)
+    docs = [Document(id="a", page_content=random_text(rng))]
+    docs += [
+        Document(id=f"d{page}", page_content=f"{DISCLAIMER} Page {page}")
+        for page in range(10, 20)
+    ]
+    docs.append(Document(id="b", page_content=random_text(rng)))
+    docs.append(Document(id="d-exact", page_content=f"  {DISCLAIMER}   Page 10 "))
+
+    transformer = DedupTransformer(threshold=0.8)
+    result = await collect(transformer, docs)
+
+    assert [doc.id for doc in result] == ["a", "d10", "b"]
+    assert result[1].metadata["duplicate_count"] == 10
+    assert transformer.stats.exact_duplicates == 1
+    assert transformer.stats.near_duplicates == 9
+    assert transformer.stats.ratio == pytest.approx(10 / 13)
+
+
+@pytest.mark.asyncio
+async def test_link_mode_keeps_order_and_links_duplicates():
+    """测试 link 模式保留所有分块并记录 duplicate_of"""
+    docs = [
+        Document(id="x", page_content=DISCLAIMER),
+        Document(id="y", page_content="completely unrelated content about quarterly revenue"),
+        Document(id="z", page_content=DISCLAIMER.upper()),
+    ]
+
+    result = await collect(create_transformer("dedup", mode="link"), docs)
+
+    assert [doc.id for doc in result] == ["x", "y", "z"]
+    assert result[2].metadata["duplicate_of"] == "x"
+    assert "duplicate_of" not in result[1].metadata
+
+
+@pytest.mark.asyncio
+async def test_distinct_documents_are_kept():
+    """测试互不相似的分块不会被误判"""
+    rng = random.Random(1)
+    docs = [Document(id=str(i), page_content=random_text(rng)) for i in range(50)]
+
+    transformer = DedupTransformer()
+    result = await collect(transformer, docs)
+
+    assert len(result) == 50
+    assert transformer.stats.ratio == 0
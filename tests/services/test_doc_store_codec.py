@@ -0,0 +1,91 @@
+from unittest.mock import patch
+
+import pytest
+from langchain_core.documents import Document
+
+from app.services.doc_store.codec import (
+    CompactDocumentCodec,
+    LangChainDocumentCodec,
+    VERSION_COMPACT,
+    VERSION_COMPACT_ZSTD,
+    create_codec,
+    zstandard,
+)
+
+
+@pytest.fixture
+def document():
+    return Document(
+        id="doc-1",
+        page_content="文档内容 " * 200,
+        metadata={"source": "manual.pdf", "page": 3, "tags": ["a", "b"]},
+    )
+
+
+def assert_same(decoded, document):
+    assert decoded.id == document.id
+    assert decoded.page_content == document.page_content
+    assert decoded.metadata == document.metadata
+
+
+def test_compact_roundtrip(document):
+    """测试紧凑格式编解码"""
+    codec = CompactDocumentCodec()
+    encoded = codec.encode(document)
+
+    assert encoded[0] == VERSION_COMPACT
+    assert len(encoded) < len(LangChainDocumentCodec().encode(document))
+    assert_same(codec.decode(encoded), document)
+
+
+def test_compact_reads_legacy_rows(document):
+    """测试紧凑格式可以读取旧的 LangChain 格式数据"""
+    legacy = LangChainDocumentCodec().encode(document)
+
+    assert_same(CompactDocumentCodec().decode(legacy), document)
+
+
+def test_legacy_codec_reads_compact_rows(document):
+    """测试回退到 LangChain 格式时仍可读取紧凑格式数据"""
+    encoded = CompactDocumentCodec().encode(document)
+
+    assert_same(LangChainDocumentCodec().decode(encoded), document)
+
+
+@pytest.mark.skipif(zstandard is None, reason="zstandard not installed")
+def test_compact_zstd_roundtrip(document):
+    """测试 zstd 压缩"""
+    codec = create_codec("compact", zstd_level=3)
+    encoded = codec.encode(document)
+
+    assert encoded[0] == VERSION_COMPACT_ZSTD
+    assert len(encoded) < len(CompactDocumentCodec().encode(document))
+    assert_same(codec.decode(encoded), document)
+
+
+@pytest.mark.skipif(zstandard is None, reason="zstandard not installed")
+def test_compact_zstd_skips_small_documents():
+    """测试过小的文档不压缩"""
+    codec = CompactDocumentCodec(zstd_level=3)
+    encoded = codec.encode(Document(page_content="short"))
+
+    assert encoded[0] == VERSION_COMPACT
+    assert codec.decode(encoded).page_content == "short"
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        create_codec("pickle")
+
+
+def test_zstd_level_requires_zstandard():
+    """测试配置了压缩级别但未安装 zstandard 时创建编解码器即失败"""
+    with patch("app.services.doc_store.codec.zstandard", None):
+        with pytest.raises(ValueError, match="zstandard"):
+            create_codec("compact", zstd_level=3)
+
+
+def test_unserializable_metadata_fails():
+    """测试 metadata 中无法序列化的值编码失败，而不是被转为字符串"""
+    with pytest.raises(TypeError):
+        CompactDocumentCodec().encode(Document(page_content="x", metadata={"value": object()}))
@@ -0,0 +1,78 @@
+import pytest
+from langchain_core.documents import Document
+
+from app.services.document_splitter import create_splitter
+from app.services.document_splitter.fast import split_text_offsets
+
+TEXT = (
+    "Para one. It has sentences! Short.\n\n"
+    "Para two is here and is a bit longer than the others, with words.\nLine two.\n\n"
+    "中文句子。第二句！"
+)
+
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+
+def test_offsets_respect_size_and_prefer_paragraphs():
+    """测试分块不超过大小限制，且优先在段落边界处切分"""
+    offsets = split_text_offsets(TEXT, chunk_size=40, chunk_overlap=10)
+    chunks = [TEXT[start:end] for start, end in offsets]
+
+    assert chunks[0] == "Para one. It has sentences! Short."
+    assert all(len(chunk) <= 40 for chunk in chunks)
+    assert chunks[-1].endswith("第二句！")
+    # 段落内的相邻分块有重叠，重叠不跨越段落
+    assert chunks[1].startswith("Para two")
+    assert chunks[2].split()[0] in chunks[1]
+
+
+def test_token_sizing_with_custom_counter():
+    """测试按 token 计数切分"""
+    text = " ".join(f"word{i}." for i in range(100))
+
+    offsets = split_text_offsets(text, chunk_size=10, chunk_overlap=0, tokenizer=count_words)
+
+    assert [count_words(text[start:end]) for start, end in offsets] == [10] * 10
+
+
+def test_oversized_segment_is_hard_split():
+    """测试没有边界的超长文本按字符强制切分"""
+    text = "x" * 95
+
+    offsets = split_text_offsets(text, chunk_size=30)
+
+    assert offsets == [(0, 30), (30, 60), (60, 90), (90, 95)]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("max_workers", [0, 1])
+async def test_split_documents_keeps_metadata_and_offsets(max_workers):
+    """测试多文档切分(含进程池并行)保留 metadata 并记录原文偏移"""
+    documents = [Document(page_content=TEXT, metadata={"source": f"doc{i}"}) for i in range(3)]
+    splitter = create_splitter(
+        "fast", chunk_size=40, chunk_overlap=10, max_workers=max_workers, parallel_threshold=0
+    )
+
+    chunks = [chunk async for chunk in splitter.split(documents)]
+
+    assert len(chunks) == 12
+    for chunk in chunks:
+        start, end = chunk.metadata["start_index"], chunk.metadata["end_index"]
+        assert TEXT[start:end] == chunk.page_content
+    assert [chunk.metadata["source"] for chunk in chunks[::4]] == ["doc0", "doc1", "doc2"]
+    assert chunks[0].metadata["total_chunks"] == 4
+
+
+@pytest.mark.asyncio
+async def test_create_splitter_passes_tokenizer():
+    """测试 create_splitter 将 tokenizer 传给 fast 分割器，langchain 分割器不支持 tokenizer"""
+    text = " ".join(f"word{i}." for i in range(100))
+    splitter = create_splitter("fast", chunk_size=10, chunk_overlap=0, tokenizer=count_words)
+
+    chunks = [chunk async for chunk in splitter.split([Document(page_content=text)])]
+
+    assert [count_words(chunk.page_content) for chunk in chunks] == [10] * 10
+    with pytest.raises(ValueError):
+        create_splitter("langchain", tokenizer=count_words)
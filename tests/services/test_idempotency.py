@@ -0,0 +1,169 @@
+import asyncio
+import uuid
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy import func, select
+
+from app.core.exceptions import IdempotencyConflictError
+from app.models import Account
+from app.services.idempotency import IdempotencyService
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def expire(self, key, seconds):
+        return key in self.data
+
+
+@pytest.fixture
+def service():
+    return IdempotencyService(FakeRedis())
+
+
+@pytest.mark.asyncio
+async def test_retries_replay_the_first_response(service):
+    """测试相同幂等键的重试返回第一次的响应，不再执行请求"""
+    calls = []
+
+    async def handle():
+        calls.append(1)
+        return {"workflow_id": "transfer-k1", "status": "pending"}
+
+    payload = {"from_account": "a", "to_account": "b", "amount": 1.0}
+    first = await service.run("transfer", "k1", payload, handle)
+    second = await service.run("transfer", "k1", payload, handle)
+
+    assert first == second == {"workflow_id": "transfer-k1", "status": "pending"}
+    assert len(calls) == 1
+    # 没有幂等键时每次都执行
+    await service.run("transfer", None, payload, handle)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_conflicting_and_concurrent_requests_are_rejected(service):
+    """测试幂等键用于不同请求、或第一个请求仍在执行时返回冲突"""
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def slow():
+        started.set()
+        await release.wait()
+        return {"ok": True}
+
+    first = asyncio.create_task(service.run("order", "k1", {"amount": 1}, slow))
+    await started.wait()
+    with pytest.raises(IdempotencyConflictError, match="being processed"):
+        await service.run("order", "k1", {"amount": 1}, slow)
+    release.set()
+    await first
+
+    with pytest.raises(IdempotencyConflictError, match="different request"):
+        await service.run("order", "k1", {"amount": 2}, slow)
+
+
+@pytest.mark.asyncio
+async def test_failed_requests_release_the_key(service):
+    """测试请求失败后释放幂等键，客户端可以用同一个幂等键重试"""
+    async def fail():
+        raise RuntimeError("temporal unavailable")
+
+    async def succeed():
+        return {"ok": True}
+
+    with pytest.raises(RuntimeError):
+        await service.run("transfer", "k1", {"amount": 1}, fail)
+    assert await service.run("transfer", "k1", {"amount": 1}, succeed) == {"ok": True}
+
+
+async def count_accounts(db):
+    async with db.session() as session:
+        return (await session.execute(select(func.count()).select_from(Account))).scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_committed_requests_replay_from_database(db):
+    """测试幂等键与写操作在同一事务中提交，Redis 记录丢失或缓存响应失败时仍从数据库返回响应"""
+    redis_client = FakeRedis()
+    service = IdempotencyService(redis_client, db=db)
+
+    async def create_account():
+        async with db.transaction() as session:
+            account = Account(user_id=uuid.uuid4())
+            session.add(account)
+        return {"account_id": account.id}
+
+    # 提交后缓存响应失败：请求成功，幂等键不被释放
+    with patch.object(service, "complete", AsyncMock(side_effect=ConnectionError("redis unavailable"))):
+        first = await service.run_in_transaction("order", "k1", {"amount": 1}, create_account)
+    assert "idempotency:order:k1" in redis_client.data
+
+    # 占用已经过期(如进程退出)，重复的请求从数据库返回第一次的响应
+    redis_client.data.clear()
+    second = await service.run_in_transaction("order", "k1", {"amount": 1}, create_account)
+
+    assert second == {"account_id": str(first["account_id"])}
+    assert await count_accounts(db) == 1
+    with pytest.raises(IdempotencyConflictError, match="different request"):
+        redis_client.data.clear()
+        await service.run_in_transaction("order", "k1", {"amount": 2}, create_account)
+
+
+@pytest.mark.asyncio
+async def test_failed_transactions_roll_back_the_key(db):
+    """测试事务失败时幂等键随写操作一起回滚并释放，重试会重新执行"""
+    service = IdempotencyService(FakeRedis(), db=db)
+
+    async def create_then_fail():
+        async with db.transaction() as session:
+            session.add(Account(user_id=uuid.uuid4()))
+            await session.flush()
+            raise RuntimeError("order rejected")
+
+    async def create_account():
+        async with db.transaction() as session:
+            session.add(Account(user_id=uuid.uuid4()))
+        return {"ok": True}
+
+    with pytest.raises(RuntimeError):
+        await service.run_in_transaction("order", "k1", {"amount": 1}, create_then_fail)
+    assert await count_accounts(db) == 0
+    assert await service.run_in_transaction("order", "k1", {"amount": 1}, create_account) == {"ok": True}
+    assert await count_accounts(db) == 1
+
+
+@pytest.mark.asyncio
+async def test_key_is_extended_while_the_request_runs():
+    """测试请求执行期间定期续期幂等键的占用"""
+    redis_client = FakeRedis()
+    extended = []
+
+    async def expire(key, seconds):
+        extended.append((key, seconds))
+        return True
+
+    redis_client.expire = expire
+    service = IdempotencyService(redis_client, lock_ttl=0.03)
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    await service.run("transfer", "k1", {"amount": 1}, slow)
+    assert extended and extended[0] == ("idempotency:transfer:k1", 0.03)
@@ -0,0 +1,102 @@
+import asyncio
+import uuid
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+
+from app.core.exceptions import AccountNotFoundError, InsufficientFundsError, ValidationError
+from app.models import Account
+from app.repositories.ledger import LedgerRepository
+from app.services.ledger import LedgerService
+from app.services.transaction import TransactionService, TransferItem
+
+
+@pytest_asyncio.fixture
+async def accounts(db):
+    async with db.transaction() as session:
+        created = [Account(user_id=uuid.uuid4()), Account(user_id=uuid.uuid4())]
+        session.add_all(created)
+    return [str(account.id) for account in created]
+
+
+@pytest.fixture
+def service(db):
+    return LedgerService(db, LedgerRepository(db.get_session))
+
+
+@pytest.mark.asyncio
+async def test_balance_is_sum_of_entries(service, accounts):
+    """测试存取款与转账只追加流水，余额为流水之和"""
+    a, b = accounts
+    await asyncio.gather(*[service.deposit(a, 100.0) for _ in range(5)])
+    assert await service.withdraw(a, 150.0) == 350.0
+    await service.transfer(a, b, 50.0)
+
+    with pytest.raises(InsufficientFundsError):
+        await service.withdraw(b, 51.0)
+    with pytest.raises(AccountNotFoundError):
+        await service.deposit(str(uuid.uuid4()), 1.0)
+
+    assert await service.get_balance(a) == 300.0
+    assert await service.get_balance(b) == 50.0
+
+
+@pytest.mark.asyncio
+async def test_snapshots_only_cover_settled_entries(service, accounts):
+    """测试快照只汇总已稳定的流水，快照之后的流水在计算余额时继续累加"""
+    a, b = accounts
+    await service.deposit(a, 100.0)
+    await service.transfer(a, b, 30.0)
+
+    # 刚写入的流水尚未稳定
+    assert await service.take_snapshots(settle_seconds=60) == 0
+    assert await service.take_snapshots(settle_seconds=0) == 2
+
+    await service.deposit(a, 5.0)
+    assert await service.take_snapshots([a], settle_seconds=0) == 1
+    assert await service.take_snapshots([a], settle_seconds=0) == 0
+    await service.withdraw(a, 25.0)
+
+    async with service.db.session():
+        snapshots = await service.ledger_repository.get_snapshots([a, b])
+    assert (snapshots[a][0], snapshots[b][0]) == (75.0, 30.0)
+    assert await service.get_balance(a) == 50.0
+    assert await service.get_balance(b) == 30.0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("operation", ["deposit", "withdraw", "transfer"])
+@pytest.mark.parametrize("amount", [0.0, -100.0])
+async def test_non_positive_amounts_are_rejected(service, accounts, operation, amount):
+    """测试金额必须为正数，负数入账不能绕过余额检查，负数出账不能变成入账"""
+    a, b = accounts
+    args = (a, b, amount) if operation == "transfer" else (a, amount)
+    with pytest.raises(ValidationError):
+        await getattr(service, operation)(*args)
+    assert await service.get_balance(a) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_transaction_service_writes_ledger_entries(db, service, accounts):
+    """测试开启流水后存取款、转账与批量转账只追加流水，不修改 accounts.balance"""
+    a, b = accounts
+    transactions = TransactionService(db, ledger_service=service, use_ledger=True)
+
+    await transactions.deposit(a, 100.0)
+    await transactions.withdraw(a, 20.0)
+    await transactions.transfer(a, b, 30.0)
+    results = await transactions.batch_transfer([
+        TransferItem(a, b, 25.0),
+        TransferItem(b, a, 100.0),
+        TransferItem(b, a, 5.0),
+    ], batch_key="batch-1")
+    with pytest.raises(InsufficientFundsError):
+        await transactions.withdraw(b, 100.0)
+
+    assert [result.status for result in results] == ["completed", "failed", "completed"]
+    assert results[1].error == "insufficientfunds"
+    assert await transactions.get_balance(a) == 30.0
+    assert await transactions.get_balance(b) == 50.0
+    async with db.session() as session:
+        assert {account.balance for account in await session.scalars(select(Account))} == {0.0}
@@ -0,0 +1,95 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from langchain_core.documents import Document
+
+from app.services.doc_store.base import DocumentStore
+from app.services.retriever import MultiVectorRetriever
+from app.services.vector_store.base import SearchResult, VectorStoreService
+
+
+def make_child(parent_id, score):
+    doc = Document(page_content=f"child of {parent_id}", metadata={"doc_id": parent_id})
+    return SearchResult(document=doc, score=score, metadata=doc.metadata)
+
+
+def make_vector_store(results, score_is_distance=False):
+    store = MagicMock(spec=VectorStoreService)
+    store.SCORE_IS_DISTANCE = score_is_distance
+    store.is_better_score = lambda score, other: (
+        score < other if score_is_distance else score > other
+    )
+    store.aretrieve = AsyncMock(return_value=results)
+    return store
+
+
+@pytest.fixture
+def doc_store():
+    parents = {
+        "p1": Document(page_content="parent 1", metadata={"source": "a"}),
+        "p2": Document(page_content="parent 2", metadata={"source": "b"}),
+    }
+    store = MagicMock(spec=DocumentStore)
+    store.amget = AsyncMock(side_effect=lambda keys: [parents.get(key) for key in keys])
+    return store
+
+
+@pytest.mark.asyncio
+async def test_dedupes_parents_and_fetches_once(doc_store):
+    """测试父文档去重并只批量读取一次"""
+    vector_store = make_vector_store([
+        make_child("p1", 0.5),
+        make_child("p2", 0.7),
+        make_child("p1", 0.9),
+    ])
+    retriever = MultiVectorRetriever(vector_stores=[vector_store], doc_store=doc_store)
+
+    results = await retriever.aretrieve("query")
+
+    doc_store.amget.assert_awaited_once_with(["p1", "p2"])
+    assert [r.document.page_content for r in results] == ["parent 1", "parent 2"]
+    assert [r.score for r in results] == [0.9, 0.7]
+
+
+@pytest.mark.asyncio
+async def test_distance_scores_keep_smallest(doc_store):
+    """测试距离得分时保留最小值并按升序排序"""
+    vector_store = make_vector_store([
+        make_child("p2", 0.2),
+        make_child("p1", 0.4),
+        make_child("p1", 0.1),
+    ], score_is_distance=True)
+    retriever = MultiVectorRetriever(vector_stores=[vector_store], doc_store=doc_store)
+
+    results = await retriever.aretrieve("query")
+
+    assert [r.score for r in results] == [0.1, 0.2]
+    assert results[0].document.page_content == "parent 1"
+
+
+@pytest.mark.asyncio
+async def test_missing_parents_are_skipped(doc_store):
+    """测试文档存储中不存在的父文档被忽略"""
+    vector_store = make_vector_store([
+        make_child("p1", 0.5),
+        make_child("missing", 0.8),
+    ])
+    retriever = MultiVectorRetriever(vector_stores=[vector_store], doc_store=doc_store)
+
+    results = await retriever.aretrieve("query")
+
+    assert [r.document.page_content for r in results] == ["parent 1"]
+
+
+@pytest.mark.asyncio
+async def test_multiple_vector_stores_fetch_only_new_ids(doc_store):
+    """测试多个向量存储时只读取新出现的父文档"""
+    first = make_vector_store([make_child("p1", 0.5)])
+    second = make_vector_store([make_child("p1", 0.6), make_child("p2", 0.4)])
+    retriever = MultiVectorRetriever(vector_stores=[first, second], doc_store=doc_store)
+
+    results = await retriever.aretrieve("query")
+
+    fetched = [call.args[0] for call in doc_store.amget.await_args_list]
+    assert sorted(key for keys in fetched for key in keys) == ["p1", "p2"]
+    assert {r.document.page_content for r in results} == {"parent 1", "parent 2"}
@@ -0,0 +1,79 @@
+import pytest
+from langchain_core.documents import Document
+
+from app.services.document_transformer import (
+    create_transformer,
+    fuse_transformers,
+    NormalizeTransformer,
+)
+
+
+async def run(transformer, texts):
+    documents = [Document(page_content=text) for text in texts]
+    return [doc.page_content async for doc in transformer.transform(documents)]
+
+
+@pytest.mark.asyncio
+async def test_normalize_rules():
+    """测试 unicode 规范化、控制字符、空白折叠与页眉页脚删除"""
+    transformer = NormalizeTransformer(
+        strip_patterns=[r"ACME Corp\. Confidential", r"Page \d+ of \d+"],
+        lowercase=True,
+        prefix="passage: ",
+    )
+    text = (
+        "ACME Corp. Confidential\n"
+        "﻿Ｆｕｌｌ​width\ttext  with spaces \n"
+        "next line\r\n\n\n\n"
+        "Page 3 of 10\n"
+        "second\x07 paragraph   \n"
+    )
+
+    assert await run(transformer, [text]) == [
+        "passage: fullwidth text with spaces\nnext line\n\nsecond paragraph"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_fused_chain_matches_sequential_transformers():
+    """测试融合后的结果与依次执行各转换器一致"""
+    transforms = [
+        create_transformer("clean"),
+        create_transformer("lowercase"),
+        create_transformer("prefix", prefix="Q: "),
+    ]
+    texts = ["  Hello\tWorld\n\nFoo  ", "\tA\n\n\n\nB "]
+
+    expected = texts
+    for transformer in transforms:
+        expected = await run(transformer, expected)
+
+    fused = fuse_transformers(transforms)
+
+    assert len(fused) == 1
+    assert isinstance(fused[0], NormalizeTransformer)
+    assert await run(fused[0], texts) == expected
+
+
+def test_fuse_keeps_non_fusable_transformers():
+    """测试不可融合的转换器保持原位，单个可融合转换器不被替换"""
+    clean = create_transformer("clean")
+    dedup = create_transformer("dedup")
+    lower = create_transformer("lowercase")
+    prefix = create_transformer("prefix", prefix="x")
+
+    fused = fuse_transformers([clean, dedup, lower, prefix])
+
+    assert fused[0] is clean
+    assert fused[1] is dedup
+    assert isinstance(fused[2], NormalizeTransformer)
+
+
+@pytest.mark.asyncio
+async def test_normalize_in_process_pool():
+    """测试进程池并行处理的结果与当前进程一致"""
+    texts = [f"Doc  {i}\t\tBody\n\n\n" for i in range(10)]
+    local = NormalizeTransformer(lowercase=True)
+    parallel = NormalizeTransformer(lowercase=True, max_workers=1, batch_size=4, parallel_threshold=0)
+
+    assert await run(parallel, texts) == await run(local, texts)
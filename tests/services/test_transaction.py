@@ -1,5 +1,10 @@
+import asyncio
+import uuid
+
 import pytest
+import pytest_asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 
@@ -11,7 +16,7 @@ from app.core.exceptions import (
     AccountLockedError,
 )
 from app.models import Account
-from app.services.transaction import TransactionService
+from app.services.transaction import TransactionService, TransferItem
 
 
 class AsyncContextManagerMock:
@@ -97,124 +102,157 @@ async def test_get_account_by_id_database_error(service, mock_session):
         await service.get_account_by_id(1)
 
 
+@pytest_asyncio.fixture
+async def accounts(db):
+    """创建余额分别为 1000、500 的两个账户"""
+    async with db.transaction() as session:
+        created = [Account(user_id=uuid.uuid4(), balance=1000.0), Account(user_id=uuid.uuid4(), balance=500.0)]
+        session.add_all(created)
+    return [account.id for account in created]
+
+
+async def get_balance(db, account_id):
+    async with db.session() as session:
+        return (await session.get(Account, str(account_id), populate_existing=True)).balance
+
+
 @pytest.mark.asyncio
-async def test_withdraw_success(service, mock_session, mock_account):
-    """测试成功取款"""
-    # 设置 mock
-    mock_result = MagicMock()
-    mock_result.scalar_one_or_none.return_value = mock_account
-    mock_session.execute.return_value = mock_result
+@pytest.mark.parametrize("returning", [True, False])
+async def test_withdraw_is_a_single_update(db, accounts, returning):
+    """测试取款只执行一条 UPDATE，不支持 RETURNING 时再读取一次账户"""
+    statements = []
 
-    # 执行测试
-    account = await service.withdraw(1, 500.0)
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split()[0].upper())
+
+    event.listen(db.engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    with patch.object(db.engine.dialect, "update_returning", returning):
+        account = await TransactionService(db).withdraw(accounts[0], 500.0)
 
-    # 验证结果
     assert account.balance == 500.0
-    mock_session.flush.assert_called_once()
-    mock_session.refresh.assert_called_once_with(mock_account)
+    assert [s for s in statements if s in ("UPDATE", "SELECT")] == (["UPDATE"] if returning else ["UPDATE", "SELECT"])
+    assert await get_balance(db, accounts[0]) == 500.0
 
 
 @pytest.mark.asyncio
-async def test_withdraw_insufficient_funds(service, mock_session, mock_account):
-    """测试余额不足"""
-    # 设置 mock
-    mock_result = MagicMock()
-    mock_result.scalar_one_or_none.return_value = mock_account
-    mock_session.execute.return_value = mock_result
-
-    # 执行测试并验证异常
+async def test_withdraw_insufficient_funds(db, accounts):
+    """测试余额不足时不扣款"""
     with pytest.raises(InsufficientFundsError):
-        await service.withdraw(1, 2000.0)
+        await TransactionService(db).withdraw(accounts[0], 2000.0)
+    assert await get_balance(db, accounts[0]) == 1000.0
 
 
 @pytest.mark.asyncio
-async def test_deposit_success(service, mock_session, mock_account):
-    """测试成功存款"""
-    # 设置 mock
-    mock_result = MagicMock()
-    mock_result.scalar_one_or_none.return_value = mock_account
-    mock_session.execute.return_value = mock_result
+async def test_withdraw_account_not_found(db, accounts):
+    """测试账户不存在"""
+    with pytest.raises(AccountNotFoundError):
+        await TransactionService(db).withdraw(uuid.uuid4(), 1.0)
 
-    # 执行测试
-    account = await service.deposit(1, 500.0)
 
-    # 验证结果
-    assert account.balance == 1500.0
-    mock_session.flush.assert_called_once()
-    mock_session.refresh.assert_called_once_with(mock_account)
+@pytest.mark.asyncio
+async def test_deposit_success(db, accounts):
+    """测试成功存款"""
+    account = await TransactionService(db).deposit(accounts[1], 500.0)
+    assert account.balance == 1000.0
 
 
 @pytest.mark.asyncio
-async def test_deposit_account_locked(service, mock_session, mock_account):
+async def test_deposit_account_locked(db, accounts):
     """测试账户锁定场景"""
-    # 设置 mock
-    mock_result = MagicMock()
-    mock_result.scalar_one_or_none.return_value = mock_account
-    mock_session.execute.return_value = mock_result
-
-    # 执行测试并验证异常
     with pytest.raises(AccountLockedError):
-        await service.deposit(1, 10.0)  # 特殊金额 10 会触发账户锁定
+        await TransactionService(db).deposit(accounts[1], 10.0)  # 特殊金额 10 会触发账户锁定
 
 
 @pytest.mark.asyncio
-async def test_transfer_success(service, mock_session):
-    """测试成功转账"""
-    # 设置 mock accounts
-    from_account = Account(id=1, user_id=1, balance=1000.0)
-    to_account = Account(id=2, user_id=2, balance=500.0)
+async def test_concurrent_withdrawals_do_not_lose_updates(db, accounts):
+    """测试并发取款在数据库中计算余额，不会丢失更新，也不会透支"""
+    service = TransactionService(db)
+    results = await asyncio.gather(
+        *[service.withdraw(accounts[0], 300.0) for _ in range(4)],
+        return_exceptions=True,
+    )
 
-    mock_result_from = MagicMock()
-    mock_result_from.scalar_one_or_none.return_value = from_account
-    mock_result_to = MagicMock()
-    mock_result_to.scalar_one_or_none.return_value = to_account
+    assert sum(isinstance(result, InsufficientFundsError) for result in results) == 1
+    assert await get_balance(db, accounts[0]) == 100.0
 
-    mock_session.execute.side_effect = [mock_result_from, mock_result_to]
 
-    # 执行测试
-    result = await service.transfer(1, 2, 300.0)
+@pytest.mark.asyncio
+async def test_transfer_success(db, accounts):
+    """测试成功转账"""
+    result = await TransactionService(db).transfer(accounts[0], accounts[1], 300.0)
 
-    # 验证结果
-    assert from_account.balance == 700.0
-    assert to_account.balance == 800.0
     assert result["status"] == "success"
     assert result["amount"] == 300.0
-    assert mock_session.flush.call_count == 2
+    assert await get_balance(db, accounts[0]) == 700.0
+    assert await get_balance(db, accounts[1]) == 800.0
 
 
 @pytest.mark.asyncio
-async def test_transfer_insufficient_funds(service, mock_session):
-    """测试转账余额不足"""
-    # 设置 mock accounts
-    from_account = Account(id=1, user_id=1, balance=100.0)
-    to_account = Account(id=2, user_id=2, balance=500.0)
+@pytest.mark.parametrize("amount, error", [(2000.0, InsufficientFundsError), (10.0, AccountLockedError)])
+async def test_transfer_failure_rolls_back(db, accounts, amount, error):
+    """测试转账失败时两个账户的余额都不变"""
+    with pytest.raises(error):
+        await TransactionService(db).transfer(accounts[1], accounts[0], amount)
 
-    mock_result_from = MagicMock()
-    mock_result_from.scalar_one_or_none.return_value = from_account
-    mock_result_to = MagicMock()
-    mock_result_to.scalar_one_or_none.return_value = to_account
+    assert await get_balance(db, accounts[0]) == 1000.0
+    assert await get_balance(db, accounts[1]) == 500.0
 
-    mock_session.execute.side_effect = [mock_result_from, mock_result_to]
 
-    # 执行测试并验证异常
-    with pytest.raises(InsufficientFundsError):
-        await service.transfer(1, 2, 200.0)
+@pytest.mark.asyncio
+async def test_batch_transfer_nets_updates_per_account(db, accounts):
+    """测试批量转账逐笔检查余额、失败的转账不影响其他转账，成功的转账轧差后一次写入"""
+    a, b = (str(account_id) for account_id in accounts)
+    transfers = [
+        TransferItem(a, b, 300.0),
+        TransferItem(b, a, 100.0),
+        TransferItem(a, b, 900.0),  # 余额只剩 800
+        TransferItem(a, str(uuid.uuid4()), 1.0),
+        TransferItem(b, a, 700.0),
+    ]
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split()[0].upper())
+
+    event.listen(db.engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    results = await TransactionService(db).batch_transfer(transfers)
+
+    assert [result.status for result in results] == ["completed", "completed", "failed", "failed", "completed"]
+    assert [result.error for result in results if result.error] == ["insufficientfunds", "accountnotfound"]
+    assert [s for s in statements if s in ("SELECT", "UPDATE")] == ["SELECT", "UPDATE"]
+    assert await get_balance(db, accounts[0]) == 1500.0
+    assert await get_balance(db, accounts[1]) == 0.0
 
 
 @pytest.mark.asyncio
-async def test_transfer_account_locked(service, mock_session):
-    """测试转账时账户锁定"""
-    # 设置 mock accounts
-    from_account = Account(id=1, user_id=1, balance=1000.0)
-    to_account = Account(id=2, user_id=2, balance=500.0)
+async def test_batch_transfer_is_applied_once_per_batch_key(db, accounts):
+    """测试同一批次重复执行(activity 在事务提交后被重试)时返回记录的结果，不会重复转账"""
+    a, b = (str(account_id) for account_id in accounts)
+    transfers = [TransferItem(a, b, 300.0), TransferItem(a, b, 900.0)]
+    service = TransactionService(db)
 
-    mock_result_from = MagicMock()
-    mock_result_from.scalar_one_or_none.return_value = from_account
-    mock_result_to = MagicMock()
-    mock_result_to.scalar_one_or_none.return_value = to_account
+    first = await service.batch_transfer(transfers, batch_key="wf-0")
+    second = await service.batch_transfer(transfers, batch_key="wf-0")
 
-    mock_session.execute.side_effect = [mock_result_from, mock_result_to]
+    assert second == first
+    assert [result.status for result in first] == ["completed", "failed"]
+    assert await get_balance(db, accounts[0]) == 700.0
+    assert await get_balance(db, accounts[1]) == 800.0
 
-    # 执行测试并验证异常
-    with pytest.raises(AccountLockedError):
-        await service.transfer(1, 2, 10.0)  # 特殊金额 10 会触发账户锁定
+    # 不同批次键的批次正常执行
+    await service.batch_transfer(transfers[:1], batch_key="wf-1")
+    assert await get_balance(db, accounts[0]) == 400.0
+
+
+@pytest.mark.asyncio
+async def test_concurrent_executions_of_a_batch_commit_once(db, accounts):
+    """测试同一批次并发执行时只有一个事务提交，另一个返回先提交的结果"""
+    a, b = (str(account_id) for account_id in accounts)
+    service = TransactionService(db)
+
+    results = await asyncio.gather(
+        *[service.batch_transfer([TransferItem(a, b, 100.0)], batch_key="wf-0") for _ in range(3)]
+    )
+
+    assert all(result == results[0] for result in results)
+    assert await get_balance(db, accounts[0]) == 900.0
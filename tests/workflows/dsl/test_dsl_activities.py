@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from langchain_core.documents import Document
+
+from app.workflows.dsl.activities import RetrieveActivity, SplitDocumentsActivity, VectorStoreActivity
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("with_manifest", [True, False])
+async def test_store_vectors_heartbeats_and_resumes_from_checkpoint(with_manifest):
+    """测试向量写入每批只以批序号上报心跳，重试时从上一次尝试的最后一批继续，已写入的向量ID从分块清单恢复"""
+    documents = [
+        Document(id=str(i), page_content=f"doc {i}", metadata={"resource_id": "r1"}) for i in range(5)
+    ]
+    vector_store = MagicMock()
+    vector_store.aadd_documents = AsyncMock(side_effect=lambda batch: [f"v{doc.id}" for doc in batch])
+    heartbeats = []
+    # 上一次尝试已经写入了第一批
+    info = SimpleNamespace(heartbeat_details=[1])
+    manifest = None
+    if with_manifest:
+        manifest = MagicMock()
+        manifest.get_vectors = AsyncMock(return_value={"dataset": ["v0", "v1"], "other": ["x"]})
+        manifest.record_vectors = AsyncMock()
+
+    activity_impl = VectorStoreActivity(
+        embedding_service=MagicMock(),
+        vector_store_settings=SimpleNamespace(PROVIDER="chroma", COLLECTION_NAME="dataset"),
+        chunk_manifest_service=manifest,
+        batch_size=2,
+    )
+    with patch("app.workflows.dsl.activities.create_vector_store", return_value=vector_store), \
+            patch("app.workflows.dsl.activities.activity.in_activity", return_value=True), \
+            patch("app.workflows.dsl.activities.activity.info", return_value=info), \
+            patch("app.workflows.dsl.activities.activity.heartbeat", side_effect=heartbeats.append):
+        vector_ids = await activity_impl.run(documents, "dataset")
+
+    assert vector_ids == (["v0", "v1"] if with_manifest else []) + ["v2", "v3", "v4"]
+    assert [len(call.args[0]) for call in vector_store.aadd_documents.await_args_list] == [2, 1]
+    assert heartbeats == [2, 3]
+    if with_manifest:
+        manifest.get_vectors.assert_awaited_once_with("r1", ["0", "1"])
+
+
+@pytest.mark.asyncio
+async def test_split_documents_sizes_chunks_by_tokenizer():
+    """测试分块 activity 按 tokenizer 计数切分，未定义的 DSL 变量(空字符串)按字符计数"""
+    documents = [Document(page_content="alpha beta gamma delta", metadata={"resource_id": "r1"})]
+    activity_impl = SplitDocumentsActivity()
+
+    # 以已注册的计数函数代替需要下载词表的 tiktoken
+    with patch.dict("app.services.document_splitter.fast._counters", {"words": lambda text: len(text.split())}):
+        by_tokens = await activity_impl.run(documents, 2, "fast", "words")
+    by_chars = await activity_impl.run(documents, 11, "fast", "")
+
+    assert [doc.page_content.split() for doc in by_tokens][::2] == [["alpha", "beta"], ["gamma", "delta"]]
+    assert all(len(doc.page_content) <= 11 for doc in by_chars)
+    assert len(by_chars) > 2
+
+
+@pytest.mark.asyncio
+async def test_multi_retrieval_searches_child_collections():
+    """测试多向量检索同时检索主集合与问题、摘要集合，未指定时按后缀推导子文档集合"""
+    searched = []
+
+    def create_vector_store(collection_name, **kwargs):
+        store = MagicMock()
+        store.aretrieve = AsyncMock(side_effect=lambda *args, **kw: searched.append(collection_name) or [])
+        return store
+
+    activity_impl = RetrieveActivity(
+        doc_store=MagicMock(),
+        embedding_service=MagicMock(),
+        vector_store_settings=SimpleNamespace(
+            PROVIDER="chroma", COLLECTION_NAME="vector", CHILD_COLLECTION_SUFFIXES=["_faq", "_summary"],
+        ),
+    )
+    with patch("app.workflows.dsl.activities.create_vector_store", side_effect=create_vector_store):
+        await activity_impl.run("query", "dataset", "multi")
+        await activity_impl.run("query", "dataset", "multi", ["dataset_questions"])
+
+    assert searched[:3] == ["dataset", "dataset_faq", "dataset_summary"]
+    assert searched[3:] == ["dataset", "dataset_questions"]
@@ -0,0 +1,321 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from app.schemas.dsl import DSLRequest, DSLWorkflowProgress
+from app.workflows.dsl.workflows import DEFAULT_START_TO_CLOSE_TIMEOUT, DSLInput, DSLWorkflow, ShardedDSLWorkflow, ShardInput
+
+
+def make_workflow(variables):
+    dsl_workflow = DSLWorkflow()
+    dsl_workflow.variables = dict(variables)
+    return dsl_workflow
+
+
+@pytest.mark.asyncio
+async def test_foreach_limits_concurrency_and_collects_in_order():
+    """测试 foreach 按批并发执行、不超过最大并发数，并按输入顺序收集结果"""
+    active = 0
+    max_active = 0
+
+    async def execute_activity(name, args, **kwargs):
+        nonlocal active, max_active
+        active += 1
+        max_active = max(max_active, active)
+        # 靠前的批次耗时更长，验证结果顺序与完成顺序无关
+        await asyncio.sleep(0.01 * (10 - args[0][0]))
+        active -= 1
+        return [value * 10 for value in args[0]]
+
+    request = DSLRequest(
+        variables={"numbers": list(range(10))},
+        root={"sequence": {"elements": [{
+            "foreach": {
+                "items": "numbers",
+                "item": "batch",
+                "batch_size": 3,
+                "max_concurrency": 2,
+                "collect": "scaled",
+                "result": "all_scaled",
+                "flatten": True,
+                "body": {"activity": {"name": "scale", "arguments": ["batch"], "result": "scaled"}},
+            }
+        }]}},
+    )
+    dsl_workflow = make_workflow(request.variables)
+
+    with patch("app.workflows.dsl.workflows.workflow.execute_activity", execute_activity):
+        await dsl_workflow.execute_statement(request.to_dsl_input().root)
+
+    assert dsl_workflow.variables["all_scaled"] == [value * 10 for value in range(10)]
+    assert max_active == 2
+    # 迭代内的变量不泄漏到外层
+    assert "batch" not in dsl_workflow.variables
+    assert "scaled" not in dsl_workflow.variables
+
+
+@pytest.mark.asyncio
+async def test_parallel_failure_cancels_sibling_branches():
+    """测试并行分支失败时取消其余分支并抛出异常"""
+    cancelled = []
+
+    async def execute_activity(name, args, **kwargs):
+        if name == "fail":
+            raise RuntimeError("boom")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(name)
+            raise
+
+    request = DSLRequest(
+        root={"sequence": {"elements": [{
+            "parallel": {"branches": [
+                {"sequence": {"elements": [{"activity": {"name": "slow", "arguments": [], "result": ""}}]}},
+                {"sequence": {"elements": [{"activity": {"name": "fail", "arguments": [], "result": ""}}]}},
+            ]}
+        }]}},
+    )
+    dsl_workflow = make_workflow({})
+
+    with patch("app.workflows.dsl.workflows.workflow.execute_activity", execute_activity):
+        with pytest.raises(RuntimeError, match="boom"):
+            await asyncio.wait_for(dsl_workflow.execute_statement(request.to_dsl_input().root), timeout=5)
+
+    assert cancelled == ["slow"]
+
+
+class ContinueAsNew(Exception):
+    def __init__(self, input):
+        self.input = input
+
+
+@pytest.mark.asyncio
+async def test_sharded_workflow_runs_child_per_shard_and_continues_as_new():
+    """测试分片协调工作流为每个分片范围启动子工作流，只汇总数量，并在超过单次分片上限后 continue-as-new"""
+    started = []
+
+    async def execute_child_workflow(run, input, id, **kwargs):
+        started.append((id, input.variables["chunk"], input.outputs, input.count_outputs))
+        return {"counts": input.variables["chunk"]["limit"]}
+
+    def continue_as_new(input):
+        raise ContinueAsNew(input)
+
+    request = DSLRequest(
+        variables={"total": 7, "resource_id": "r", "collection_name": "dataset"},
+        root={"sequence": {"elements": [{
+            "shard": {
+                "total": "total",
+                "item": "chunk",
+                "shard_size": 2,
+                "max_shards_per_run": 3,
+                "variables": ["resource_id", "collection_name"],
+                "collect": "counts",
+                "result": "count",
+                "body": {"activity": {"name": "load_document", "arguments": ["resource_id", "chunk"], "result": "counts"}},
+            }
+        }]}},
+    )
+    shard = request.to_dsl_input().root.sequence.elements[0].shard
+    shard_input = ShardInput(shard=shard, total=7, variables={"resource_id": "r", "collection_name": "dataset"})
+
+    with patch("app.workflows.dsl.workflows.workflow.execute_child_workflow", execute_child_workflow), \
+            patch("app.workflows.dsl.workflows.workflow.continue_as_new", continue_as_new), \
+            patch("app.workflows.dsl.workflows.workflow.info", lambda: SimpleNamespace(workflow_id="ingest")), \
+            patch("app.workflows.dsl.workflows.workflow.logger"):
+        with pytest.raises(ContinueAsNew) as exc_info:
+            await ShardedDSLWorkflow().run(shard_input)
+        next_input = exc_info.value.input
+        collected = await ShardedDSLWorkflow().run(next_input)
+
+    assert [item[0] for item in started] == [f"ingest-{i}" for i in range(4)]
+    assert started[0][1:] == ({"offset": 0, "limit": 2}, ["counts"], True)
+    assert started[3][1] == {"offset": 6, "limit": 1}
+    # continue-as-new 只携带下一个分片的序号与已汇总的数量
+    assert (next_input.offset, next_input.collected) == (3, 6)
+    assert collected == 7
+
+
+@pytest.mark.asyncio
+async def test_shard_child_returns_only_counts():
+    """测试分片子工作流只返回输出变量的数量，而不是变量本身"""
+    async def execute_activity(name, args, **kwargs):
+        return [f"vector-{i}" for i in range(args[0]["limit"])]
+
+    request = DSLRequest(root={"sequence": {"elements": [
+        {"activity": {"name": "store_vectors", "arguments": ["chunk"], "result": "vectors"}},
+    ]}})
+    dsl_input = request.to_dsl_input()
+    dsl_input = DSLInput(
+        root=dsl_input.root,
+        variables={"chunk": {"offset": 0, "limit": 3}},
+        outputs=["vectors"],
+        count_outputs=True,
+    )
+
+    with patch("app.workflows.dsl.workflows.workflow.execute_activity", execute_activity), \
+            patch("app.workflows.dsl.workflows.workflow.now", lambda: datetime.now(timezone.utc)), \
+            patch("app.workflows.dsl.workflows.workflow.logger"):
+        assert await DSLWorkflow().run(dsl_input) == {"vectors": 3}
+
+
+def test_activity_options_are_converted_to_execute_options():
+    """测试 activity 的超时、心跳与重试设置转换为 execute_activity 参数，未设置时保持默认超时"""
+    request = DSLRequest(root={"sequence": {"elements": [
+        {"activity": {
+            "name": "store_vectors",
+            "arguments": ["splits"],
+            "result": "vectors",
+            "start_to_close_timeout": 600,
+            "heartbeat_timeout": 60,
+            "retry": {"initial_interval": 5, "maximum_attempts": 3},
+        }},
+        {"activity": {"name": "load_document", "arguments": ["resource_id"], "result": "documents"}},
+    ]}})
+    configured, default = request.to_dsl_input().root.sequence.elements
+
+    options = configured.activity.execute_options()
+    assert options["start_to_close_timeout"] == timedelta(minutes=10)
+    assert options["heartbeat_timeout"] == timedelta(seconds=60)
+    assert options["retry_policy"].maximum_attempts == 3
+    assert options["retry_policy"].initial_interval == timedelta(seconds=5)
+
+    options = default.activity.execute_options()
+    assert options["start_to_close_timeout"] == DEFAULT_START_TO_CLOSE_TIMEOUT
+    assert options["heartbeat_timeout"] is None
+    assert options["retry_policy"] is None
+
+
+@pytest.mark.asyncio
+async def test_activities_are_routed_to_task_queue_of_their_kind():
+    """测试 activity 按类型路由到配置的任务队列，DSL 中可以覆盖类型或直接指定队列"""
+    queues = {}
+
+    async def execute_activity(name, args, task_queue=None, **kwargs):
+        queues[name] = task_queue
+
+    request = DSLRequest(root={"sequence": {"elements": [
+        {"activity": {"name": "transform_documents", "arguments": [], "result": ""}},
+        {"activity": {"name": "store_vectors", "arguments": [], "result": ""}},
+        {"activity": {"name": "split_documents", "arguments": [], "result": "", "task_queue": "llm"}},
+        {"activity": {"name": "store_documents", "arguments": [], "result": "", "task_queue": "custom-queue"}},
+        {"activity": {"name": "load_document", "arguments": [], "result": ""}},
+    ]}})
+    dsl_input = request.to_dsl_input(task_queues={"llm": "dsl-llm", "embed": "dsl-embed"})
+    dsl_workflow = DSLWorkflow()
+    dsl_workflow.task_queues = dsl_input.task_queues
+
+    with patch("app.workflows.dsl.workflows.workflow.execute_activity", execute_activity):
+        await dsl_workflow.execute_statement(dsl_input.root)
+
+    assert queues == {
+        "transform_documents": "dsl-llm",
+        "store_vectors": "dsl-embed",
+        "split_documents": "dsl-llm",
+        "store_documents": "custom-queue",
+        # 未配置队列的类型在工作流所在的队列上执行
+        "load_document": None,
+    }
+
+
+@pytest.mark.asyncio
+async def test_transforms_are_routed_by_transformer_type():
+    """测试只有调用 LLM 的转换路由到 llm 队列，DSL 中指定的 task_queue 优先"""
+    queues = []
+
+    async def execute_activity(name, args, task_queue=None, **kwargs):
+        queues.append((args[1], task_queue))
+
+    request = DSLRequest(
+        variables={"clean": "clean", "summary": "summary"},
+        root={"sequence": {"elements": [
+            {"activity": {"name": "transform_documents", "arguments": ["documents", "clean"], "result": ""}},
+            {"activity": {"name": "transform_documents", "arguments": ["documents", "summary"], "result": ""}},
+            {"activity": {
+                "name": "transform_documents", "arguments": ["documents", "clean"], "result": "", "task_queue": "llm",
+            }},
+        ]}},
+    )
+    dsl_input = request.to_dsl_input(task_queues={"parse": "dsl-parse", "llm": "dsl-llm"})
+    dsl_workflow = DSLWorkflow()
+    dsl_workflow.variables = dict(dsl_input.variables)
+    dsl_workflow.task_queues = dsl_input.task_queues
+
+    with patch("app.workflows.dsl.workflows.workflow.execute_activity", execute_activity):
+        await dsl_workflow.execute_statement(dsl_input.root)
+
+    assert queues == [("clean", "dsl-parse"), ("summary", "dsl-llm"), ("clean", "dsl-llm")]
+
+
+@pytest.mark.asyncio
+async def test_progress_tracks_running_stage_items_and_eta():
+    """测试进度查询返回正在执行的阶段、已处理的分块数，并据此估算剩余时间"""
+    snapshots = []
+    started_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    async def execute_activity(name, args, **kwargs):
+        progress = dsl_workflow.progress()
+        snapshots.append((list(progress.running), progress.completed_activities, progress.total_activities))
+        return args[0] if args else []
+
+    request = DSLRequest(
+        variables={"splits": list(range(6))},
+        root={"sequence": {"elements": [
+            {"activity": {"name": "diff_chunks", "arguments": ["splits"], "result": "added"}},
+            {"foreach": {
+                "items": "added",
+                "item": "batch",
+                "batch_size": 2,
+                "max_concurrency": 1,
+                "body": {"activity": {"name": "store_vectors", "arguments": ["batch"], "result": "ids"}},
+            }},
+        ]}},
+    )
+    dsl_workflow = DSLWorkflow()
+
+    with patch("app.workflows.dsl.workflows.workflow.execute_activity", execute_activity), \
+            patch("app.workflows.dsl.workflows.workflow.now", lambda: started_at), \
+            patch("app.workflows.dsl.workflows.workflow.logger"):
+        await dsl_workflow.run(request.to_dsl_input())
+
+    # foreach 展开为 3 次迭代后预计的 activity 总数由 2 更新为 4
+    assert snapshots == [
+        (["diff_chunks"], 0, 2),
+        (["store_vectors"], 1, 4),
+        (["store_vectors"], 2, 4),
+        (["store_vectors"], 3, 4),
+    ]
+    progress = dsl_workflow.progress()
+    assert (progress.processed_items, progress.total_items) == (6, 6)
+
+    progress.completed_activities = 1
+    response = DSLWorkflowProgress.from_progress("wf", "RUNNING", progress, started_at + timedelta(seconds=30))
+    assert response.elapsed_seconds == 30
+    assert response.eta_seconds == 90
+
+
+@pytest.mark.asyncio
+async def test_progress_stream_ends_with_error_event_when_query_fails():
+    """测试 SSE 查询进度失败时推送 error 事件并结束推送"""
+    from temporalio.client import WorkflowExecutionStatus, WorkflowQueryFailedError
+
+    from app.routers.dsl import stream_dsl_workflow_progress
+
+    class Handle:
+        id = "wf-1"
+
+        async def describe(self):
+            return SimpleNamespace(status=WorkflowExecutionStatus.RUNNING, close_time=None)
+
+        async def query(self, query):
+            raise WorkflowQueryFailedError("worker unavailable")
+
+    client = SimpleNamespace(get_workflow_handle=lambda workflow_id: Handle())
+    response = await stream_dsl_workflow_progress("wf-1", interval=0.01, client=client)
+    events = [event async for event in response.body_iterator]
+
+    assert events == ['event: error\ndata: {"detail": "worker unavailable"}\n\n']
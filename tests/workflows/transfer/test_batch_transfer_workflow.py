@@ -0,0 +1,32 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from app.services.transaction import TransferItem, TransferResult
+from app.workflows.transfer.workflows import BatchTransferInput, BatchTransferWorkflow
+
+
+@pytest.mark.asyncio
+async def test_batch_transfer_runs_one_activity_per_batch():
+    """测试批量转账按批次顺序执行 activity，并汇总每笔转账的结果"""
+    batches = []
+
+    async def execute_activity(activity, args, **kwargs):
+        batch_key, transfers = args
+        batches.append((batch_key, transfers))
+        return [
+            TransferResult(item.from_account, item.to_account, item.amount,
+                           status="failed" if item.amount > 100 else "completed")
+            for item in transfers
+        ]
+
+    transfers = [TransferItem("a", "b", float(amount)) for amount in range(1, 251)]
+    with patch("app.workflows.transfer.workflows.workflow.execute_activity", execute_activity), \
+            patch("app.workflows.transfer.workflows.workflow.logger"), \
+            patch("app.workflows.transfer.workflows.workflow.info", return_value=SimpleNamespace(workflow_id="wf")):
+        output = await BatchTransferWorkflow().run(BatchTransferInput(transfers=transfers, batch_size=100))
+
+    assert [(key, len(batch)) for key, batch in batches] == [("wf-0", 100), ("wf-1", 100), ("wf-2", 50)]
+    assert [result.amount for result in output.results] == [item.amount for item in transfers]
+    assert (output.total, output.completed, output.failed) == (250, 100, 150)
@@ -0,0 +1,61 @@
+import inspect
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.routers.transform import batch_transfer, transfer
+from app.schemas.transfer import BatchTransferRequest, TransferRequest
+from app.workflows.transfer.workflows import BatchTransferInput, BatchTransferWorkflow, TransferWorkflow
+
+
+class FakeClient:
+    def __init__(self):
+        self.started = []
+
+    async def start_workflow(self, workflow, *args, **kwargs):
+        self.started.append((workflow, args, kwargs))
+
+
+class FakeIdempotencyService:
+    async def run(self, scope, key, payload, func):
+        return await func()
+
+
+SETTINGS = SimpleNamespace(TRANSFER_QUEUE="transfer", TRANSFER_BATCH_SIZE=100)
+
+
+def workflow_args(client):
+    """工作流收到的参数，按工作流 run 方法的签名绑定"""
+    [(workflow, args, kwargs)] = client.started
+    assert args == ()
+    inspect.signature(workflow).bind(None, *kwargs["args"])
+    return kwargs["args"]
+
+
+@pytest.mark.asyncio
+async def test_transfer_passes_each_argument_to_the_workflow():
+    """测试转账以多个参数启动工作流，与 TransferWorkflow.run 的签名一致"""
+    client = FakeClient()
+    request = TransferRequest(from_account=uuid.uuid4(), to_account=uuid.uuid4(), amount=10)
+
+    await transfer(request, None, client=client, settings=SETTINGS, idempotency_service=FakeIdempotencyService())
+
+    assert client.started[0][0] == TransferWorkflow.run
+    assert workflow_args(client) == [request.from_account, request.to_account, 10]
+
+
+@pytest.mark.asyncio
+async def test_batch_transfer_passes_a_single_input_to_the_workflow():
+    """测试批量转账以一个 BatchTransferInput 参数启动工作流"""
+    client = FakeClient()
+    request = BatchTransferRequest(transfers=[
+        TransferRequest(from_account=uuid.uuid4(), to_account=uuid.uuid4(), amount=5),
+    ])
+
+    await batch_transfer(request, "key", client=client, settings=SETTINGS, idempotency_service=FakeIdempotencyService())
+
+    assert client.started[0][0] == BatchTransferWorkflow.run
+    [batch] = workflow_args(client)
+    assert isinstance(batch, BatchTransferInput)
+    assert (batch.transfers[0].amount, batch.batch_size) == (5, 100)